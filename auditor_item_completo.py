@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 """
-AUDITOR DE ITEM - VALIDAÇÃO COMPLETA DE CÁLCULOS (STANDALONE)
+AUDITOR DE ITEM - VALIDAÇÃO COMPLETA DE CÁLCULOS
 Sistema: Gestão de Compras e Estoque
 Autor: Robério (com assistência de IA)
 Data: 16/12/2025
 
-Versão standalone - não depende de módulos externos
+Dados brutos lidos direto do vendas.db (duckdb + sqlite)
 CORRIGIDO: Nomes de colunas conforme schema real do banco
+
+Etapas 4 a 10 vêm do snapshot Arrow da execução (RunSnapshot): só a linha do
+SKU é lida, sem rodar o pipeline. O recálculo manual fica para --recalcular
+(comparado com o snapshot) ou quando ainda não há snapshot.
 """
 
+import argparse
 import sys
 from pathlib import Path
 import math
@@ -22,6 +27,13 @@ except ImportError:
     print("   Instale com: pip install duckdb")
     sys.exit(1)
 
+sys.path.append(str(Path(__file__).parent / "src"))
+try:
+    import polars as pl
+    from compras_sistema.data_engine.run_snapshot import RunSnapshot
+except ImportError:
+    RunSnapshot = None
+
 
 class ConfigSimples:
     """Gerenciador simples de configurações"""
@@ -66,10 +78,14 @@ class ConfigSimples:
 class AuditorItem:
     """Auditor completo de cálculos de um item"""
 
-    def __init__(self, db_path, config):
+    def __init__(self, db_path, config, snapshots_dir=None, run_id=None, recalcular=False):
         self.db_path = Path(db_path)
         self.config = config
+        self.snapshots_dir = Path(snapshots_dir) if snapshots_dir else None
+        self.run_id = run_id
+        self.recalcular = recalcular
         self.conn = None
+        self.manifesto = None
         self.resultado = {}
 
     def conectar(self):
@@ -128,63 +144,48 @@ class AuditorItem:
         self._exibir_vendas(vendas)
         self.resultado['vendas'] = vendas
 
-        # Etapa 4: Classificações ABC e XYZ
+        # Etapas 4 a 10: resultado do motor (snapshot) ou recálculo manual
+        motor = self._buscar_snapshot(cod_produto)
+        if motor is not None and not self.recalcular:
+            print(f"\nℹ️  Etapas 4 a 10 lidas do snapshot {self.manifesto['run_id']} "
+                  f"(Ref {self.manifesto['data_referencia']} | Config {self.manifesto['config_hash']})")
+            self.resultado.update(self._etapas_do_snapshot(motor))
+        else:
+            print("\nℹ️  Etapas 4 a 10 recalculadas manualmente")
+            self.resultado.update(self._recalcular_etapas(cod_produto, cadastro, estoque, vendas))
+
         print("\n▶ ETAPA 4: CLASSIFICAÇÕES")
         print("-" * 80)
-        classificacao = self._buscar_classificacao(cod_produto)
-        self._exibir_classificacao(classificacao)
-        self.resultado['classificacao'] = classificacao
+        self._exibir_classificacao(self.resultado['classificacao'])
 
-        # Etapa 5: Cálculo de Tendências
         print("\n▶ ETAPA 5: TENDÊNCIAS")
         print("-" * 80)
-        tendencias = self._calcular_tendencias(vendas)
-        self._exibir_tendencias(tendencias)
-        self.resultado['tendencias'] = tendencias
+        self._exibir_tendencias(self.resultado['tendencias'])
 
-        # Etapa 6: Cálculo de Segurança (Z-Score)
         print("\n▶ ETAPA 6: ESTOQUE DE SEGURANÇA")
         print("-" * 80)
-        seguranca = self._calcular_seguranca(vendas, classificacao)
-        self._exibir_seguranca(seguranca)
-        self.resultado['seguranca'] = seguranca
+        self._exibir_seguranca(self.resultado['seguranca'])
 
-        # Etapa 7: Ponto de Suprimento e Estoque Meta
         print("\n▶ ETAPA 7: PONTO DE SUPRIMENTO E ESTOQUE META")
         print("-" * 80)
-        necessidades = self._calcular_necessidades(
-            vendas, seguranca, estoque, cadastro, classificacao
-        )
-        self._exibir_necessidades(necessidades)
-        self.resultado['necessidades'] = necessidades
+        self._exibir_necessidades(self.resultado['necessidades'])
 
-        # Etapa 8: Sugestão Bruta e Final
         print("\n▶ ETAPA 8: CÁLCULO DA SUGESTÃO DE COMPRA")
         print("-" * 80)
-        sugestao = self._calcular_sugestao(necessidades, estoque, cadastro)
-        self._exibir_sugestao(sugestao)
-        self.resultado['sugestao'] = sugestao
+        self._exibir_sugestao(self.resultado['sugestao'])
 
-        # Etapa 9: Score de Prioridade
         print("\n▶ ETAPA 9: SCORE DE PRIORIZAÇÃO")
         print("-" * 80)
-        score = self._calcular_score(sugestao, vendas, estoque, classificacao, tendencias)
-        self._exibir_score(score)
-        self.resultado['score'] = score
+        self._exibir_score(self.resultado['score'])
 
-        # Etapa 10: Diagnóstico e Validações
         print("\n▶ ETAPA 10: DIAGNÓSTICO E BLOQUEIOS")
         print("-" * 80)
-        diagnostico = self._gerar_diagnostico(
-            cadastro, estoque, vendas, sugestao, necessidades
-        )
-        self._exibir_diagnostico(diagnostico)
-        self.resultado['diagnostico'] = diagnostico
+        self._exibir_diagnostico(self.resultado['diagnostico'])
 
-        # Etapa 11: Comparação com Sistema (opcional)
+        # Etapa 11: Comparação com Sistema (recálculo x snapshot)
         print("\n▶ ETAPA 11: COMPARAÇÃO COM SISTEMA")
         print("-" * 80)
-        comparacao = self._comparar_com_sistema(cod_produto, diagnostico)
+        comparacao = self._comparar_com_sistema(motor, self.resultado['diagnostico'])
         self.resultado['comparacao'] = comparacao
 
         # Etapa 12: Opinião Técnica Final
@@ -195,6 +196,113 @@ class AuditorItem:
 
         return True
 
+    def _recalcular_etapas(self, cod_produto, cadastro, estoque, vendas):
+        """Recalcula as etapas 4 a 10 a partir dos dados brutos"""
+        classificacao = self._buscar_classificacao(cod_produto)
+        tendencias = self._calcular_tendencias(vendas)
+        seguranca = self._calcular_seguranca(vendas, classificacao)
+        necessidades = self._calcular_necessidades(
+            vendas, seguranca, estoque, cadastro, classificacao
+        )
+        sugestao = self._calcular_sugestao(necessidades, estoque, cadastro)
+        score = self._calcular_score(sugestao, vendas, estoque, classificacao, tendencias)
+        diagnostico = self._gerar_diagnostico(
+            cadastro, estoque, vendas, sugestao, necessidades
+        )
+        return {
+            'classificacao': classificacao,
+            'tendencias': tendencias,
+            'seguranca': seguranca,
+            'necessidades': necessidades,
+            'sugestao': sugestao,
+            'score': score,
+            'diagnostico': diagnostico
+        }
+
+    def _buscar_snapshot(self, cod_produto):
+        """Linha do SKU no snapshot da execução (lazy scan + filtro, sem recalcular)"""
+        if RunSnapshot is None or self.snapshots_dir is None:
+            print("ℹ️  Leitura de snapshot indisponível (polars/compras_sistema não encontrados)")
+            return None
+
+        try:
+            snapshots = RunSnapshot(self.snapshots_dir)
+            self.manifesto = snapshots.manifesto(self.run_id)
+            if self.manifesto is None:
+                print(f"ℹ️  Nenhum snapshot encontrado (run_id={self.run_id or 'último'}). "
+                      "Rode gerar_relatorio_final.py.")
+                return None
+
+            linha = (
+                snapshots.scan(self.manifesto['run_id'])
+                .filter(pl.col("cod_produto") == cod_produto)
+                .collect()
+            )
+        except Exception as e:
+            print(f"⚠️  Erro ao ler snapshot: {e}")
+            return None
+
+        if linha.height == 0:
+            print(f"ℹ️  SKU não está no snapshot {self.manifesto['run_id']} (filtro de marca da execução?)")
+            return None
+        return linha.row(0, named=True)
+
+    def _etapas_do_snapshot(self, motor):
+        """Monta as etapas 4 a 10 com os valores calculados pelo motor"""
+        cfg_compras = self.config.parametros.get('compras', {})
+
+        def valor(campo, padrao=0):
+            v = motor.get(campo)
+            return padrao if v is None else v
+
+        motivo_bloqueio = valor('motivo_bloqueio', "")
+        return {
+            'classificacao': {
+                'curva_abc': valor('curva_abc', 'C'),
+                'curva_xyz': valor('curva_xyz', 'Z'),
+                'lead_time_dias': valor('lead_time_dias', cfg_compras.get('leadtime_padrao', 7))
+            },
+            'tendencias': {
+                'var_vendas': valor('var_vendas', 0.0),
+                'tendencia_vendas': valor('tendencia_vendas', "N/D"),
+                'saldo_clientes': valor('saldo_clientes'),
+                'tendencia_clientes': valor('tendencia_clientes', "N/D"),
+                'perfil_cliente': valor('perfil_cliente', "N/D")
+            },
+            'seguranca': {
+                'fator_z': valor('fator_z'),
+                'std_venda_dia': valor('std_venda_dia', 0.0),
+                'lead_time': valor('lead_time_dias', cfg_compras.get('leadtime_padrao', 7)),
+                'estoque_seguranca': valor('estoque_seguranca')
+            },
+            'necessidades': {
+                'media_calculo': valor('media_calculo', valor('media_venda_dia', 0.0)),
+                'boost_aplicado': "Calculado pelo motor",
+                'ponto_suprimento': valor('ponto_suprimento'),
+                'estoque_meta': valor('estoque_meta'),
+                'meses_cobertura': cfg_compras.get('meses_cobertura', 2)
+            },
+            'sugestao': {
+                'sugestao_bruta': valor('sugestao_bruta'),
+                'necessidade_liquida': valor('necessidade_liquida'),
+                'lotes_cheios': valor('lotes_cheios'),
+                'sugestao_final': valor('sugestao_calculada', valor('sugestao_final')),
+                'subtotal': valor('subtotal', 0.0)
+            },
+            'score': {
+                'score': valor('score'),
+                'detalhes': [f"Status: {valor('status_diagnostico', 'N/D')}"]
+            },
+            'diagnostico': {
+                'cobertura_virtual_meses': valor('cobertura_virtual_meses', 99.0),
+                'validacao_giro': valor('validacao_giro', "N/D"),
+                'motivo_bloqueio': motivo_bloqueio,
+                'bloqueado': bool(motivo_bloqueio),
+                'sugestao_calculada': valor('sugestao_calculada', valor('sugestao_final')),
+                'sugestao_final': valor('sugestao_final')
+            }
+        }
+
     def _buscar_cadastro(self, cod_produto):
         """Busca dados cadastrais do produto"""
         try:
@@ -670,23 +778,21 @@ class AuditorItem:
             'sugestao_final': sugestao_final
         }
 
-    def _comparar_com_sistema(self, cod_produto, diagnostico):
-        """Compara cálculo manual com o do sistema (se existir tabela)"""
-        try:
-            # Tenta buscar valor do sistema
-            sistema = self.conn.execute(f"""
-                SELECT sugestao_final, validacao_giro, motivo_bloqueio
-                FROM relatorio_final
-                WHERE cod_produto = '{cod_produto}'
-            """).fetchone()
+    def _comparar_com_sistema(self, motor, diagnostico):
+        """Compara o recálculo manual com a linha do motor no snapshot"""
+        if motor is None:
+            print("ℹ️  Item não encontrado no snapshot do sistema")
+            return {'encontrado': False}
 
-            if not sistema:
-                print("ℹ️  Item não encontrado no relatório do sistema")
-                return {'encontrado': False}
+        if not self.recalcular:
+            print(f"ℹ️  Valores do próprio sistema (snapshot {self.manifesto['run_id']})")
+            print("   Use --recalcular para conferir o motor contra o cálculo manual.")
+            return {'encontrado': True, 'match': True}
 
-            sugestao_sistema = sistema[0] or 0
-            validacao_sistema = sistema[1]
-            motivo_sistema = sistema[2]
+        try:
+            sugestao_sistema = motor.get('sugestao_final') or 0
+            validacao_sistema = motor.get('validacao_giro')
+            motivo_sistema = motor.get('motivo_bloqueio')
 
             # Compara
             diferenca = diagnostico['sugestao_final'] - sugestao_sistema
@@ -713,7 +819,7 @@ class AuditorItem:
             }
 
         except Exception as e:
-            print(f"ℹ️  Tabela relatorio_final não encontrada ou erro: {e}")
+            print(f"ℹ️  Erro ao comparar com o snapshot: {e}")
             return {'encontrado': False}
 
     # =====================================================================
@@ -907,10 +1013,17 @@ class AuditorItem:
 
 def main():
     """Função principal"""
+    parser = argparse.ArgumentParser(description="Auditoria completa de um item")
+    parser.add_argument("cod_produto", nargs="?", default=None, help="Código do produto (pergunta se omitido)")
+    parser.add_argument("--run-id", dest="run_id", default=None,
+                        help="Execução do snapshot a ler (padrão: a mais recente)")
+    parser.add_argument("--recalcular", action="store_true",
+                        help="Recalcula as etapas 4 a 10 e compara com o snapshot")
+    args = parser.parse_args()
 
     print("=" * 80)
     print("AUDITOR DE ITEM - Sistema de Compras e Estoque")
-    print("Versão Standalone - sem dependências de módulos")
+    print("Resultado do motor lido do snapshot da execução")
     print("=" * 80)
     print()
 
@@ -936,7 +1049,9 @@ def main():
     config = ConfigSimples(config_path)
 
     # Cria auditor
-    auditor = AuditorItem(sqlite_path, config)
+    auditor = AuditorItem(sqlite_path, config,
+                          snapshots_dir=PROJECT_ROOT / "data" / "cache" / "snapshots",
+                          run_id=args.run_id, recalcular=args.recalcular)
 
     # Conecta ao banco
     if not auditor.conectar():
@@ -944,7 +1059,7 @@ def main():
 
     try:
         # Solicita código do produto
-        cod_produto = input("\nDigite o CÓDIGO DO PRODUTO para auditar: ").strip()
+        cod_produto = args.cod_produto or input("\nDigite o CÓDIGO DO PRODUTO para auditar: ").strip()
 
         if not cod_produto:
             print("❌ Código não informado!")
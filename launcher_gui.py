@@ -18,6 +18,13 @@ except ImportError:
     from src.ui.components.sidebar import Sidebar
     from src.ui.components.dashboard import Dashboard
 
+sys.path.append(str(Path(__file__).parent / "src"))
+from compras_sistema.core.progress import ProgressServer
+from compras_sistema.utils.brand_index import BrandIndex
+
+# Intervalo de renderização dos eventos do motor (~10 quadros/s)
+INTERVALO_EVENTOS_MS = 100
+
 # Configuração Global de Tema
 ctk.set_appearance_mode("Light")
 ctk.set_default_color_theme("blue")
@@ -47,8 +54,13 @@ class DashboardApp(ctk.CTk):
         self.var_lead_time = ctk.StringVar()
         self.var_dias_novo = ctk.StringVar()
         
-        # Cache de Marcas
+        # Cache de Marcas (índice de busca; o cache em disco é validado pela impressão digital do banco)
         self.todas_marcas = ["TODAS"]
+        self.indice_marcas = BrandIndex([])
+
+        # Execução em andamento (canal de progresso do motor)
+        self._servidor_execucao = None
+        self._stats_execucao = None
 
         # --- LAYOUT PRINCIPAL ---
         self.grid_columnconfigure(1, weight=1)
@@ -142,15 +154,13 @@ class DashboardApp(ctk.CTk):
 
     # --- LÓGICA DE MARCAS (Mantida Integralmente) ---
     def gerenciar_cache_marcas(self):
-        if self.cache_path.exists():
-            try:
-                self.dashboard.log("📂 Carregando marcas do cache...")
-                with open(self.cache_path, 'r', encoding='utf-8') as f:
-                    self.todas_marcas = json.load(f)
-                    self.after(0, lambda: self.filtrar_marcas(""))
-                    self.dashboard.log(f"✅ {len(self.todas_marcas)} marcas carregadas.")
-                    return
-            except Exception: pass
+        marcas = BrandIndex.ler_cache(self.cache_path, self.db_path)
+        if marcas is not None:
+            self.dashboard.log("📂 Carregando marcas do cache...")
+            self._indexar_marcas(marcas)
+            self.dashboard.log(f"✅ {len(self.todas_marcas)} marcas carregadas.")
+            return
+        if self.cache_path.exists(): self.dashboard.log("♻️ Banco alterado desde o último cache de marcas.")
         self.forcar_atualizacao_marcas()
 
     def forcar_atualizacao_marcas(self):
@@ -160,19 +170,21 @@ class DashboardApp(ctk.CTk):
             con = duckdb.connect(":memory:")
             con.execute(f"ATTACH '{str(self.db_path)}' AS sqlite_db (TYPE SQLITE, READ_ONLY)")
             res = con.execute("SELECT DISTINCT marca FROM sqlite_db.produtos_gerais WHERE marca IS NOT NULL AND marca != '' ORDER BY 1").fetchall()
-            self.todas_marcas = ["TODAS"] + [str(r[0]) for r in res]
-            
-            with open(self.cache_path, 'w', encoding='utf-8') as f: json.dump(self.todas_marcas, f)
+            con.close()
+            marcas = [str(r[0]) for r in res]
             
-            self.after(0, lambda: self.filtrar_marcas(""))
+            BrandIndex.gravar_cache(self.cache_path, self.db_path, marcas)
+            self._indexar_marcas(marcas)
             self.dashboard.log(f"✅ Indexação concluída.")
-            con.close()
-        except Exception as e: self.dashboard.log(f"❌ Erro marcas: {e}")
+        except Exception as e: self.dashboard.log(f"❌ Erro marcas: {e}", "ERROR")
+
+    def _indexar_marcas(self, marcas):
+        self.indice_marcas = BrandIndex(marcas)
+        self.todas_marcas = self.indice_marcas.buscar("")
+        self.after(0, lambda: self.filtrar_marcas(self.dashboard.var_busca.get()))
 
     def filtrar_marcas(self, termo=""):
-        termo = termo.upper() if termo else ""
-        lista = [m for m in self.todas_marcas if termo in m.upper()] if termo else self.todas_marcas
-        self.dashboard.renderizar_lista_marcas(lista)
+        self.dashboard.renderizar_lista_marcas(self.indice_marcas.buscar(termo))
 
     # --- MOTOR DE CÁLCULO (Mantido Integralmente) ---
     def iniciar_processamento(self, simulacao=True):
@@ -186,43 +198,82 @@ class DashboardApp(ctk.CTk):
         threading.Thread(target=lambda: self.rodar_script(simulacao), daemon=True).start()
 
     def rodar_script(self, simulacao):
+        servidor = None
         try:
             marca = self.dashboard.get_marca_selecionada()
             python_exec = sys.executable 
-            cmd = [python_exec, str(self.script_path), "--marca", marca]
+            # Eventos estruturados (etapa/log/stats/fim) chegam por socket local, não pelo stdout
+            servidor = ProgressServer()
+            self._servidor_execucao = servidor
+            self._stats_execucao = None
+            cmd = [python_exec, str(self.script_path), "--marca", marca, "--progresso-porta", str(servidor.porta)]
             if simulacao: cmd.append("--simulacao")
 
             self.dashboard.log(f"🚀 Iniciando motor: {marca}")
+            self.after(0, lambda: self._drenar_eventos(servidor))
             
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1, encoding='utf-8', errors='replace')
-
-            for line in process.stdout:
-                line_clean = line.strip()
-                if "--- LOG START ---" not in line_clean and line_clean:
-                    self.after(0, lambda l=line_clean: self.dashboard.log(l))
-
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+            stderr = process.stderr.read()
             process.wait()
-            
-            if process.stderr.read(): self.dashboard.log(f"🔴 STDERR detectado.")
-
-            if process.returncode == 0:
-                self._carregar_resultados()
+            servidor.esperar_desconexao()
 
-            self.after(0, lambda: self.finalizar_processo(simulacao, process.returncode))
+            self.after(0, lambda: self._concluir_execucao(servidor, simulacao, process.returncode, stderr))
 
         except Exception as e:
-            self.dashboard.log(f"❌ ERRO CRÍTICO: {e}")
+            if servidor: servidor.fechar()
+            self.dashboard.log(f"❌ ERRO CRÍTICO: {e}", "ERROR")
             self.after(0, lambda: self.finalizar_processo(simulacao, 1))
 
+    def _drenar_eventos(self, servidor):
+        """Renderiza em lote, a cada INTERVALO_EVENTOS_MS, tudo o que o motor enviou desde o último quadro."""
+        ultima_etapa = None
+        for evento in servidor.drenar():
+            tipo = evento.get("tipo")
+            if tipo == "log":
+                self.dashboard.log(evento.get("mensagem", ""), evento.get("nivel", "INFO"))
+            elif tipo == "etapa":
+                ultima_etapa = evento
+            elif tipo == "stats":
+                self._stats_execucao = evento.get("dados") or {}
+            elif tipo == "desconectado":
+                servidor.fechar()
+        if ultima_etapa:
+            self.dashboard.atualizar_progresso(ultima_etapa.get("etapa", ""), ultima_etapa.get("percentual", 0),
+                                               ultima_etapa.get("linhas"), ultima_etapa.get("decorrido_s"))
+        if self._servidor_execucao is servidor:
+            self.after(INTERVALO_EVENTOS_MS, lambda: self._drenar_eventos(servidor))
+
+    def _concluir_execucao(self, servidor, simulacao, codigo_retorno, stderr):
+        self._servidor_execucao = None
+        servidor.fechar()
+        self._drenar_eventos(servidor)  # Último quadro: eventos que chegaram depois do anterior
+        if codigo_retorno != 0 and stderr.strip():
+            for linha in ["🔴 STDERR:"] + stderr.strip().splitlines()[-20:]:
+                self.dashboard.log(linha, "ERROR")
+
+        if codigo_retorno == 0:
+            if self._stats_execucao is not None:
+                self._aplicar_stats(self._stats_execucao)
+            else:
+                self._carregar_resultados()  # Motor sem canal de progresso: cai no JSON em disco
+
+        self.finalizar_processo(simulacao, codigo_retorno)
+
     def _carregar_resultados(self):
         try:
             stats_path = self.root_dir / "data" / "cache" / "last_run_stats.json"
             if stats_path.exists():
                 with open(stats_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f).get("data", {})
-                    self.after(0, lambda: self.dashboard.atualizar_kpis_dict(data))
+                    self._aplicar_stats(json.load(f).get("data", {}))
         except Exception: pass
 
+    def _aplicar_stats(self, data):
+        self.dashboard.atualizar_kpis_dict(data)
+        # Snapshot Arrow da execução (data/cache/snapshots): base para re-export e auditoria
+        run_id = data.get("snapshot_run_id")
+        if run_id:
+            self.dashboard.log(f"📦 Snapshot {run_id} disponível (scripts/reexportar_snapshot.py --run-id {run_id})")
+
     def finalizar_processo(self, simulacao, codigo_retorno):
         self.dashboard.set_estado_processamento(False)
         self.sidebar.set_estado_gerar("normal")
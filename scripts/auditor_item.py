@@ -87,5 +87,31 @@ def main():
     
     # ... [CÓDIGO DE CÁLCULO MANTIDO IGUAL AO ORIGINAL] ...
 
+    # --- RESULTADO DO MOTOR (SNAPSHOT DA ÚLTIMA EXECUÇÃO) ---
+    # Lê só a linha do SKU do Arrow mapeado em memória, sem rodar o pipeline
+    print(f"\n🧮 2. RESULTADO DO MOTOR (Último Snapshot)")
+    print("-" * 50)
+    try:
+        import polars as pl
+        from compras_sistema.data_engine.run_snapshot import RunSnapshot
+
+        snapshots = RunSnapshot(PROJECT_ROOT / "data" / "cache" / "snapshots")
+        manifesto = snapshots.manifesto()
+        if manifesto is None:
+            print("• Nenhum snapshot encontrado (rode gerar_relatorio_final.py).")
+            return
+        linha = snapshots.scan().filter(pl.col("cod_produto") == cod_alvo).collect()
+        print(f"• Execução {manifesto['run_id']} | Ref {manifesto['data_referencia']} | Config {manifesto['config_hash']}")
+        if linha.height == 0:
+            print("• SKU não está no snapshot (filtro de marca da execução?).")
+            return
+        for campo, valor in linha.row(0, named=True).items():
+            if campo in ("media_venda_dia", "estoque_seguranca", "ponto_suprimento", "estoque_meta",
+                         "sugestao_bruta", "sugestao_final", "score", "validacao_giro",
+                         "motivo_bloqueio", "status_diagnostico"):
+                print(f"• {campo}: {valor}")
+    except Exception as e:
+        print(f"❌ Erro ao ler snapshot: {e}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,4 +1,3 @@
-import json
 import sys
 import yaml
 import duckdb
@@ -13,6 +12,9 @@ CONFIG_PATH = ROOT_DIR / "config" / "parametros.yaml"
 DB_PATH = ROOT_DIR / "data" / "vendas.db"
 SCRIPT_RESULTADO = ROOT_DIR / "scripts" / "gerar_relatorio_final.py"
 
+sys.path.append(str(ROOT_DIR / "src"))
+from compras_sistema.core.progress import ProgressServer
+
 MARCA_TESTE = sys.argv[1] if len(sys.argv) > 1 else "TODAS"
 
 # =========================================================
@@ -96,35 +98,36 @@ print("\n🔍 ETAPA 4 — EXECUTANDO MOTOR DE CÁLCULO")
 
 import subprocess
 
+# Estatísticas chegam como evento 'stats' do canal de progresso (sem raspar o stdout)
+servidor = ProgressServer()
+
 cmd = [
     sys.executable,
     str(SCRIPT_RESULTADO),
     "--marca",
     MARCA_TESTE,
-    "--simulacao"
+    "--simulacao",
+    "--progresso-porta",
+    str(servidor.porta)
 ]
 
 process = subprocess.Popen(
     cmd,
-    stdout=subprocess.PIPE,
-    stderr=subprocess.PIPE,
-    text=True,
-    encoding="utf-8"
+    stdout=subprocess.DEVNULL,
+    stderr=subprocess.DEVNULL
 )
 
-stats = None
-
-for line in process.stdout:
-    if "STATS_DATA=" in line:
-        stats = json.loads(line.replace("STATS_DATA=", "").strip())
-
 process.wait()
+servidor.esperar_desconexao()
+evento = servidor.aguardar("stats", timeout=1)
+stats = evento["dados"] if evento else None
+servidor.fechar()
 
 if process.returncode != 0:
     erro("Motor de cálculo retornou erro")
 
 if not stats:
-    erro("STATS_DATA não encontrado na execução")
+    erro("Evento de estatísticas não recebido do motor")
 
 ok("Motor executado com sucesso")
 
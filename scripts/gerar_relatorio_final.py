@@ -1,8 +1,9 @@
 import sys
 import argparse
 import json
+import re
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
 import polars as pl
 import traceback
 from pandera.errors import SchemaError
@@ -18,34 +19,296 @@ sys.path.append(str(PROJECT_ROOT / "src"))
 from compras_sistema.core.config import ConfigManager
 from compras_sistema.core.system_guard import SystemGuard
 from compras_sistema.core.reporter import ExecutionReporter
+from compras_sistema.core.progress import ProgressEmitter
 from compras_sistema.data_engine.duckdb_manager import DuckDBManager
+from compras_sistema.data_engine.product_dictionary import ProductDictionary
 from compras_sistema.data_engine.history_recorder import HistoryRecorder
+from compras_sistema.data_engine.run_snapshot import RunSnapshot
+from compras_sistema.data_engine.stage_cache import StageCache
 
 # Imports das Regras de Negócio (Classificadores e Matemática)
 from compras_sistema.rule_engine.classification.abc_classifier import ABCClassifier
 from compras_sistema.rule_engine.classification.xyz_classifier import XYZClassifier
+from compras_sistema.rule_engine.classification.concentracao_classifier import ConcentracaoClassifier
+from compras_sistema.rule_engine.classification.abc_multicriterio_classifier import ABCMultiCriterioClassifier
 from compras_sistema.rule_engine.classification.trend_classifier import TrendClassifier
 from compras_sistema.rule_engine.stock.estoque_math import EstoqueMath
+from compras_sistema.rule_engine.rule_registry import RuleRegistry
+from compras_sistema.rule_engine.stock.score_engine import ScoreEngine
+from compras_sistema.rule_engine.stock.budget_optimizer import BudgetOptimizer
+from compras_sistema.rule_engine.stock.po_consolidator import POConsolidator
+from compras_sistema.rule_engine.forecast.intermittent_forecaster import IntermittentForecaster
+from compras_sistema.rule_engine.forecast.smoothing_forecaster import SmoothingForecaster
 from compras_sistema.export.excel_exporter import ExcelExporter
-from compras_sistema.utils.sanitizer import sanear_dados_dataframe
+from compras_sistema.utils.data_quality import DataQualityProfiler
 
 # Tenta importar o Validador (Pandera), mas não quebra se faltar
 try:
-    from compras_sistema.rule_engine.validators.input_schema import InputCalcSchema
+    from compras_sistema.rule_engine.validators.input_schema import (
+        InputCalcSchema, validar_entrada, NIVEIS_VALIDACAO, normalizar_nivel
+    )
 except ImportError:
     InputCalcSchema = None
+    NIVEIS_VALIDACAO = ("completa", "amostrada", "esquema")
+    normalizar_nivel = str.lower
+
+# Relatório de qualidade da última base montada (lido pelo dashboard via stats)
+ARQUIVO_QUALIDADE = PROJECT_ROOT / "data" / "cache" / "qualidade_dados.json"
+
+# Seções do config lidas pelas etapas 1-4 (chave do cache da base de cálculo)
+SECOES_BASE = ("abc", "tolerancia_abc", "abc_multicriterio", "xyz", "outlier", "previsao", "lead_time", "historico")
+
+def valores_base(config_achatado: dict, pesos_score: dict, data_referencia) -> dict:
+    """
+    Valores que identificam a base de cálculo no StageCache: as seções de
+    SECOES_BASE, a data de referência e se o score usa 'margem' (montar_base
+    só faz o join da margem nesse caso, então ligar o peso de
+    contribuicao_margem precisa invalidar uma base gravada sem a coluna).
+    """
+    return {**StageCache.selecionar(config_achatado, SECOES_BASE),
+            "data_referencia": str(data_referencia),
+            "usa_margem": ScoreEngine(pesos_score).usa_margem}
+
+def montar_base(db, config_mgr, guard, data_referencia, as_of=None, nivel_validacao=None,
+                progresso=None) -> pl.DataFrame:
+    """
+    Etapas 1 a 4: classificações (SQL), snapshot do ERP, big join e higienização.
+    É a parte cara do processamento e só depende das seções de config em
+    SECOES_BASE, da data de referência e dos bancos: o resultado vai para o
+    StageCache e é reaproveitado quando só parâmetros do motor mudam.
+    """
+    progresso = progresso or ProgressEmitter()
+    # ==============================================================================
+    # 1. MOTOR DE CLASSIFICAÇÃO (ABC, XYZ, TENDÊNCIAS)
+    # ==============================================================================
+    guard.log("📊 Calculando Classificações Estatísticas (ABC, XYZ, Trends)...")
+    progresso.etapa("classificacao", 5)
+    inicio_etapa = datetime.now()
+    
+    abc_engine = ABCClassifier(db, data_referencia)
+    xyz_engine = XYZClassifier(db, config_mgr.parametros, data_referencia)
+    trend_engine = TrendClassifier(db, data_referencia)
+    concentracao_engine = ConcentracaoClassifier(db, data_referencia)
+    
+    with db.perfilar("classificacao"):
+        # Curva da execução anterior para a histerese ABC (tolerancia_abc)
+        df_curva_anterior = HistoryRecorder(db).carregar_ultima_curva_abc(as_of)
+        df_abc = abc_engine.run(df_curva_anterior)
+        df_xyz = xyz_engine.run()
+        df_trend = trend_engine.run()
+        df_concentracao = concentracao_engine.run()
+    guard.log_performance("classificacao", inicio_etapa)
+
+    # 1.1 Curva ABC Multicritério (Opcional)
+    # A mesma base traz a 'margem' usada pelo componente contribuicao_margem do score
+    cfg_abc_multi = config_mgr.parametros.abc_multicriterio
+    abc_multi_engine = ABCMultiCriterioClassifier(db, config_mgr.parametros.abc, cfg_abc_multi, data_referencia)
+    if cfg_abc_multi.get("ativada", False):
+        guard.log("📊 Calculando Curva ABC Multicritério...")
+        df_abc_multi = abc_multi_engine.run()
+        df_abc = df_abc.join(
+            df_abc_multi.select(["cod_produto", "margem"] + [c for c in df_abc_multi.columns if c.startswith("curva_")]),
+            on="cod_produto", how="left"
+        )
+    elif ScoreEngine(config_mgr.pesos_score).usa_margem:
+        guard.log("💰 Calculando margem por SKU (componente contribuicao_margem do score)...")
+        df_abc = df_abc.join(abc_multi_engine.carregar_base().select(["cod_produto", "margem"]),
+                             on="cod_produto", how="left")
+
+    if "qtd_outliers_cortados" in df_xyz.columns:
+        total_cortados = int(df_xyz["qtd_outliers_cortados"].sum())
+        skus_cortados = df_xyz.filter(pl.col("qtd_outliers_cortados") > 0).height
+        guard.log(f"✂️ Outliers de demanda cortados: {total_cortados} pontos em {skus_cortados} SKUs")
+    
+    # ==============================================================================
+    # 2. LEITURA DE DADOS (SNAPSHOT DO ERP)
+    # ==============================================================================
+    guard.log("💾 Lendo Estoques e Cadastro Completo do Banco de Dados...")
+    progresso.etapa("snapshot_erp", 25, df_xyz.height)
+    inicio_etapa = datetime.now()
+    
+    with db.perfilar("snapshot_erp"), db.get_connection() as conn:
+        # 2.1 Leitura de Saldos e Custos
+        df_saldo = conn.execute("""
+            SELECT 
+                CAST(cod_produto AS VARCHAR) as cod_produto,
+                saldo_estoque,
+                saldo_oc,
+                custo_unitario,
+                ultima_entrada
+            FROM sqlite_db.saldo_custo_entrada
+        """).pl()
+        
+        # 2.2 Leitura Dinâmica do Cadastro de Produtos
+        # Verifica quais colunas existem para evitar erros se o banco mudar
+        try:
+            cols_db = [c[1] for c in conn.execute("PRAGMA table_info(sqlite_db.produtos_gerais)").fetchall()]
+            
+            # Mapeamento seguro de colunas
+            col_desc = "descricao_produto" if "descricao_produto" in cols_db else ("descricao" if "descricao" in cols_db else "''")
+            col_data = "CAST(data_cadastro AS DATE)" if "data_cadastro" in cols_db else "CAST('2000-01-01' AS DATE)"
+            col_ref = "ref_fornecedor" if "ref_fornecedor" in cols_db else "''"
+            
+            df_cadastro = conn.execute(f"""
+                SELECT 
+                    CAST(cod_produto AS VARCHAR) as cod_produto,
+                    CAST(qtd_economica AS INTEGER) as lote_economico,
+                    marca,
+                    {col_desc} as descricao,
+                    {col_ref} as ref_fornecedor,
+                    ativo,
+                    {col_data} as data_cadastro
+                FROM sqlite_db.produtos_gerais
+            """).pl()
+        except Exception as e:
+            guard.log(f"⚠️ Erro parcial ao ler cadastro: {e}. Usando estrutura de fallback.", nivel="WARNING")
+            df_cadastro = pl.DataFrame(schema={
+                "cod_produto": pl.Utf8, "lote_economico": pl.Int64, "marca": pl.Utf8,
+                "descricao": pl.Utf8, "ref_fornecedor": pl.Utf8, "ativo": pl.Utf8,
+                "data_cadastro": pl.Date
+            })
+    guard.log_performance("snapshot_erp", inicio_etapa)
+    
+    # ==============================================================================
+    # 3. UNIFICAÇÃO DOS DADOS (O "BIG JOIN")
+    # ==============================================================================
+    guard.log("🔗 Cruzando tabelas (Join)...")
+    progresso.etapa("join", 35, df_saldo.height)
+    
+    # Cria um universo com todos os códigos de produto encontrados em qualquer tabela
+    # e um id inteiro denso por código: os joins abaixo rodam em UInt32, não em texto
+    dicionario = ProductDictionary.de_frames(df_xyz, df_saldo, df_cadastro)
+    chave = ProductDictionary.COLUNA_ID
+    
+    # Realiza os Left Joins para montar a tabela mestre
+    df_final = (dicionario.universo
+        .join(dicionario.codificar(df_xyz), on=chave, how="left")
+        .join(dicionario.codificar(df_abc), on=chave, how="left")
+        .join(dicionario.codificar(df_trend), on=chave, how="left")
+        .join(dicionario.codificar(df_concentracao), on=chave, how="left")
+        .join(dicionario.codificar(df_saldo), on=chave, how="left")
+        .join(dicionario.codificar(df_cadastro), on=chave, how="left"))
+    df_final = dicionario.decodificar(df_final)
+    
+    # Garante que temos descrição
+    if "descricao" not in df_final.columns:
+        if "descricao_right" in df_final.columns:
+            df_final = df_final.rename({"descricao_right": "descricao"})
+        else:
+            df_final = df_final.with_columns(pl.lit("SEM DESCRIÇÃO").alias("descricao"))
+    
+    # ==============================================================================
+    # 4. TRATAMENTO E HIGIENIZAÇÃO DE DADOS
+    # ==============================================================================
+    
+    # Recupera Lead Time do Config
+    lead_time_padrao = config_mgr.parametros.lead_time.padrao_dias
+    if isinstance(lead_time_padrao, dict):
+        lead_time_padrao = lead_time_padrao.get('padrao_dias', 10)
+        
+    # 4.1 Qualidade de Dados: coerção, nulos, limites e domínio em uma passada,
+    #     com contagem de anomalias por regra (relatório para o dashboard)
+    progresso.etapa("qualidade", 40, df_final.height)
+    df_final = df_final.with_columns(pl.lit(lead_time_padrao).alias("lead_time_dias"))
+    df_final, relatorio_qualidade = DataQualityProfiler().aplicar(df_final)
+    DataQualityProfiler.salvar(relatorio_qualidade, ARQUIVO_QUALIDADE)
+    for linha in DataQualityProfiler.resumo(relatorio_qualidade):
+        guard.log(f"🩺 Qualidade: {linha}")
+
+    # 4.2 Previsão de Demanda Intermitente (Croston/SBA/TSB) - Opcional
+    cfg_intermitente = config_mgr.parametros.previsao.get("intermitente", {})
+    if cfg_intermitente.get("ativada", False) and xyz_engine.df_diario is not None:
+        curvas_alvo = cfg_intermitente.get("curvas_xyz", ["Z"])
+        skus_alvo = df_final.filter(pl.col("curva_xyz").is_in(curvas_alvo))["cod_produto"]
+        guard.log(f"🔮 Previsão intermitente ({cfg_intermitente.get('metodo', 'sba').upper()}) para {len(skus_alvo)} SKUs...")
+        df_previsao = IntermittentForecaster.prever_polars(
+            xyz_engine.df_diario, cfg_intermitente, skus=skus_alvo.to_list(),
+            data_referencia=data_referencia
+        )
+        df_final = EstoqueMath.aplicar_previsao_demanda(df_final, df_previsao)
+
+    # 4.3 Previsão por Suavização Exponencial (SES/Holt/Holt-Winters) - Opcional
+    cfg_suavizacao = config_mgr.parametros.previsao.get("suavizacao", {})
+    if cfg_suavizacao.get("ativada", False):
+        curvas_alvo = cfg_suavizacao.get("curvas_xyz", ["X", "Y"])
+        skus_alvo = df_final.filter(pl.col("curva_xyz").is_in(curvas_alvo))["cod_produto"]
+        guard.log(f"📈 Suavização exponencial ({cfg_suavizacao.get('modelo', 'auto')}) para {len(skus_alvo)} SKUs...")
+        df_previsao = SmoothingForecaster(
+            db, cfg_suavizacao, data_referencia, config_mgr.parametros.outlier
+        ).run(skus=skus_alvo.to_list())
+        df_final = EstoqueMath.aplicar_previsao_demanda(df_final, df_previsao)
+
+    # 4.4 Detecção de Anomalias (Cria alertas visuais no Excel)
+    df_final = df_final.with_columns([
+        pl.when(pl.col("saldo_estoque") < 0)
+        .then(pl.lit("ESTOQUE NEGATIVO"))
+        .when(pl.col("saldo_oc") < 0)
+        .then(pl.lit("OC NEGATIVA (ERRO ERP)"))
+        .otherwise(None)
+        .alias("alerta_dados")
+    ])
+
+    # 4.5 Validação Estrutural (Pandera) - Opcional mas Recomendado
+    #     Nível: completa (auditoria) / amostrada (padrão) / esquema (só tipos e nulos)
+    if InputCalcSchema:
+        cfg_execucao = config_mgr.parametros.execucao
+        nivel = nivel_validacao or cfg_execucao.get("nivel_validacao", "amostrada")
+        guard.log(f"🛡️ Validando integridade estrutural dos dados (nível: {nivel})...")
+        progresso.etapa("validacao", 45, df_final.height)
+        try:
+            df_final = validar_entrada(df_final, nivel, int(cfg_execucao.get("amostra_validacao", 10000)))
+        except SchemaError as e:
+            guard.log(f"❌ ERRO DE VALIDAÇÃO: {e.schema.name if e.schema else 'Global'}", nivel="ERROR")
+            sys.exit(1)
+
+    # 4.6 Curvas ABC/XYZ como Enum (depois do Pandera, que valida os textos)
+    return EstoqueMath.tipar_classificacoes(df_final)
+
+
+def carregar_indices_sazonais(db) -> dict:
+    """Índices sazonais mensais do analytics.duckdb (opcional: vazio se não existir)."""
+    indices_dict = {}
+    try:
+        analytics_path = PROJECT_ROOT / "data" / "analytics.duckdb"
+        if analytics_path.exists():
+            with db.get_connection() as conn:
+                conn.execute(f"ATTACH '{analytics_path}' AS analytics")
+                rows = conn.execute("SELECT mes, indice_sazonal FROM analytics.indices_sazonais").fetchall()
+                conn.execute("DETACH analytics")
+                for r in rows:
+                    indices_dict[r[0]] = r[1]
+    except Exception:
+        pass # Sazonalidade é opcional, segue sem erro crítico se falhar
+    return indices_dict
+
 
 def main():
     # --- Configuração de Argumentos via Linha de Comando ---
     parser = argparse.ArgumentParser()
     parser.add_argument("--marca", type=str, default="TODAS", help="Filtrar processamento por marca")
     parser.add_argument("--simulacao", action="store_true", help="Modo Simulação: Não gera Excel, apenas calcula")
+    parser.add_argument("--as-of", dest="as_of", type=date.fromisoformat, default=None,
+                        help="Data de referência (AAAA-MM-DD) para recalcular a execução como se fosse aquele dia")
+    parser.add_argument("--sem-cache", dest="sem_cache", action="store_true",
+                        help="Ignora o cache de estágios (data/cache) e recalcula tudo")
+    parser.add_argument("--baixa-memoria", dest="baixa_memoria", action="store_true",
+                        help="Força o modo baixa memória (partições + spill em disco + Excel em streaming)")
+    parser.add_argument("--progresso-porta", dest="progresso_porta", type=int, default=None,
+                        help="Porta localhost do launcher para eventos de progresso (JSON lines)")
+    parser.add_argument("--validacao", type=normalizar_nivel, choices=NIVEIS_VALIDACAO, default=None,
+                        help="Nível da validação de entrada (padrão: execucao.nivel_validacao; 'completa' para auditoria). "
+                             "Aceita também full, sampled e schema-only")
     args = parser.parse_args()
+    data_referencia = args.as_of or date.today()
     
     # --- Inicialização de Logs e Guardiões ---
     guard = SystemGuard(PROJECT_ROOT / "logs")
     print(f"--- LOG START ---") # Marcador visual para o Launcher
-    guard.log(f"🚀 Processamento Iniciado - Filtro Marca: {args.marca}")
+
+    # Canal de progresso estruturado (launcher): cada guard.log() também vira evento
+    progresso = ProgressEmitter(args.progresso_porta)
+    guard.logger.addHandler(progresso.handler())
+    guard.log(f"🚀 Processamento Iniciado - Filtro Marca: {args.marca} | Data de Referência: {data_referencia}")
     
     # Reporter: Responsável por enviar dados JSON para o Dashboard
     reporter = ExecutionReporter(PROJECT_ROOT / "data")
@@ -54,204 +317,69 @@ def main():
     # Carregamento de Configurações (YAML)
     config_mgr = ConfigManager()
     config_mgr.load_configs(PROJECT_ROOT / "config")
+
+    # Score de prioridade compilado uma única vez a partir de pesos_score.yaml
+    score_engine = ScoreEngine(config_mgr.pesos_score)
     
+    # Modo de Execução: com pouca RAM livre, processa em partições com spill em disco
+    cfg_execucao = config_mgr.parametros.execucao
+    modo_execucao = "baixa_memoria" if args.baixa_memoria else guard.escolher_modo_execucao(cfg_execucao)
+    baixa_memoria = modo_execucao == "baixa_memoria"
+    particoes = int(cfg_execucao.get("particoes", 8)) if baixa_memoria else 1
+    pasta_spill = PROJECT_ROOT / "data" / "tmp"
+    if baixa_memoria:
+        guard.log(f"🐢 Modo baixa memória: {particoes} partições, spill em {pasta_spill}")
+
     # Inicialização do Banco de Dados (Com Health Check)
-    db = DuckDBManager()
+    # Threads/memória dimensionadas pela máquina (seção 'duckdb'); baixa memória aperta os limites
+    cfg_duckdb = dict(config_mgr.parametros.duckdb)
+    if baixa_memoria:
+        cfg_duckdb.update(limite_memoria=cfg_execucao.get("duckdb_memoria_baixa", "512MB"), threads=2,
+                          pasta_temporaria=str(pasta_spill / "duckdb"))
+    db = DuckDBManager.from_config(cfg_duckdb, PROJECT_ROOT)
     db.initialize(PROJECT_ROOT / "data" / "vendas.db")
     
     # Inicialização do Gravador de Histórico (apenas se não for simulação)
     recorder = HistoryRecorder(db) if not args.simulacao else None
     if recorder:
         recorder.inicializar_tabela()
+
+    # Cache de estágios: invalida por config (chaves achatadas) e pela impressão dos bancos
+    cache = StageCache(PROJECT_ROOT / "data" / "cache",
+                       [PROJECT_ROOT / "data" / "vendas.db", PROJECT_ROOT / "data" / "analytics.duckdb"])
+    if args.sem_cache:
+        cache.limpar()
+    config_achatado = StageCache.achatar({**config_mgr.parametros.model_dump(), "pesos_score": config_mgr.pesos_score})
     
     try:
         # ==============================================================================
-        # 1. MOTOR DE CLASSIFICAÇÃO (ABC, XYZ, TENDÊNCIAS)
+        # 1-4. BASE DE CÁLCULO (CLASSIFICAÇÕES + ERP + HIGIENIZAÇÃO), COM CACHE
         # ==============================================================================
-        guard.log("📊 Calculando Classificações Estatísticas (ABC, XYZ, Trends)...")
-        
-        abc_engine = ABCClassifier(db)
-        xyz_engine = XYZClassifier(db, config_mgr.parametros)
-        trend_engine = TrendClassifier(db)
-        
-        df_abc = abc_engine.run()
-        df_xyz = xyz_engine.run()
-        df_trend = trend_engine.run()
-        
-        # ==============================================================================
-        # 2. LEITURA DE DADOS (SNAPSHOT DO ERP)
-        # ==============================================================================
-        guard.log("💾 Lendo Estoques e Cadastro Completo do Banco de Dados...")
-        
-        with db.get_connection() as conn:
-            # 2.1 Leitura de Saldos e Custos
-            df_saldo = conn.execute("""
-                SELECT 
-                    CAST(cod_produto AS VARCHAR) as cod_produto,
-                    saldo_estoque,
-                    saldo_oc,
-                    custo_unitario,
-                    ultima_entrada
-                FROM sqlite_db.saldo_custo_entrada
-            """).pl()
-            
-            # 2.2 Leitura Dinâmica do Cadastro de Produtos
-            # Verifica quais colunas existem para evitar erros se o banco mudar
-            try:
-                cols_db = [c[1] for c in conn.execute("PRAGMA table_info(sqlite_db.produtos_gerais)").fetchall()]
-                
-                # Mapeamento seguro de colunas
-                col_desc = "descricao_produto" if "descricao_produto" in cols_db else ("descricao" if "descricao" in cols_db else "''")
-                col_data = "CAST(data_cadastro AS DATE)" if "data_cadastro" in cols_db else "CAST('2000-01-01' AS DATE)"
-                col_ref = "ref_fornecedor" if "ref_fornecedor" in cols_db else "''"
-                
-                df_cadastro = conn.execute(f"""
-                    SELECT 
-                        CAST(cod_produto AS VARCHAR) as cod_produto,
-                        CAST(qtd_economica AS INTEGER) as lote_economico,
-                        marca,
-                        {col_desc} as descricao,
-                        {col_ref} as ref_fornecedor,
-                        ativo,
-                        {col_data} as data_cadastro
-                    FROM sqlite_db.produtos_gerais
-                """).pl()
-            except Exception as e:
-                guard.log(f"⚠️ Erro parcial ao ler cadastro: {e}. Usando estrutura de fallback.")
-                df_cadastro = pl.DataFrame(schema={
-                    "cod_produto": pl.Utf8, "lote_economico": pl.Int64, "marca": pl.Utf8,
-                    "descricao": pl.Utf8, "ref_fornecedor": pl.Utf8, "ativo": pl.Utf8,
-                    "data_cadastro": pl.Date
-                })
-        
-        # 2.3 Carregamento de Sazonalidade (Analytics)
-        indices_dict = {}
-        try:
-            analytics_path = PROJECT_ROOT / "data" / "analytics.duckdb"
-            if analytics_path.exists():
-                with db.get_connection() as conn:
-                    conn.execute(f"ATTACH '{analytics_path}' AS analytics")
-                    rows = conn.execute("SELECT mes, indice_sazonal FROM analytics.indices_sazonais").fetchall()
-                    conn.execute("DETACH analytics")
-                    for r in rows:
-                        indices_dict[r[0]] = r[1]
-        except Exception:
-            pass # Sazonalidade é opcional, segue sem erro crítico se falhar
-
-        # ==============================================================================
-        # 3. UNIFICAÇÃO DOS DADOS (O "BIG JOIN")
-        # ==============================================================================
-        guard.log("🔗 Cruzando tabelas (Join)...")
-        
-        # Cria um universo com todos os códigos de produto encontrados em qualquer tabela
-        df_universe = pl.concat([
-            df_xyz.select("cod_produto"),
-            df_saldo.select("cod_produto"),
-            df_cadastro.select("cod_produto")
-        ]).unique(subset="cod_produto")
-        
-        # Realiza os Left Joins para montar a tabela mestre
-        df_final = (df_universe
-            .join(df_xyz, on="cod_produto", how="left")
-            .join(df_abc, on="cod_produto", how="left")
-            .join(df_trend, on="cod_produto", how="left")
-            .join(df_saldo, on="cod_produto", how="left")
-            .join(df_cadastro, on="cod_produto", how="left"))
-        
-        # Garante que temos descrição
-        if "descricao" not in df_final.columns:
-            if "descricao_right" in df_final.columns:
-                df_final = df_final.rename({"descricao_right": "descricao"})
-            else:
-                df_final = df_final.with_columns(pl.lit("SEM DESCRIÇÃO").alias("descricao"))
-        
-        # ==============================================================================
-        # 4. TRATAMENTO E HIGIENIZAÇÃO DE DADOS
-        # ==============================================================================
-        
-        # Recupera Lead Time do Config
-        lead_time_padrao = config_mgr.parametros.lead_time.padrao_dias
-        if isinstance(lead_time_padrao, dict):
-            lead_time_padrao = lead_time_padrao.get('padrao_dias', 10)
-            
-        # 4.1 Preenchimento de Nulos (FillNA) - Bloco Expandido para Clareza
-        df_final = df_final.with_columns([
-            # Métricas de Venda
-            pl.col("media_venda_dia").fill_null(0.0),
-            pl.col("std_venda_dia").fill_null(0.0),
-            pl.col("dias_sem_venda").fill_null(0).alias("dias_sem_venda"),
-            
-            # Dados Financeiros/Logísticos
-            pl.col("saldo_estoque").fill_null(0),
-            pl.col("saldo_oc").fill_null(0),
-            pl.col("custo_unitario").fill_null(0.0),
-            
-            # Classificações
-            pl.col("curva_abc").fill_null("C"),
-            pl.col("curva_xyz").fill_null("Z"),
-            
-            # Cadastro
-            pl.col("marca").fill_null("N/D"),
-            pl.col("descricao").fill_null("DESCRIÇÃO NÃO ENCONTRADA"),
-            pl.col("ref_fornecedor").fill_null(""),
-            pl.col("lote_economico").fill_null(1).map_elements(lambda x: max(1, x), return_dtype=pl.Int64),
-            pl.col("ativo").fill_null("SIM"),
-            pl.col("data_cadastro").fill_null(pl.lit(datetime(2000,1,1)).cast(pl.Date)),
-            
-            # Parâmetro Global
-            pl.lit(lead_time_padrao).alias("lead_time_dias"),
-        ])
+        # Reaproveitada de data/cache quando as seções de SECOES_BASE, a data de
+        # referência, o uso da margem no score e os bancos de origem não mudaram.
+        chave_base = valores_base(config_achatado, config_mgr.pesos_score, data_referencia)
+        df_final = cache.carregar("base", chave_base)
+        if df_final is None:
+            df_final = montar_base(db, config_mgr, guard, data_referencia, args.as_of, args.validacao, progresso)
+            cache.gravar("base", chave_base, df_final)
+        else:
+            guard.log("♻️ Base de cálculo reaproveitada do cache (classificações e ERP inalterados)")
 
-        # 4.2 Detecção de Anomalias (Cria alertas visuais no Excel)
-        df_final = df_final.with_columns([
-            pl.when(pl.col("saldo_estoque") < 0)
-            .then(pl.lit("ESTOQUE NEGATIVO"))
-            .when(pl.col("saldo_oc") < 0)
-            .then(pl.lit("OC NEGATIVA (ERRO ERP)"))
-            .otherwise(None)
-            .alias("alerta_dados")
-        ])
+        # Sazonalidade (Analytics)
+        indices_dict = carregar_indices_sazonais(db)
 
-        # 4.3 Validação Estrutural (Pandera) - Opcional mas Recomendado
-        if InputCalcSchema:
-            guard.log("🛡️ Validando integridade estrutural dos dados...")
-            try:
-                df_final = InputCalcSchema.validate(df_final)
-            except SchemaError as e:
-                guard.log(f"❌ ERRO DE VALIDAÇÃO: {e.schema.name if e.schema else 'Global'}")
-                sys.exit(1)
-
-        # 4.4 Sanitização Final de Negócios (Remove caracteres estranhos, espaços, etc)
-        guard.log("🧹 Aplicando Sanitização de Negócios...")
-        df_final = sanear_dados_dataframe(df_final)
-        
         # ==============================================================================
         # 5. MOTOR MATEMÁTICO (CÁLCULO DE SUGESTÃO)
         # ==============================================================================
         guard.log("🧮 Executando Motor Matemático de Reposição...")
+        progresso.etapa("motor", 50, df_final.height)
         
-        # 5.1 Prepara Sazonalidade
-        df_final = df_final.with_columns([pl.col("media_venda_dia").alias("media_venda_base")])
-        df_final = EstoqueMath.aplicar_sazonalidade_projetada(df_final, indices_dict)
-        df_final = df_final.with_columns([
-            pl.col("fator_sazonal_projetado").alias("fator_sazonal"),
-            (pl.col("media_venda_base") * pl.col("fator_sazonal_projetado")).alias("media_venda_dia")
-        ])
-        
-        # 5.2 Cria DataFrame Matemático (Temporário)
-        # Removemos OC negativa apenas para o cálculo, para não distorcer a conta.
-        # No Excel final, o valor original negativo aparecerá com alerta.
-        df_math = df_final.with_columns([pl.col("saldo_oc").clip(lower_bound=0)])
-        
-        # 5.3 Pipeline de Cálculo
-        df_math = EstoqueMath.calcular_tendencias(df_math)
-        df_math = EstoqueMath.calcular_seguranca(df_math, config_mgr.parametros)
-        df_math = EstoqueMath.calcular_necessidades(df_math, config_mgr.parametros)
-        df_math = EstoqueMath.aplicar_lote_economico(df_math, config_mgr.parametros)
-        df_math = EstoqueMath.calcular_score(df_math)
-        df_math = EstoqueMath.gerar_diagnostico(df_math, config_mgr.parametros)
-        
-        # 5.4 Mesclagem dos Resultados
+        # 5.1 Registro de Regras (sazonalidade -> tendências -> segurança -> necessidades
+        #     -> lote -> score -> diagnóstico), ordenado pelas colunas declaradas
+        motor_regras = RuleRegistry.padrao(indices_dict, score_engine, data_referencia)
+
+        # 5.2 Colunas produzidas pelo motor
+        cols_sazonais = ["media_venda_base", "fator_sazonal_projetado", "fator_sazonal", "media_venda_dia"]
         cols_calculadas = [
             "tendencia_vendas", "tendencia_clientes", "perfil_cliente", 
             "estoque_seguranca", "fator_z",                             
@@ -261,12 +389,88 @@ def main():
             "score",                                                    
             "validacao_giro", "motivo_bloqueio",                        
             "calculado_mas_bloqueado", "status_diagnostico", 
-            "cobertura_virtual_meses", "sugestao_calculada"
+            "cobertura_virtual_meses", "sugestao_calculada",
+            "risco_dependencia"
         ]
+
+        # 5.3 Pipeline de Cálculo: só as regras necessárias, fundidas em um único plano lazy.
+        #     Se só parâmetros do motor mudaram desde a última execução (mesma base),
+        #     refaz apenas as regras afetadas sobre o resultado anterior em cache.
+        valores_motor = {**StageCache.selecionar(config_achatado, motor_regras.secoes_config),
+                         "sazonalidade.indices": indices_dict, "_base": chave_base}
+        alteradas = cache.diferenca("motor", valores_motor)
+        if alteradas == []:
+            guard.log("♻️ Motor matemático reaproveitado do cache (nenhum parâmetro alterado)")
+            df_math = cache.ultimo("motor")[0]
+        else:
+            if alteradas:
+                regras = [r.nome for r in motor_regras.afetadas(alteradas)]
+                guard.log(f"♻️ Parâmetros alterados: {', '.join(alteradas)} -> recalculando {', '.join(regras)}")
+                df_math = motor_regras.recalcular(cache.ultimo("motor")[0], config_mgr.parametros, alteradas,
+                                                  particoes, pasta_spill / "motor")
+            else:
+                # Removemos OC negativa apenas para o cálculo, para não distorcer a conta.
+                # No Excel final, o valor original negativo aparecerá com alerta.
+                df_math = df_final.with_columns([pl.col("saldo_oc").clip(lower_bound=0)])
+                df_math = motor_regras.executar(df_math, config_mgr.parametros, cols_sazonais + cols_calculadas,
+                                                particoes, pasta_spill / "motor")
+            cache.gravar("motor", valores_motor, df_math)
         
-        df_final = df_final.with_columns(df_math.select(cols_calculadas))
+        # 5.4 Mesclagem dos Resultados
+        df_final = df_final.with_columns(df_math.select(cols_sazonais + cols_calculadas))
         
-        # 5.5 KPI Final de Posição
+        # 5.5 Orçamento de Compra (Opcional): corta lotes de menor valor por real até caber no orçamento
+        progresso.etapa("orcamento_pedidos", 70, df_final.height)
+        cfg_orcamento = config_mgr.parametros.orcamento
+        if cfg_orcamento.get("ativada", False):
+            grupo_orc = cfg_orcamento.get("agrupar_por", "marca")
+            guard.log(f"💰 Aplicando orçamento por {grupo_orc}...")
+            resultado_orc = BudgetOptimizer.otimizar(df_final, cfg_orcamento)
+            df_final = resultado_orc["df"].with_columns([
+                pl.col("sugestao_final").alias("sugestao_pre_orcamento"),
+                pl.col("sugestao_orcamento").alias("sugestao_final"),
+                pl.col("subtotal_orcamento").alias("subtotal"),
+                pl.when((pl.col("corte_orcamento") > 0) & (pl.col("motivo_bloqueio") == ""))
+                .then(pl.format("ORÇAMENTO: corte de {} un", pl.col("corte_orcamento")))
+                .otherwise(pl.col("motivo_bloqueio")).alias("motivo_bloqueio")
+            ])
+
+            for row in resultado_orc["impacto"].iter_rows(named=True):
+                if row["linhas_cortadas"] > 0:
+                    guard.log(f"   {row[grupo_orc]}: R$ {row['valor_sugerido']:,.2f} -> "
+                              f"R$ {row['valor_aprovado']:,.2f} | Serviço {row['nivel_servico_antes']:.1%} -> "
+                              f"{row['nivel_servico_depois']:.1%}")
+
+            pasta_cortes = PROJECT_ROOT / "data" / "exports"
+            pasta_cortes.mkdir(parents=True, exist_ok=True)
+            arquivo_cortes = pasta_cortes / f"cortes_orcamento_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+            resultado_orc["cortes"].write_csv(arquivo_cortes, separator=";")
+            guard.log(f"✂️ Lista de cortes do orçamento: {arquivo_cortes}")
+
+        # 5.5.1 Consolidação de Pedidos por Fornecedor (Opcional): mínimo e frete grátis
+        cfg_pedido = config_mgr.parametros.pedido
+        if cfg_pedido.get("ativada", False):
+            grupo_ped = cfg_pedido.get("agrupar_por", "marca")
+            guard.log(f"📦 Consolidando pedidos por {grupo_ped}...")
+            # Antecipação para frete grátis limitada à sobra do orçamento (5.5)
+            resultado_ped = POConsolidator.consolidar(df_final, cfg_pedido, cfg_orcamento)
+            df_final = resultado_ped["df"]
+
+            for row in resultado_ped["pedidos"].iter_rows(named=True):
+                if row["status_pedido"] == "ABAIXO DO MÍNIMO" or row["valor_antecipado"] > 0:
+                    guard.log(f"   {row[grupo_ped]}: R$ {row['valor_total']:,.2f} | {row['status_pedido']} "
+                              f"| antecipado R$ {row['valor_antecipado']:,.2f}")
+
+            # Um arquivo por fornecedor (partition_by: uma passada sobre as linhas)
+            pasta_pedidos = PROJECT_ROOT / "data" / "exports" / f"pedidos_{datetime.now().strftime('%Y%m%d_%H%M')}"
+            pasta_pedidos.mkdir(parents=True, exist_ok=True)
+            resultado_ped["pedidos"].write_csv(pasta_pedidos / "_resumo_pedidos.csv", separator=";")
+            for (fornecedor,), df_pedido in resultado_ped["itens"].partition_by(grupo_ped, as_dict=True).items():
+                nome = re.sub(r"[^\w\-]+", "_", str(fornecedor)).strip("_") or "SEM_FORNECEDOR"
+                df_pedido.write_csv(pasta_pedidos / f"pedido_{nome}.csv", separator=";")
+            guard.log(f"🧾 Pedidos por fornecedor: {pasta_pedidos}")
+
+        # 5.6 KPI Final de Posição
         df_final = df_final.with_columns([
             (pl.col("saldo_estoque") + pl.col("saldo_oc") + pl.col("sugestao_final")).alias("meta_pos_compra")
         ])
@@ -275,10 +479,15 @@ def main():
         # 6. PÓS-PROCESSAMENTO, ESTATÍSTICAS E EXPORTAÇÃO
         # ==============================================================================
         
+        progresso.etapa("estatisticas", 80, df_final.height)
+
         # 6.1 Aplicação de Filtro de Marca
         if args.marca and args.marca != "TODAS":
             guard.log(f"🔎 Filtrando relatório para marca: {args.marca}")
             df_final = df_final.filter(pl.col("marca") == args.marca)
+
+        # 6.1.1 Ranking de Prioridade (top_n > 0 -> seleção parcial, sem ordenar o catálogo todo)
+        df_final = score_engine.ranquear(df_final)
         
         # -------------------------------------------------------------------------
         # 6.2 CÁLCULO DE TOTAIS GERAIS (Necessário para Porcentagens)
@@ -343,9 +552,18 @@ def main():
         
         df_compra = df_final.filter(pl.col("sugestao_final") > 0)
         
+        # Relatório da base usada (recalculado ou reaproveitado do cache)
+        try:
+            with open(ARQUIVO_QUALIDADE, 'r', encoding='utf-8') as f:
+                qualidade_dados = json.load(f)
+            qualidade_dados["regras"] = [r for r in qualidade_dados["regras"] if r["ocorrencias"]]
+        except Exception:
+            qualidade_dados = {}
+
         # PAYLOAD COMPLETO PARA O DASHBOARD (JSON)
         stats_payload = {
             # Gerais
+            "data_referencia": data_referencia.isoformat(),
             "total_valor": val_compra_total,
             "total_skus": len(df_compra),
             "total_pecas": df_compra["sugestao_final"].sum(),
@@ -358,22 +576,40 @@ def main():
             "obs_pct_valor": pct_obs_valor,
             "obs_skus": obs_skus,
             "obs_pct_skus": pct_obs_skus,
-            "obs_pecas": obs_pecas
+            "obs_pecas": obs_pecas,
+
+            # Qualidade de dados da base (regras com ocorrência)
+            "qualidade_dados": qualidade_dados
         }
         
+        # 6.4.1 Snapshot Arrow IPC do df_final (launcher, auditor e re-export leem sem recalcular)
+        try:
+            cfg_execucao = config_mgr.parametros.execucao
+            snapshot = RunSnapshot(PROJECT_ROOT / "data" / "cache" / "snapshots",
+                                   int(cfg_execucao.get("snapshots_manter", 10))).gravar(
+                df_final, config_achatado, data_referencia,
+                marca=args.marca, simulacao=args.simulacao, modo_execucao=modo_execucao
+            )
+            stats_payload["snapshot_run_id"] = snapshot["run_id"]
+            guard.log(f"📦 Snapshot da execução: {snapshot['arquivo']} ({snapshot['linhas']} linhas)")
+        except Exception as e:
+            guard.log(f"⚠️ Snapshot não gravado: {e}", nivel="WARNING")
+
         # Envia para o Frontend via arquivo seguro
         reporter.salvar_stats(stats_payload)
+        progresso.stats(stats_payload)
         guard.log(f"✅ Estatísticas calculadas e enviadas ao Dashboard.")
         
         # 6.5 Exportação Excel e Histórico
         if not args.simulacao:
             guard.log("📑 Gerando relatório Excel detalhado...")
+            progresso.etapa("excel", 90, df_final.height)
             exporter = ExcelExporter(PROJECT_ROOT / "data" / "exports")
             
             # Ordenação inteligente: Primeiro os problemas (Alertas), depois os Melhores (Score)
-            df_final = df_final.sort(["alerta_dados", "score"], descending=[True, True])
+            df_final = ExcelExporter.ordenar(df_final)
             
-            arquivo = exporter.exportar_sugestao(df_final)
+            arquivo = exporter.exportar_sugestao(df_final, streaming=baixa_memoria)
             guard.log(f"✅ Relatório disponível em: {arquivo}")
             
             if recorder:
@@ -382,17 +618,22 @@ def main():
                     "marca": args.marca,
                     "usuario": "Usuario_Padrao",
                     "stats": stats_payload,
-                    "config": config_mgr.parametros.model_dump()
+                    "config": config_mgr.parametros.model_dump(),
+                    "data_referencia": data_referencia
                 }
                 recorder.gravar_snapshot(df_final, contexto)
         
         guard.log("🏁 Processamento concluído com sucesso!")
+        progresso.etapa("concluido", 100, df_final.height)
+        progresso.fim(0)
         
     except Exception as e:
-        guard.log(f"❌ ERRO CRÍTICO DURANTE EXECUÇÃO: {e}")
+        guard.log(f"❌ ERRO CRÍTICO DURANTE EXECUÇÃO: {e}", nivel="ERROR")
         traceback.print_exc()
+        progresso.fim(1)
         sys.exit(1)
     finally:
+        progresso.fechar()
         db.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+import sys
+import argparse
+from pathlib import Path
+import polars as pl
+
+# Configuração de Caminhos
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+from compras_sistema.data_engine.run_snapshot import RunSnapshot
+from compras_sistema.export.excel_exporter import ExcelExporter
+
+def main():
+    """
+    Gera o Excel de uma execução a partir do snapshot Arrow (data/cache/snapshots),
+    sem reler o banco nem rodar o motor. Útil para regerar a planilha de uma
+    simulação já feita ou de uma execução antiga.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--run-id", dest="run_id", default=None, help="Execução a exportar (padrão: a mais recente)")
+    parser.add_argument("--marca", type=str, default="TODAS", help="Filtrar a planilha por marca")
+    parser.add_argument("--streaming", action="store_true", help="Grava o Excel em streaming (pouca memória)")
+    parser.add_argument("--listar", action="store_true", help="Lista os snapshots disponíveis e sai")
+    args = parser.parse_args()
+
+    snapshots = RunSnapshot(PROJECT_ROOT / "data" / "cache" / "snapshots")
+
+    if args.listar:
+        for m in snapshots.listar():
+            print(f"{m['run_id']} | ref {m['data_referencia']} | marca {m.get('marca', 'TODAS')} | "
+                  f"{m['linhas']} linhas | config {m['config_hash']}")
+        return
+
+    manifesto = snapshots.manifesto(args.run_id)
+    if manifesto is None:
+        print(f"❌ Snapshot não encontrado (run_id={args.run_id or 'último'}). Rode gerar_relatorio_final.py antes.")
+        sys.exit(1)
+
+    df = snapshots.scan(manifesto["run_id"])
+    if args.marca != "TODAS":
+        df = df.filter(pl.col("marca") == args.marca)
+    df = ExcelExporter.ordenar(df.collect())
+
+    nome = f"sugestao_compras_{manifesto['run_id']}.xlsx"
+    arquivo = ExcelExporter(PROJECT_ROOT / "data" / "exports").exportar_sugestao(df, nome, streaming=args.streaming)
+    print(f"✅ Excel da execução {manifesto['run_id']} (ref {manifesto['data_referencia']}): {arquivo}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import sys
+import argparse
+from pathlib import Path
+from datetime import date, datetime
+import polars as pl
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT / "src"))
+
+from compras_sistema.core.config import ConfigManager
+from compras_sistema.data_engine.duckdb_manager import DuckDBManager
+from compras_sistema.data_engine.backtest_engine import BacktestEngine
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest de previsão sobre o histórico de execuções")
+    parser.add_argument("--horizonte", type=int, default=30, help="Dias de venda realizada avaliados após cada execução")
+    parser.add_argument("--metodos", type=str, default=",".join(BacktestEngine.METODOS),
+                        help="Lista separada por vírgula: " + ",".join(BacktestEngine.METODOS))
+    parser.add_argument("--as-of", dest="as_of", type=date.fromisoformat, default=None,
+                        help="Data de referência (AAAA-MM-DD): só avalia execuções com janela completa até ela")
+    args = parser.parse_args()
+
+    print("--- 🎯 BACKTEST DE PREVISÃO ---")
+
+    config_mgr = ConfigManager()
+    config_mgr.load_configs(PROJECT_ROOT / "config")
+
+    db = DuckDBManager()
+    db.initialize(PROJECT_ROOT / "data" / "vendas.db")
+
+    try:
+        metodos = tuple(m.strip().upper() for m in args.metodos.split(",") if m.strip())
+        engine = BacktestEngine(db, PROJECT_ROOT / "data" / "analytics.duckdb", args.horizonte, args.as_of)
+        resultado = engine.run(metodos, config_mgr.parametros.previsao)
+
+        if not resultado:
+            print("⚠️ Nenhuma execução com janela de avaliação completa no histórico.")
+            return
+
+        with pl.Config(tbl_rows=50, tbl_cols=12):
+            print("\n📊 Resumo por Método:")
+            print(resultado["metodo"])
+            print("\n📊 Por Curva ABC:")
+            print(resultado["curva_abc"])
+
+        saida = PROJECT_ROOT / "data" / "exports" / f"backtest_{datetime.now().strftime('%Y%m%d_%H%M')}"
+        saida.mkdir(parents=True, exist_ok=True)
+        for nome, df in resultado.items():
+            df.write_parquet(saida / f"metricas_{nome}.parquet")
+        print(f"\n✅ Métricas completas (SKU/Marca) salvas em: {saida}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
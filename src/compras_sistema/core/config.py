@@ -31,7 +31,7 @@ class ParametrosConfig(BaseModel):
     abc: Dict[str, float]
     tolerancia_abc: Dict[str, float]
     lote: LoteConfig
-    outlier: Dict[str, float]
+    outlier: Dict[str, Any]
     
     # [CORREÇÃO 1] Mudado para float para aceitar 0.05
     giro: Dict[str, float]  
@@ -43,6 +43,24 @@ class ParametrosConfig(BaseModel):
     # [CORREÇÃO 2] Adicionado para suportar a Fase 2 (Fator Z)
     # Usamos Any para permitir flexibilidade na estrutura interna
     estoque: Dict[str, Any] = Field(default_factory=dict)
+
+    # Motores de previsão opcionais (intermitente / suavização)
+    previsao: Dict[str, Any] = Field(default_factory=dict)
+
+    # Curva ABC multicritério opcional (faturamento/quantidade/frequência/margem)
+    abc_multicriterio: Dict[str, Any] = Field(default_factory=dict)
+
+    # Orçamento de compra por marca/fornecedor (BudgetOptimizer)
+    orcamento: Dict[str, Any] = Field(default_factory=dict)
+
+    # Consolidação de pedidos por fornecedor (POConsolidator)
+    pedido: Dict[str, Any] = Field(default_factory=dict)
+
+    # Modo de execução (normal / baixa memória) escolhido pelo SystemGuard
+    execucao: Dict[str, Any] = Field(default_factory=dict)
+
+    # Recursos do DuckDB (threads, memória, spill, profiling); 'auto' = pela máquina
+    duckdb: Dict[str, Any] = Field(default_factory=dict)
     
     @classmethod
     def from_yaml(cls, path: Path) -> "ParametrosConfig":
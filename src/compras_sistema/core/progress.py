@@ -0,0 +1,139 @@
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class ProgressEmitter:
+    """
+    Canal de progresso do motor para o launcher (JSON lines via socket localhost).
+
+    O launcher abre um ProgressServer, passa a porta em --progresso-porta e
+    recebe um evento por linha, em vez de raspar o stdout:
+        {"tipo": "etapa", "etapa": "motor", "percentual": 60, "linhas": 12345, "decorrido_s": 3.2}
+        {"tipo": "log",   "nivel": "INFO", "mensagem": "...", "decorrido_s": 3.3}
+        {"tipo": "stats", "dados": {...}}                  (mesmo payload do last_run_stats.json)
+        {"tipo": "fim",   "codigo": 0, "decorrido_s": 42.0}
+    Sem porta (execução pelo terminal/agendador) todos os métodos são no-op.
+    Falha de envio nunca derruba o processamento: o canal é desligado.
+    """
+
+    def __init__(self, porta: Optional[int] = None, host: str = "127.0.0.1"):
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        self._sock = None
+        if porta:
+            try:
+                self._sock = socket.create_connection((host, int(porta)), timeout=5)
+            except OSError:
+                self._sock = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._sock is not None
+
+    def _enviar(self, evento: Dict[str, Any]) -> None:
+        if self._sock is None:
+            return
+        evento["decorrido_s"] = round(time.perf_counter() - self.inicio, 3)
+        linha = (json.dumps(evento, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            try:
+                self._sock.sendall(linha)
+            except OSError:
+                self.fechar()
+
+    def etapa(self, nome: str, percentual: float, linhas: Optional[int] = None) -> None:
+        self._enviar({"tipo": "etapa", "etapa": nome, "percentual": percentual, "linhas": linhas})
+
+    def log(self, mensagem: str, nivel: str = "INFO") -> None:
+        self._enviar({"tipo": "log", "nivel": nivel, "mensagem": mensagem})
+
+    def stats(self, dados: Dict[str, Any]) -> None:
+        self._enviar({"tipo": "stats", "dados": dados})
+
+    def fim(self, codigo: int = 0) -> None:
+        self._enviar({"tipo": "fim", "codigo": codigo})
+        self.fechar()
+
+    def fechar(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def handler(self) -> logging.Handler:
+        """Handler de logging: cada guard.log() também vira um evento 'log'."""
+        emissor = self
+
+        class _ProgressHandler(logging.Handler):
+            def emit(self, record):
+                emissor.log(record.getMessage(), record.levelname)
+
+        return _ProgressHandler()
+
+
+class ProgressServer:
+    """
+    Lado do launcher: escuta em 127.0.0.1 (porta livre escolhida pelo SO),
+    aceita a conexão do motor e coloca cada evento decodificado em 'eventos'
+    (queue.Queue), para a GUI drenar em lote no próprio ritmo.
+    """
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.eventos: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._servidor.bind((host, 0))
+        self._servidor.listen(1)
+        self.porta = self._servidor.getsockname()[1]
+        self._thread = threading.Thread(target=self._receber, daemon=True)
+        self._thread.start()
+
+    def _receber(self) -> None:
+        try:
+            conexao, _ = self._servidor.accept()
+        except OSError:
+            return  # fechar() antes do motor conectar
+        with conexao, conexao.makefile("r", encoding="utf-8") as linhas:
+            for linha in linhas:
+                try:
+                    self.eventos.put(json.loads(linha))
+                except ValueError:
+                    continue
+        self.eventos.put({"tipo": "desconectado"})
+
+    def drenar(self, maximo: int = 10_000) -> list:
+        """Todos os eventos pendentes (até 'maximo') sem bloquear."""
+        lote = []
+        try:
+            while len(lote) < maximo:
+                lote.append(self.eventos.get_nowait())
+        except queue.Empty:
+            pass
+        return lote
+
+    def aguardar(self, tipo: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Bloqueia até um evento do tipo pedido (ou a conexão cair). Para scripts sem GUI."""
+        while True:
+            try:
+                evento = self.eventos.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if evento.get("tipo") == tipo:
+                return evento
+            if evento.get("tipo") == "desconectado":
+                return None
+
+    def esperar_desconexao(self, timeout: Optional[float] = 5.0) -> None:
+        """Depois que o motor terminar: espera a leitura chegar ao fim do fluxo (EOF)."""
+        self._thread.join(timeout)
+
+    def fechar(self) -> None:
+        try:
+            self._servidor.close()
+        except OSError:
+            pass
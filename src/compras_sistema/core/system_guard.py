@@ -24,24 +24,40 @@ class SystemGuard:
         )
         self.logger = logging.getLogger("MRP_Guard")
 
-    def log(self, message):
-        self.logger.info(message)
+    def log(self, message, nivel: str = "INFO"):
+        """Registra no nível indicado (INFO, WARNING, ERROR): o filtro de nível do dashboard depende dele."""
+        self.logger.log(getattr(logging, nivel.upper(), logging.INFO), message)
 
-    def check_memory(self, min_mb=500):
+    def memoria_disponivel_mb(self) -> float:
+        return psutil.virtual_memory().available / (1024 * 1024)
+
+    def check_memory(self, min_mb=500) -> bool:
         """
         Verifica se há memória RAM disponível suficiente.
-        Se houver menos que 'min_mb', avisa ou aborta.
+        Se houver menos que 'min_mb', avisa e devolve False.
         """
-        mem = psutil.virtual_memory()
-        available_mb = mem.available / (1024 * 1024)
+        available_mb = self.memoria_disponivel_mb()
         
         self.logger.info(f"RAM Disponível: {available_mb:.0f} MB")
 
         if available_mb < min_mb:
             self.logger.warning(f"⚠️ PERIGO: Memória crítica! Apenas {available_mb:.0f}MB livres.")
             self.logger.warning("⚠️ Feche o navegador (Chrome/Firefox) imediatamente.")
-            # Opcional: input("Pressione Enter quando liberar memória...") 
-            # No seu caso, vamos apenas logar o perigo.
+            return False
+        return True
+
+    def escolher_modo_execucao(self, config_execucao: dict | None = None) -> str:
+        """
+        'normal' ou 'baixa_memoria' (seção 'execucao' do parametros.yaml).
+        modo 'auto' decide pela RAM livre: abaixo de limite_memoria_mb entra em
+        baixa memória (partições + spill em disco + Excel em streaming).
+        """
+        config_execucao = config_execucao or {}
+        modo = str(config_execucao.get("modo", "auto")).lower()
+        if modo in ("normal", "baixa_memoria"):
+            return modo
+        limite = float(config_execucao.get("limite_memoria_mb", 1500))
+        return "normal" if self.check_memory(limite) else "baixa_memoria"
 
     def log_performance(self, task_name, start_time):
         elapsed = (datetime.now() - start_time).total_seconds()
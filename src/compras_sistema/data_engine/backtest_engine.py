@@ -0,0 +1,245 @@
+import polars as pl
+from pathlib import Path
+from datetime import date
+import structlog
+
+from compras_sistema.rule_engine.forecast.intermittent_forecaster import IntermittentForecaster
+from compras_sistema.rule_engine.forecast.smoothing_forecaster import SmoothingForecaster
+
+logger = structlog.get_logger(__name__)
+
+class BacktestEngine:
+    """
+    Backtesting de Previsão usando os snapshots do HistoryRecorder.
+
+    Para cada execução gravada em historico_execucoes/historico_detalhes,
+    compara a demanda prevista (por vários métodos) com a venda REALIZADA
+    nos N dias seguintes à execução.
+
+    Métodos comparados (coluna 'metodo'):
+        SUGERIDO    -> media_venda_dia gravada no snapshot (o que o sistema usou)
+        MEDIA_365D  -> média simples dos 365 dias anteriores à execução
+        SAZONAL     -> MEDIA_365D x índice sazonal do mês da janela avaliada
+        SUAVIZACAO  -> SmoothingForecaster (SES/Holt/Holt-Winters)
+        CROSTON     -> IntermittentForecaster (Croston/SBA/TSB)
+
+    Médias e realizado de todas as execuções saem de UMA consulta com range
+    join no DuckDB; os motores de previsão rodam em lote (todos os SKUs) uma
+    vez por data de execução distinta.
+    """
+
+    METODOS = ("SUGERIDO", "MEDIA_365D", "SAZONAL", "SUAVIZACAO", "CROSTON")
+
+    def __init__(self, db_manager, history_db_path: Path = Path("data/analytics.duckdb"),
+                 horizonte_dias: int = 30, data_referencia: date | None = None):
+        self.db = db_manager
+        self.history_db_path = history_db_path
+        self.horizonte_dias = horizonte_dias
+        # Só entram execuções cuja janela de avaliação termina até esta data
+        self.data_referencia = data_referencia or date.today()
+
+    # ------------------------------------------------------------------
+    # Carga (vetorizada sobre todas as execuções)
+    # ------------------------------------------------------------------
+    def carregar_base(self) -> pl.DataFrame:
+        """
+        Uma linha por (execução, SKU) com snapshot, marca, média 365d anterior
+        e venda realizada na janela (data_ref, data_ref + horizonte].
+        """
+        h = int(self.horizonte_dias)
+        query = f"""
+            WITH execucoes AS (
+                SELECT id_execucao, data_referencia as data_ref
+                FROM hist.historico_execucoes
+                WHERE data_referencia + INTERVAL '{h} days' <= CAST($data_referencia AS DATE)
+            ),
+            detalhes AS (
+                SELECT d.id_execucao, e.data_ref, CAST(d.cod_produto AS VARCHAR) as cod_produto,
+                       d.curva_abc, d.media_venda_dia, d.saldo_estoque, d.saldo_oc, d.sugestao_final
+                FROM hist.historico_detalhes d
+                JOIN execucoes e USING (id_execucao)
+            ),
+            vendas_dia AS (
+                SELECT CAST(cod_produto AS VARCHAR) as cod_produto,
+                       CAST(data_movimento AS DATE) as data,
+                       CAST(SUM(quantidade) AS DOUBLE) as qtd
+                FROM sqlite_db.vendas
+                WHERE CAST(data_movimento AS DATE) > (SELECT MIN(data_ref) FROM execucoes) - INTERVAL '365 days'
+                GROUP BY 1, 2
+            ),
+            janelas AS (
+                SELECT e.id_execucao, v.cod_produto,
+                       SUM(CASE WHEN v.data > e.data_ref THEN v.qtd ELSE 0 END) as realizado,
+                       SUM(CASE WHEN v.data <= e.data_ref THEN v.qtd ELSE 0 END) / 365.0 as media_365d
+                FROM execucoes e
+                JOIN vendas_dia v
+                  ON v.data > e.data_ref - INTERVAL '365 days'
+                 AND v.data <= e.data_ref + INTERVAL '{h} days'
+                GROUP BY 1, 2
+            )
+            SELECT d.*,
+                   COALESCE(p.marca, 'N/D') as marca,
+                   COALESCE(j.realizado, 0.0) as realizado,
+                   COALESCE(j.media_365d, 0.0) as media_365d
+            FROM detalhes d
+            LEFT JOIN janelas j USING (id_execucao, cod_produto)
+            LEFT JOIN (
+                SELECT CAST(cod_produto AS VARCHAR) as cod_produto, MAX(marca) as marca
+                FROM sqlite_db.produtos_gerais GROUP BY 1
+            ) p USING (cod_produto)
+        """
+        with self.db.get_connection() as conn:
+            conn.execute(f"ATTACH '{self.history_db_path}' AS hist (READ_ONLY)")
+            try:
+                return conn.execute(query, {"data_referencia": self.data_referencia}).pl()
+            finally:
+                conn.execute("DETACH hist")
+
+    def carregar_vendas_diarias(self, inicio: date, fim: date) -> pl.DataFrame:
+        """Série diária (cod_produto, data, qtd_dia) usada pelos motores de previsão."""
+        with self.db.get_connection() as conn:
+            return conn.execute("""
+                SELECT CAST(cod_produto AS VARCHAR) as cod_produto,
+                       CAST(data_movimento AS DATE) as data,
+                       CAST(SUM(quantidade) AS DOUBLE) as qtd_dia
+                FROM sqlite_db.vendas
+                WHERE CAST(data_movimento AS DATE) BETWEEN ? AND ?
+                GROUP BY 1, 2
+            """, [inicio, fim]).pl()
+
+    def carregar_indices_sazonais(self) -> dict:
+        """Índices mensais de analytics.indices_sazonais (vazio se não existir)."""
+        try:
+            with self.db.get_connection() as conn:
+                conn.execute(f"ATTACH '{self.history_db_path}' AS hist (READ_ONLY)")
+                try:
+                    rows = conn.execute("SELECT mes, indice_sazonal FROM hist.indices_sazonais").fetchall()
+                finally:
+                    conn.execute("DETACH hist")
+            return {int(m): float(i) for m, i in rows}
+        except Exception:
+            return {}
+
+    # ------------------------------------------------------------------
+    # Previsões por método (formato longo)
+    # ------------------------------------------------------------------
+    def gerar_previsoes(self, df_base: pl.DataFrame, metodos: tuple = METODOS,
+                        config_previsao: dict | None = None) -> pl.DataFrame:
+        """Empilha (id_execucao, cod_produto, metodo, previsao_dia) para os métodos pedidos."""
+        config_previsao = config_previsao or {}
+        chaves = ["id_execucao", "cod_produto"]
+        partes = []
+
+        if "SUGERIDO" in metodos:
+            partes.append(df_base.select(chaves + [pl.col("media_venda_dia").alias("previsao_dia")])
+                          .with_columns(pl.lit("SUGERIDO").alias("metodo")))
+        if "MEDIA_365D" in metodos:
+            partes.append(df_base.select(chaves + [pl.col("media_365d").alias("previsao_dia")])
+                          .with_columns(pl.lit("MEDIA_365D").alias("metodo")))
+        if "SAZONAL" in metodos:
+            indices = self.carregar_indices_sazonais()
+            mes_alvo = (pl.col("data_ref") + pl.duration(days=self.horizonte_dias // 2)).dt.month()
+            fator = mes_alvo.replace_strict(indices, default=1.0, return_dtype=pl.Float64) if indices else pl.lit(1.0)
+            partes.append(df_base.select(chaves + [(pl.col("media_365d") * fator).alias("previsao_dia")])
+                          .with_columns(pl.lit("SAZONAL").alias("metodo")))
+
+        motores = [m for m in ("SUAVIZACAO", "CROSTON") if m in metodos]
+        if motores and df_base.height > 0:
+            partes.extend(self._previsoes_motores(df_base, motores, config_previsao))
+
+        if not partes:
+            return pl.DataFrame(schema={"id_execucao": pl.Int64, "cod_produto": pl.Utf8,
+                                        "previsao_dia": pl.Float64, "metodo": pl.Utf8})
+        return pl.concat([p.select(chaves + ["metodo", "previsao_dia"]) for p in partes], how="vertical_relaxed")
+
+    def _previsoes_motores(self, df_base: pl.DataFrame, motores: list, config_previsao: dict) -> list:
+        """Roda os motores em lote, uma vez por data de execução distinta."""
+        cfg_suav = config_previsao.get("suavizacao", {})
+        cfg_int = config_previsao.get("intermitente", {})
+        meses_hist = int(cfg_suav.get("meses_historico", 36))
+
+        datas = df_base["data_ref"].unique().sort().to_list()
+        inicio = date(datas[0].year - (meses_hist // 12 + 1), 1, 1)
+        df_diario = self.carregar_vendas_diarias(inicio, datas[-1])
+        df_mensal = df_diario.group_by(
+            "cod_produto", pl.col("data").dt.truncate("1mo").alias("mes")
+        ).agg(pl.col("qtd_dia").sum().alias("qtd_mes"))
+
+        partes = []
+        for data_ref in datas:
+            df_exec = df_base.filter(pl.col("data_ref") == data_ref).select(["id_execucao", "cod_produto"])
+            skus = df_exec["cod_produto"].unique().to_list()
+
+            if "SUAVIZACAO" in motores:
+                df_prev = SmoothingForecaster.prever_polars(df_mensal, cfg_suav, skus=skus, data_referencia=data_ref)
+                partes.append(df_exec.join(df_prev.select(["cod_produto", pl.col("media_venda_dia").alias("previsao_dia")]),
+                                           on="cod_produto", how="left")
+                              .with_columns(pl.col("previsao_dia").fill_null(0.0), pl.lit("SUAVIZACAO").alias("metodo")))
+            if "CROSTON" in motores:
+                df_prev = IntermittentForecaster.prever_polars(df_diario, cfg_int, skus=skus, data_referencia=data_ref)
+                partes.append(df_exec.join(df_prev.select(["cod_produto", pl.col("media_venda_dia").alias("previsao_dia")]),
+                                           on="cod_produto", how="left")
+                              .with_columns(pl.col("previsao_dia").fill_null(0.0), pl.lit("CROSTON").alias("metodo")))
+        return partes
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    @staticmethod
+    def calcular_metricas(df_base: pl.DataFrame, df_previsoes: pl.DataFrame,
+                          horizonte_dias: int, agrupar_por: list[str]) -> pl.DataFrame:
+        """
+        Método Estático Puro: MAPE, WAPE, Viés e Fill Rate por grupo e método.
+
+            previsto  = previsao_dia * horizonte
+            WAPE      = Σ|previsto - realizado| / Σ realizado
+            MAPE      = média(|erro| / realizado) nas linhas com realizado > 0
+            Viés      = Σ(previsto - realizado) / Σ realizado
+            Fill Rate = Σ min(realizado, estoque + OC + sugestão) / Σ realizado
+                        (decisão efetivamente tomada: só no método SUGERIDO)
+        """
+        df = df_previsoes.join(
+            df_base.select(["id_execucao", "cod_produto", "curva_abc", "marca", "realizado",
+                            "saldo_estoque", "saldo_oc", "sugestao_final"]),
+            on=["id_execucao", "cod_produto"], how="left"
+        ).with_columns([
+            (pl.col("previsao_dia").fill_null(0.0) * horizonte_dias).alias("previsto"),
+            (pl.col("saldo_estoque").fill_null(0).clip(lower_bound=0) + pl.col("saldo_oc").fill_null(0).clip(lower_bound=0)
+             + pl.col("sugestao_final").fill_null(0)).alias("disponivel"),
+        ]).with_columns([
+            (pl.col("previsto") - pl.col("realizado")).alias("erro"),
+        ])
+
+        # Grupos sem venda realizada (SKU morto, marca parada no horizonte) ficam nulos, não inf/NaN
+        soma_real = pl.col("realizado").sum()
+        com_venda = soma_real > 0
+        return df.group_by(agrupar_por + ["metodo"]).agg([
+            pl.len().alias("observacoes"),
+            soma_real.alias("realizado"),
+            pl.col("previsto").sum().alias("previsto"),
+            pl.when(com_venda).then(pl.col("erro").abs().sum() / soma_real).otherwise(None).alias("wape"),
+            (pl.col("erro").abs() / pl.col("realizado")).filter(pl.col("realizado") > 0).mean().alias("mape"),
+            pl.when(com_venda).then(pl.col("erro").sum() / soma_real).otherwise(None).alias("vies"),
+            pl.when((pl.col("metodo").first() == "SUGERIDO") & com_venda)
+            .then(pl.min_horizontal("realizado", "disponivel").sum() / soma_real)
+            .otherwise(None).alias("fill_rate"),
+        ]).sort(agrupar_por + ["metodo"])
+
+    def run(self, metodos: tuple = METODOS, config_previsao: dict | None = None) -> dict[str, pl.DataFrame]:
+        """Executa o backtest completo e devolve as métricas por SKU, Curva e Marca."""
+        logger.info("backtest_iniciado", horizonte=self.horizonte_dias, metodos=list(metodos))
+
+        df_base = self.carregar_base()
+        if df_base.height == 0:
+            logger.warning("backtest_sem_execucoes_elegiveis")
+            return {}
+
+        df_prev = self.gerar_previsoes(df_base, metodos, config_previsao)
+        resultado = {
+            "metodo": self.calcular_metricas(df_base, df_prev, self.horizonte_dias, []),
+            "sku": self.calcular_metricas(df_base, df_prev, self.horizonte_dias, ["cod_produto"]),
+            "curva_abc": self.calcular_metricas(df_base, df_prev, self.horizonte_dias, ["curva_abc"]),
+            "marca": self.calcular_metricas(df_base, df_prev, self.horizonte_dias, ["marca"]),
+        }
+        logger.info("backtest_concluido", execucoes=df_base["id_execucao"].n_unique(), linhas=df_base.height)
+        return resultado
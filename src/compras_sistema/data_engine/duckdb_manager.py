@@ -1,4 +1,6 @@
 import duckdb
+import os
+import psutil
 from pathlib import Path
 from contextlib import contextmanager
 from threading import Lock
@@ -13,11 +15,68 @@ class DuckDBManager:
     Refatorado (Fase 1.3): Inclui Health Check para garantir integridade do banco.
     """
     
-    def __init__(self, memory_limit: str = "2GB", threads: int = 4):
-        self.memory_limit = memory_limit
-        self.threads = threads
+    def __init__(self, memory_limit: str | None = None, threads: int | None = None,
+                 temp_directory: Path | None = None, progress_bar: bool | None = None,
+                 profiling_dir: Path | None = None, fracao_memoria: float = 0.6):
+        # None = dimensionado pela máquina (núcleos disponíveis / RAM livre com folga)
+        self.memory_limit = memory_limit or self.memoria_automatica(fracao_memoria)
+        self.threads = threads or self.threads_automaticas()
+        # Pasta de spill: agregações maiores que memory_limit vão para disco em vez de falhar
+        self.temp_directory = temp_directory
+        # Barra de progresso só faz sentido em terminal; no launcher/agendador é overhead
+        self.progress_bar = sys.stdout.isatty() if progress_bar is None else progress_bar
+        # Pasta dos perfis JSON por consulta (None = profiling desligado)
+        self.profiling_dir = profiling_dir
+        self._etapa = None
+        self._consultas = 0
         self._conn = None
         self._lock = Lock()
+
+    @staticmethod
+    def threads_automaticas() -> int:
+        """Núcleos disponíveis para o processo (respeita affinity/cgroup quando o SO informa)."""
+        if hasattr(os, "sched_getaffinity"):
+            return max(1, len(os.sched_getaffinity(0)))
+        return max(1, os.cpu_count() or 1)
+
+    @staticmethod
+    def memoria_automatica(fracao_memoria: float = 0.6, minimo_mb: int = 256) -> str:
+        """
+        Fração da RAM disponível (psutil), deixando folga para o Polars e o SO.
+        Ex.: 8 GB livres e fração 0.6 -> '4915MB'.
+        """
+        disponivel_mb = psutil.virtual_memory().available / (1024 * 1024)
+        return f"{max(minimo_mb, int(disponivel_mb * fracao_memoria))}MB"
+
+    @classmethod
+    def from_config(cls, config_duckdb: dict | None = None, base_dir: Path | None = None) -> "DuckDBManager":
+        """
+        Constrói a partir da seção 'duckdb' do parametros.yaml.
+        'auto' (ou ausente) em threads/limite_memoria/barra_progresso usa o
+        dimensionamento automático; pastas relativas são resolvidas em base_dir.
+        """
+        config_duckdb = config_duckdb or {}
+
+        def _valor(chave):
+            valor = config_duckdb.get(chave)
+            return None if valor is None or str(valor).lower() == "auto" else valor
+
+        def _pasta(chave):
+            valor = config_duckdb.get(chave)
+            if not valor:
+                return None
+            pasta = Path(valor)
+            return pasta if pasta.is_absolute() or base_dir is None else Path(base_dir) / pasta
+
+        threads = _valor("threads")
+        return cls(
+            memory_limit=_valor("limite_memoria"),
+            threads=int(threads) if threads is not None else None,
+            temp_directory=_pasta("pasta_temporaria"),
+            progress_bar=_valor("barra_progresso"),
+            profiling_dir=_pasta("pasta_perfil") if config_duckdb.get("perfil_consultas", False) else None,
+            fracao_memoria=float(config_duckdb.get("fracao_memoria", 0.6)),
+        )
         
     def initialize(self, sqlite_path: Path):
         """
@@ -42,7 +101,10 @@ class DuckDBManager:
                 # Configurações de performance
                 self._conn.execute(f"SET memory_limit='{self.memory_limit}'")
                 self._conn.execute(f"SET threads TO {self.threads}")
-                self._conn.execute("SET enable_progress_bar=true")
+                self._conn.execute(f"SET enable_progress_bar={'true' if self.progress_bar else 'false'}")
+                if self.temp_directory is not None:
+                    Path(self.temp_directory).mkdir(parents=True, exist_ok=True)
+                    self._conn.execute(f"SET temp_directory='{Path(self.temp_directory).as_posix()}'")
                 
                 # 2. Attach SQLite (Federação)
                 logger.info("connecting_sqlite", path=str(sqlite_path))
@@ -53,7 +115,8 @@ class DuckDBManager:
                 # 3. HEALTH CHECK (A Blindagem Nova)
                 self._validar_tabelas_criticas()
                 
-                logger.info("duckdb_initialized_successfully")
+                logger.info("duckdb_initialized_successfully", memory_limit=self.memory_limit,
+                            threads=self.threads, progress_bar=self.progress_bar)
 
             except Exception as e:
                 # Se algo der errado, matamos a conexão para não deixar um objeto "zumbi"
@@ -97,7 +160,32 @@ class DuckDBManager:
         with self._lock:
             if self._conn is None:
                 raise RuntimeError("ERRO INTERNO: Tentativa de usar DuckDB sem inicialização (initialize() não foi chamado ou falhou).")
-            yield self._conn
+            yield _ConexaoPerfilada(self) if self._etapa else self._conn
+
+    @contextmanager
+    def perfilar(self, etapa: str):
+        """
+        Profiling por consulta de uma etapa do pipeline.
+        Cada conn.execute() dentro do bloco grava profiling_dir/<etapa>_NN.json
+        (PRAGMA enable_profiling='json'). Sem profiling_dir é um no-op.
+        """
+        if self.profiling_dir is None:
+            yield
+            return
+
+        Path(self.profiling_dir).mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._conn.execute("PRAGMA enable_profiling='json'")
+            self._etapa, self._consultas = etapa, 0
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.execute("PRAGMA disable_profiling")
+                logger.info("duckdb_profiling_saved", etapa=etapa, consultas=self._consultas,
+                            pasta=str(self.profiling_dir))
+                self._etapa = None
 
     def execute_query_file(self, query_file: Path) -> duckdb.DuckDBPyRelation:
         """Executa query SQL de arquivo."""
@@ -120,4 +208,21 @@ class DuckDBManager:
                     logger.warning("error_closing_connection", error=str(e))
                 finally:
                     self._conn = None
-                    logger.info("duckdb_closed")
\ No newline at end of file
+                    logger.info("duckdb_closed")
+
+
+class _ConexaoPerfilada:
+    """Proxy da conexão: direciona o perfil de cada execute() para um JSON próprio."""
+
+    def __init__(self, manager: DuckDBManager):
+        self._manager = manager
+        self._conn = manager._conn
+
+    def execute(self, query, *args, **kwargs):
+        self._manager._consultas += 1
+        destino = Path(self._manager.profiling_dir) / f"{self._manager._etapa}_{self._manager._consultas:02d}.json"
+        self._conn.execute(f"SET profiling_output='{destino.as_posix()}'")
+        return self._conn.execute(query, *args, **kwargs)
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
@@ -1,6 +1,6 @@
 import polars as pl
 import duckdb
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 import json
 import structlog
@@ -34,6 +34,7 @@ class HistoryRecorder:
                     CREATE TABLE IF NOT EXISTS historico_execucoes (
                         id_execucao INTEGER PRIMARY KEY DEFAULT nextval('seq_execucao_id'),
                         data_registro TIMESTAMP,
+                        data_referencia DATE,  -- Data "as_of" do cálculo (= dia de data_registro em execução normal)
                         marca_filtro VARCHAR,
                         usuario VARCHAR,
                         total_sugestao_valor DOUBLE,
@@ -42,6 +43,13 @@ class HistoryRecorder:
                     )
                 """)
 
+                # Bancos criados antes da coluna data_referencia: execuções antigas eram todas "ao vivo"
+                conn.execute("ALTER TABLE historico_execucoes ADD COLUMN IF NOT EXISTS data_referencia DATE")
+                conn.execute("""
+                    UPDATE historico_execucoes SET data_referencia = CAST(data_registro AS DATE)
+                    WHERE data_referencia IS NULL
+                """)
+
                 # 3. Tabela DETALHES (Os Produtos em si)
                 # Guarda o estado de cada item naquele momento.
                 conn.execute("""
@@ -61,6 +69,26 @@ class HistoryRecorder:
                     )
                 """)
                 
+                # 4. Tabela de ÚLTIMA CURVA por SKU (lookup O(1) para a histerese ABC)
+                # Evita varrer historico_detalhes inteiro a cada execução.
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS historico_ultima_curva (
+                        cod_produto VARCHAR PRIMARY KEY,
+                        curva_abc VARCHAR,
+                        id_execucao INTEGER
+                    )
+                """)
+
+                # Backfill único a partir do histórico já gravado
+                if conn.execute("SELECT COUNT(*) FROM historico_ultima_curva").fetchone()[0] == 0:
+                    conn.execute("""
+                        INSERT INTO historico_ultima_curva
+                        SELECT cod_produto, arg_max(curva_abc, id_execucao), MAX(id_execucao)
+                        FROM historico_detalhes
+                        WHERE curva_abc IS NOT NULL
+                        GROUP BY cod_produto
+                    """)
+                
                 logger.info("schema_historico_verificado", path=str(self.history_db_path))
                 
         except Exception as e:
@@ -72,7 +100,9 @@ class HistoryRecorder:
         
         Args:
             df_final: DataFrame com os produtos calculados.
-            context_data: Dicionário contendo metadados (marca, config, stats).
+            context_data: Dicionário contendo metadados (marca, config, stats,
+                data_referencia). Reprocessamentos "as_of" gravam a data de
+                referência, não a do dia em que rodaram.
         """
         try:
             logger.info("iniciando_gravacao_historico")
@@ -82,6 +112,7 @@ class HistoryRecorder:
             usuario = context_data.get('usuario', 'SYSTEM')
             stats = context_data.get('stats', {})
             config_dict = context_data.get('config', {}) # Configuração completa em dict
+            data_referencia = context_data.get('data_referencia') or date.today()
 
             # Prepara JSON de config (converte objetos Pydantic se necessário)
             if hasattr(config_dict, 'model_dump_json'):
@@ -94,15 +125,16 @@ class HistoryRecorder:
                 # Usamos RETURNING id_execucao para saber qual ID foi gerado
                 query_header = """
                     INSERT INTO historico_execucoes (
-                        data_registro, marca_filtro, usuario, 
+                        data_registro, data_referencia, marca_filtro, usuario, 
                         total_sugestao_valor, total_itens_comprar, config_snapshot
                     ) VALUES (
-                        current_timestamp, ?, ?, ?, ?, ?
+                        current_timestamp, ?, ?, ?, ?, ?, ?
                     ) RETURNING id_execucao
                 """
                 
                 # Executa e pega o ID gerado
                 id_execucao = conn.execute(query_header, [
+                    data_referencia,
                     marca, 
                     usuario, 
                     stats.get('total_valor', 0.0),
@@ -132,13 +164,24 @@ class HistoryRecorder:
                     if col not in df_detalhes.columns:
                         df_detalhes = df_detalhes.with_columns(pl.lit(None).alias(col))
 
-                # Ordena colunas para inserção
-                df_insert = df_detalhes.select(cols_necessarias)
+                # Ordena colunas para inserção; classificações Enum (EstoqueMath) voltam a texto (VARCHAR)
+                df_insert = df_detalhes.select(cols_necessarias).with_columns(
+                    pl.col(pl.Enum, pl.Categorical).cast(pl.Utf8)
+                )
 
                 # --- PASSO 3: INSERT BULK (Alta Performance) ---
                 # O DuckDB permite inserir direto de um DataFrame Polars
                 conn.register("view_temp_insert", df_insert)
                 conn.execute("INSERT INTO historico_detalhes SELECT * FROM view_temp_insert")
+                # Lookup da histerese só acompanha execuções ao vivo: um replay "as_of"
+                # não pode virar a "curva anterior" da próxima execução normal
+                if data_referencia >= date.today():
+                    conn.execute("""
+                        INSERT OR REPLACE INTO historico_ultima_curva
+                        SELECT cod_produto, curva_abc, id_execucao
+                        FROM view_temp_insert
+                        WHERE curva_abc IS NOT NULL
+                    """)
                 conn.unregister("view_temp_insert")
                 
                 logger.info("historico_detalhes_gravado", linhas=len(df_insert))
@@ -146,4 +189,40 @@ class HistoryRecorder:
         except Exception as e:
             logger.error("erro_fatal_gravacao_historico", error=str(e))
             # Não damos raise aqui para não travar a geração do Excel se o log falhar
-            # Mas o erro fica registrado no structlog
\ No newline at end of file
+            # Mas o erro fica registrado no structlog
+
+    def carregar_ultima_curva_abc(self, data_referencia: date | None = None) -> pl.DataFrame:
+        """
+        Curva ABC da execução anterior por SKU (cod_produto, curva_abc_anterior).
+
+        Sem data de referência (ou com data de hoje), lê a tabela de lookup.
+        Em reprocessamento "as_of", pega a última execução ANTERIOR à data.
+        Devolve DataFrame vazio se não houver histórico.
+        """
+        vazio = pl.DataFrame(schema={"cod_produto": pl.Utf8, "curva_abc_anterior": pl.Utf8})
+        if not self.history_db_path.exists():
+            return vazio
+
+        if data_referencia is None or data_referencia >= date.today():
+            query = """
+                SELECT CAST(cod_produto AS VARCHAR) as cod_produto, curva_abc as curva_abc_anterior
+                FROM historico_ultima_curva
+            """
+            params = None
+        else:
+            query = """
+                SELECT CAST(d.cod_produto AS VARCHAR) as cod_produto,
+                       arg_max(d.curva_abc, d.id_execucao) as curva_abc_anterior
+                FROM historico_detalhes d
+                JOIN historico_execucoes e USING (id_execucao)
+                WHERE e.data_referencia < ? AND d.curva_abc IS NOT NULL
+                GROUP BY 1
+            """
+            params = [data_referencia]
+
+        try:
+            with duckdb.connect(str(self.history_db_path), read_only=True) as conn:
+                return conn.execute(query, params).pl()
+        except Exception as e:
+            logger.warning("historico_curva_indisponivel", error=str(e))
+            return vazio
@@ -0,0 +1,57 @@
+from typing import Iterable
+
+import polars as pl
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class ProductDictionary:
+    """
+    Dicionário de Produtos da execução: cod_produto (texto) -> id_produto (UInt32 denso).
+
+    Os classificadores devolvem cod_produto como VARCHAR; cruzar cinco tabelas
+    por string faz hash e comparação de texto em cada join. O dicionário é
+    montado uma vez com o universo de códigos, as tabelas passam a ser unidas
+    pela chave inteira e o texto só volta (decodificar) quando o frame mestre
+    está pronto. Os ids são a posição do código na lista ordenada, então só
+    valem dentro da mesma execução (não gravar no histórico).
+    """
+
+    COLUNA_CODIGO = "cod_produto"
+    COLUNA_ID = "id_produto"
+
+    def __init__(self, codigos: Iterable[str]):
+        codigos = pl.Series(self.COLUNA_CODIGO, codigos, dtype=pl.Utf8).drop_nulls().unique().sort()
+        self.codigos = codigos
+        # Enum com as categorias = códigos: o código físico do Enum já é o índice denso
+        self.tipo = pl.Enum(codigos)
+        logger.info("product_dictionary_built", produtos=len(codigos))
+
+    @classmethod
+    def de_frames(cls, *frames: pl.DataFrame) -> "ProductDictionary":
+        """Universo de códigos: união dos cod_produto de todos os frames."""
+        return cls(pl.concat([f.select(pl.col(cls.COLUNA_CODIGO).cast(pl.Utf8)) for f in frames])[cls.COLUNA_CODIGO])
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    @property
+    def universo(self) -> pl.DataFrame:
+        """Uma linha por produto, só com a chave inteira (base dos left joins)."""
+        return pl.DataFrame({self.COLUNA_ID: pl.arange(0, len(self.codigos), dtype=pl.UInt32, eager=True)})
+
+    def codificar(self, df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+        """Troca cod_produto por id_produto. Códigos fora do dicionário viram id nulo (não casam em join)."""
+        return df.with_columns(
+            pl.col(self.COLUNA_CODIGO).cast(pl.Utf8).cast(self.tipo, strict=False)
+            .to_physical().cast(pl.UInt32).alias(self.COLUNA_ID)
+        ).drop(self.COLUNA_CODIGO)
+
+    def decodificar(self, df: pl.DataFrame | pl.LazyFrame, manter_id: bool = False) -> pl.DataFrame | pl.LazyFrame:
+        """Reanexa cod_produto (texto) como primeira coluna a partir de id_produto."""
+        colunas = df.collect_schema().names()
+        df = df.select(
+            pl.lit(self.codigos).gather(pl.col(self.COLUNA_ID)).alias(self.COLUNA_CODIGO),
+            *[c for c in colunas if c != self.COLUNA_CODIGO]
+        )
+        return df if manter_id else df.drop(self.COLUNA_ID)
@@ -12,8 +12,9 @@ WITH vendas_por_produto AS (
         SUM(valor_total) as total_vendido
     FROM sqlite_db.vendas
     WHERE 
-        -- Converte texto para data e pega os últimos 12 meses
-        TRY_CAST(data_movimento AS DATE) >= (CURRENT_DATE - INTERVAL '12 months')
+        -- Converte texto para data e pega os 12 meses anteriores à data de referência (as_of)
+        TRY_CAST(data_movimento AS DATE) >= (CAST($data_referencia AS DATE) - INTERVAL '12 months')
+        AND TRY_CAST(data_movimento AS DATE) <= CAST($data_referencia AS DATE)
     GROUP BY cod_produto
     HAVING total_vendido > 0
 ),
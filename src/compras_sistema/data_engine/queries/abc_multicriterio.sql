@@ -0,0 +1,45 @@
+/*
+  Base da Curva ABC Multicritério
+  Um único GROUP BY em vendas (12 meses até a data de referência) com:
+    total_vendido  -> faturamento
+    qtd_vendida    -> unidades
+    qtd_linhas     -> frequência (linhas de pedido / "hits")
+    margem         -> faturamento - unidades x custo_unitario
+  A classificação (Pareto por critério / por marca) é feita em Python (Polars).
+*/
+
+WITH vendas_por_produto AS (
+    SELECT 
+        CAST(cod_produto AS VARCHAR) as cod_produto,
+        SUM(valor_total) as total_vendido,
+        SUM(quantidade) as qtd_vendida,
+        COUNT(*) as qtd_linhas
+    FROM sqlite_db.vendas
+    WHERE 
+        TRY_CAST(data_movimento AS DATE) >= (CAST($data_referencia AS DATE) - INTERVAL '12 months')
+        AND TRY_CAST(data_movimento AS DATE) <= CAST($data_referencia AS DATE)
+    GROUP BY 1
+),
+
+custos AS (
+    SELECT CAST(cod_produto AS VARCHAR) as cod_produto, MAX(custo_unitario) as custo_unitario
+    FROM sqlite_db.saldo_custo_entrada
+    GROUP BY 1
+),
+
+marcas AS (
+    SELECT CAST(cod_produto AS VARCHAR) as cod_produto, MAX(marca) as marca
+    FROM sqlite_db.produtos_gerais
+    GROUP BY 1
+)
+
+SELECT 
+    v.cod_produto,
+    COALESCE(m.marca, 'N/D') as marca,
+    CAST(v.total_vendido AS DOUBLE) as total_vendido,
+    CAST(v.qtd_vendida AS DOUBLE) as qtd_vendida,
+    CAST(v.qtd_linhas AS DOUBLE) as qtd_linhas,
+    CAST(v.total_vendido - v.qtd_vendida * COALESCE(c.custo_unitario, 0) AS DOUBLE) as margem
+FROM vendas_por_produto v
+LEFT JOIN custos c USING (cod_produto)
+LEFT JOIN marcas m USING (cod_produto);
@@ -0,0 +1,115 @@
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import polars as pl
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class RunSnapshot:
+    """
+    Snapshot do df_final de cada execução em Arrow IPC (Feather v2).
+
+    Grava data/cache/snapshots/execucao_<run_id>.arrow SEM compressão (só
+    assim o arquivo pode ser mapeado em memória, zero-copy) e um manifesto
+    execucao_<run_id>.json ao lado: run_id, hash do config, data de
+    referência, marca, linhas e colunas. Launcher, auditor e o re-export do
+    Excel leem o snapshot em vez de recalcular ou abrir o xlsx.
+
+    Diferente do StageCache (um arquivo por estágio, regravado a cada
+    execução), cada execução tem o próprio arquivo; 'manter' limita quantos
+    ficam no disco.
+    """
+
+    PREFIXO = "execucao_"
+
+    def __init__(self, pasta: Path, manter: int = 10):
+        self.pasta = Path(pasta)
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self.manter = manter
+
+    @staticmethod
+    def hash_config(config_achatado: Dict[str, Any]) -> str:
+        texto = json.dumps(config_achatado, sort_keys=True, default=str)
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def novo_run_id() -> str:
+        return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    def _arquivos(self, run_id: str) -> tuple[Path, Path]:
+        return self.pasta / f"{self.PREFIXO}{run_id}.arrow", self.pasta / f"{self.PREFIXO}{run_id}.json"
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+    def gravar(self, df: pl.DataFrame, config_achatado: Dict[str, Any], data_referencia,
+               run_id: str | None = None, **extras: Any) -> Dict[str, Any]:
+        """Grava frame + manifesto e aplica a retenção. Devolve o manifesto."""
+        run_id = run_id or self.novo_run_id()
+        arquivo, manifesto = self._arquivos(run_id)
+        df.write_ipc(arquivo, compression="uncompressed")
+
+        dados = {
+            "run_id": run_id,
+            "criado_em": datetime.now().isoformat(),
+            "data_referencia": str(data_referencia),
+            "config_hash": self.hash_config(config_achatado),
+            "linhas": df.height,
+            "colunas": df.columns,
+            "arquivo": arquivo.name,
+            **extras,
+        }
+        manifesto.write_text(json.dumps(dados, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+        logger.info("snapshot_gravado", run_id=run_id, linhas=df.height, arquivo=str(arquivo))
+
+        self._aplicar_retencao()
+        return dados
+
+    def _aplicar_retencao(self) -> None:
+        for antigo in self.listar()[self.manter:]:
+            for caminho in self._arquivos(antigo["run_id"]):
+                try:
+                    caminho.unlink(missing_ok=True)
+                except OSError as e:
+                    # No Windows um snapshot mapeado por outro processo não pode ser apagado agora
+                    logger.warning("snapshot_retencao_falhou", arquivo=str(caminho), erro=str(e))
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def listar(self) -> List[Dict[str, Any]]:
+        """Manifestos do mais recente para o mais antigo (só os que têm o .arrow)."""
+        manifestos = []
+        for caminho in sorted(self.pasta.glob(f"{self.PREFIXO}*.json"), reverse=True):
+            try:
+                dados = json.loads(caminho.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if (self.pasta / dados.get("arquivo", "")).exists():
+                manifestos.append(dados)
+        return manifestos
+
+    def manifesto(self, run_id: str | None = None) -> Dict[str, Any] | None:
+        """Manifesto da execução (a mais recente se run_id for None)."""
+        for dados in self.listar():
+            if run_id is None or dados["run_id"] == run_id:
+                return dados
+        return None
+
+    def caminho(self, run_id: str | None = None) -> Path:
+        dados = self.manifesto(run_id)
+        if dados is None:
+            raise FileNotFoundError(f"Snapshot não encontrado em {self.pasta} (run_id={run_id or 'último'})")
+        return self.pasta / dados["arquivo"]
+
+    def carregar(self, run_id: str | None = None, colunas: List[str] | None = None) -> pl.DataFrame:
+        """DataFrame do snapshot (IPC sem compressão: o Polars mapeia o arquivo em memória)."""
+        return pl.read_ipc(self.caminho(run_id), columns=colunas)
+
+    def scan(self, run_id: str | None = None) -> pl.LazyFrame:
+        """LazyFrame do snapshot: filtros e projeções leem só o necessário (ex.: um SKU no auditor)."""
+        return pl.scan_ipc(self.caminho(run_id))
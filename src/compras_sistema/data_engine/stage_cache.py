@@ -0,0 +1,158 @@
+import hashlib
+import io
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+import polars as pl
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class StageCache:
+    """
+    Cache de Estágios do Pipeline (memória + Arrow IPC em disco).
+
+    Cada estágio é gravado como <estagio>.arrow com um manifesto JSON ao lado
+    contendo os 'valores' que o geraram: as chaves de config que o estágio lê
+    (achatadas, ex.: 'compras.meses_cobertura'), a data de referência e a
+    impressão digital dos bancos de origem. Se os valores forem os mesmos da
+    última gravação, o frame é reaproveitado; se não, diferenca() diz quais
+    chaves mudaram para o chamador recalcular só o que depende delas.
+
+    Só guarda a última versão de cada estágio (uma simulação por vez no launcher).
+    """
+
+    VERSAO = 1
+
+    def __init__(self, pasta: Path, arquivos_origem: Iterable[Path] = ()):
+        self.pasta = Path(pasta)
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self.impressao_origem = self.impressao_arquivos(arquivos_origem)
+        self._memoria: Dict[str, tuple] = {}
+
+    # ------------------------------------------------------------------
+    # Chaves
+    # ------------------------------------------------------------------
+    @staticmethod
+    def achatar(config: Any, prefixo: str = "") -> Dict[str, Any]:
+        """{'lote': {'limite_virada': 0.5}} -> {'lote.limite_virada': 0.5} (aceita modelos pydantic)."""
+        if hasattr(config, "model_dump"):
+            config = config.model_dump()
+        if not isinstance(config, dict):
+            return {prefixo: config}
+        achatado = {}
+        for chave, valor in config.items():
+            nome = f"{prefixo}.{chave}" if prefixo else str(chave)
+            if isinstance(valor, dict) and valor:
+                achatado.update(StageCache.achatar(valor, nome))
+            else:
+                achatado[nome] = valor
+        return achatado
+
+    @staticmethod
+    def selecionar(config_achatado: Dict[str, Any], secoes: Iterable[str]) -> Dict[str, Any]:
+        """Subconjunto das chaves que pertencem às seções lidas pelo estágio."""
+        secoes = tuple(secoes)
+        return {
+            chave: valor for chave, valor in config_achatado.items()
+            if any(chave == s or chave.startswith(f"{s}.") for s in secoes)
+        }
+
+    @staticmethod
+    def impressao_arquivos(arquivos: Iterable[Path]) -> str:
+        """Tamanho + mtime de cada arquivo de origem (arquivo ausente conta como vazio)."""
+        partes = []
+        for arquivo in arquivos:
+            arquivo = Path(arquivo)
+            if arquivo.exists():
+                st = arquivo.stat()
+                partes.append(f"{arquivo.name}:{st.st_size}:{st.st_mtime_ns}")
+            else:
+                partes.append(f"{arquivo.name}:-")
+        return "|".join(partes)
+
+    def _valores_completos(self, valores: Dict[str, Any]) -> Dict[str, Any]:
+        return {**valores, "_origem": self.impressao_origem, "_versao": self.VERSAO}
+
+    @staticmethod
+    def _chave(valores: Dict[str, Any]) -> str:
+        texto = json.dumps(valores, sort_keys=True, default=str)
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+    def _arquivos(self, estagio: str) -> tuple[Path, Path]:
+        return self.pasta / f"{estagio}.arrow", self.pasta / f"{estagio}.json"
+
+    # ------------------------------------------------------------------
+    # Leitura / Gravação
+    # ------------------------------------------------------------------
+    def ultimo(self, estagio: str) -> tuple[pl.DataFrame, Dict[str, Any]] | None:
+        """Última gravação do estágio (frame + valores que o geraram), qualquer que seja a chave."""
+        if estagio in self._memoria:
+            return self._memoria[estagio]
+        arquivo, manifesto = self._arquivos(estagio)
+        if not (arquivo.exists() and manifesto.exists()):
+            return None
+        try:
+            valores = json.loads(manifesto.read_text(encoding="utf-8"))
+            # Lê para a memória (sem mmap): no Windows o arquivo mapeado não pode ser regravado
+            df = pl.read_ipc(io.BytesIO(arquivo.read_bytes()))
+        except Exception as e:
+            logger.warning("cache_estagio_ilegivel", estagio=estagio, erro=str(e))
+            return None
+        self._memoria[estagio] = (df, valores)
+        return df, valores
+
+    def carregar(self, estagio: str, valores: Dict[str, Any]) -> pl.DataFrame | None:
+        """Frame do estágio se foi gerado exatamente com 'valores'; None caso contrário."""
+        anterior = self.ultimo(estagio)
+        if anterior is None:
+            return None
+        df, valores_gravados = anterior
+        if self._chave(valores_gravados) != self._chave(self._valores_completos(valores)):
+            return None
+        logger.info("cache_estagio_hit", estagio=estagio, linhas=df.height)
+        return df
+
+    def gravar(self, estagio: str, valores: Dict[str, Any], df: pl.DataFrame) -> None:
+        valores = self._valores_completos(valores)
+        arquivo, manifesto = self._arquivos(estagio)
+        try:
+            df.write_ipc(arquivo, compression="lz4")
+            manifesto.write_text(json.dumps(valores, sort_keys=True, default=str), encoding="utf-8")
+        except Exception as e:
+            # Cache é otimização: falha de disco não derruba o processamento
+            logger.warning("cache_estagio_falha_gravacao", estagio=estagio, erro=str(e))
+        self._memoria[estagio] = (df, json.loads(json.dumps(valores, default=str)))
+
+    def obter(self, estagio: str, valores: Dict[str, Any], calcular: Callable[[], pl.DataFrame]) -> pl.DataFrame:
+        """carregar() ou, em caso de miss, calcular() + gravar()."""
+        df = self.carregar(estagio, valores)
+        if df is None:
+            logger.info("cache_estagio_miss", estagio=estagio)
+            df = calcular()
+            self.gravar(estagio, valores, df)
+        return df
+
+    def diferenca(self, estagio: str, valores: Dict[str, Any]) -> List[str] | None:
+        """
+        Chaves de config que mudaram desde a última gravação do estágio.
+        None quando não há gravação ou quando uma chave interna (prefixo '_',
+        ex.: origem, versão, estágio anterior) mudou: recalcular tudo.
+        """
+        anterior = self.ultimo(estagio)
+        if anterior is None:
+            return None
+        _, valores_gravados = anterior
+        atuais = json.loads(json.dumps(self._valores_completos(valores), default=str))
+        chaves = set(valores_gravados) | set(atuais)
+        alteradas = sorted(c for c in chaves if valores_gravados.get(c) != atuais.get(c))
+        # Chaves internas ('_origem', '_versao', '_base'...) invalidam o estágio inteiro
+        if any(c.startswith("_") for c in alteradas):
+            return None
+        return alteradas
+
+    def limpar(self) -> None:
+        self._memoria.clear()
+        for arquivo in list(self.pasta.glob("*.arrow")) + list(self.pasta.glob("*.json")):
+            arquivo.unlink(missing_ok=True)
@@ -1,6 +1,7 @@
 import polars as pl
 from pathlib import Path
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from datetime import datetime
@@ -14,7 +15,17 @@ class ExcelExporter:
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def exportar_sugestao(self, df: pl.DataFrame, filename: str = None):
+    @staticmethod
+    def ordenar(df: pl.DataFrame) -> pl.DataFrame:
+        """Ordenação inteligente: primeiro os problemas (alerta_dados), depois os melhores (score)."""
+        return df.sort(["alerta_dados", "score"], descending=[True, True])
+
+    def exportar_sugestao(self, df: pl.DataFrame, filename: str = None, streaming: bool = False):
+        """
+        Gera a planilha de sugestão. streaming=True (modo baixa memória) grava
+        linha a linha com Workbook(write_only=True), em blocos do DataFrame,
+        com a mesma formatação e larguras calculadas no próprio Polars.
+        """
         if filename is None:
             data_hoje = datetime.now().strftime("%Y%m%d_%H%M")
             filename = f"sugestao_compras_{data_hoje}.xlsx"
@@ -31,10 +42,14 @@ class ExcelExporter:
             "marca",
             "curva_abc",
             "curva_xyz",
+            "curva_combinada",
             "sugestao_final",           # Sugestão Final (Resultado)
             
             # --- BLOCO DE ANÁLISE DO CÁLCULO ---
             "sugestao_calculada",       # 1. Matemática Pura
+            "sugestao_pre_orcamento",   # 1.1 Antes do corte de orçamento
+            "qtd_antecipada",           # 1.2 Antecipado para frete grátis
+            "status_pedido",            # 1.3 Situação do pedido do fornecedor
             "alerta_dados",             # 2. Auditoria (Posição Solicitada)
             "calculado_mas_bloqueado",  # 3. Flag de Bloqueio
             "motivo_bloqueio",          # 4. Razão
@@ -49,16 +64,22 @@ class ExcelExporter:
             "cobertura_virtual_meses",
             "media_venda_base",
             "media_venda_dia",
+            "metodo_demanda",
+            "qtd_outliers_cortados",
             "tendencia_vendas",
             "tendencia_clientes",
             "perfil_cliente",
+            "risco_dependencia",
+            "qtd_clientes_365d",
+            "share_top1",
+            "hhi_clientes",
             "validacao_giro",
             "custo_unitario",
-            "score"
+            "score",
+            "rank_prioridade"
         ]
         
         cols_presentes = [c for c in cols_export if c in df.columns]
-        records = df.select(cols_presentes).to_dicts()
         
         # ======== CRIAÇÃO DO EXCEL ========
         wb = Workbook()
@@ -91,6 +112,17 @@ class ExcelExporter:
             "FATOR_SAZONAL": "IDX SAZONAL",
             "MEDIA_VENDA_DIA": "GIRO DIA (AJUST)",
             "MEDIA_VENDA_BASE": "GIRO DIA (BASE)",
+            "METODO_DEMANDA": "MÉTODO DEMANDA",
+            "QTD_OUTLIERS_CORTADOS": "OUTLIERS CORTADOS",
+            "RISCO_DEPENDENCIA": "RISCO DEPENDÊNCIA",
+            "CURVA_COMBINADA": "ABC COMBINADA",
+            "RANK_PRIORIDADE": "RANK",
+            "SUGESTAO_PRE_ORCAMENTO": "SUG. ANTES ORÇAMENTO",
+            "QTD_ANTECIPADA": "ANTECIPADO (FRETE)",
+            "STATUS_PEDIDO": "STATUS PEDIDO",
+            "QTD_CLIENTES_365D": "CLIENTES 12M",
+            "SHARE_TOP1": "% MAIOR CLIENTE",
+            "HHI_CLIENTES": "HHI CLIENTES",
             "COBERTURA_VIRTUAL_MESES": "COBERTURA MESES",
             "REF_FORNECEDOR": "REF. FABRICA",
             "SUGESTAO_CALCULADA": "CALC. ORIGINAL",
@@ -101,6 +133,16 @@ class ExcelExporter:
         headers = [c.replace("_", " ").upper() for c in cols_presentes]
         headers = [mapa_nomes.get(h, h) for h in headers]
         
+        estilos = {
+            "thin_border": thin_border, "left_align": left_align, "center_align": center_align,
+            "fill_alert": fill_alert, "fill_green": fill_green, "fill_red": fill_red,
+            "fill_blue_light": fill_blue_light, "fill_implanta": fill_implanta,
+            "fill_yellow": fill_yellow, "fill_orange": fill_orange,
+            "header_font": header_font, "header_fill": header_fill,
+        }
+        if streaming:
+            return self._exportar_streaming(df, filepath, cols_presentes, headers, estilos)
+
         ws.append(headers)
         
         # Formata cabeçalho
@@ -111,100 +153,12 @@ class ExcelExporter:
             cell.alignment = center_align
         
         # Preenche dados
+        records = df.select(cols_presentes).to_dicts()
         for row_idx, row_data in enumerate(records, 2):
             for col_idx, col_name in enumerate(cols_presentes, 1):
                 val = row_data[col_name]
                 cell = ws.cell(row=row_idx, column=col_idx, value=val)
-                cell.border = thin_border
-                
-                # Alinhamento
-                if col_name == "descricao":
-                    cell.alignment = left_align
-                else:
-                    cell.alignment = center_align
-                
-                # Formatação numérica
-                if col_name in ["custo_unitario", "subtotal"]:
-                    cell.number_format = 'R$ #,##0.00'
-                elif col_name in ["media_venda_dia", "media_venda_base", "fator_sazonal"]:
-                    cell.number_format = '0.00'
-                elif col_name in ["cobertura_virtual_meses"]:
-                    cell.number_format = '0.0'
-                elif col_name == "score":
-                    cell.number_format = '#,##0'
-                
-                # ======== FORMATAÇÃO CONDICIONAL ========
-                
-                # 1. ALERTA DE DADOS
-                if col_name == "alerta_dados" and val:
-                    cell.font = Font(bold=True, color="FF0000")
-                    cell.fill = fill_alert
-                
-                # 2. Sugestões de compra
-                if col_name in ["sugestao_final", "subtotal"] and row_data.get("sugestao_final", 0) > 0:
-                    cell.font = Font(bold=True, color="006400")
-                    cell.fill = fill_green
-                
-                # 3. Produtos bloqueados
-                if col_name == "calculado_mas_bloqueado" and val == "SIM":
-                    cell.fill = fill_red
-                    cell.font = Font(bold=True, color="8B0000")
-                
-                # 4. Motivo do bloqueio
-                if col_name == "motivo_bloqueio" and val:
-                    cell.font = Font(color="DC143C", italic=True)
-                
-                # 5. Fator sazonal
-                if col_name == "fator_sazonal":
-                    if isinstance(val, (int, float)):
-                        if val < 0.90:
-                            cell.font = Font(color="0000FF")
-                            cell.fill = fill_blue_light
-                        elif val > 1.10:
-                            cell.font = Font(color="B22222", bold=True)
-                
-                # 6. Status diagnóstico
-                if col_name == "status_diagnostico":
-                    val_str = str(val).upper()
-                    if "IMPLANTAÇÃO" in val_str:
-                        cell.fill = fill_implanta
-                        cell.font = Font(color="00008B", bold=True)
-                    elif "RUPTURA" in val_str:
-                        cell.fill = PatternFill(start_color="FF0000", fill_type="solid")
-                        cell.font = Font(color="FFFFFF", bold=True)
-                    elif "BLOQUEADO" in val_str:
-                        cell.fill = PatternFill(start_color="808080", fill_type="solid")
-                        cell.font = Font(color="FFFFFF", bold=True)
-                    elif "INATIVO" in val_str:
-                        cell.fill = PatternFill(start_color="000000", fill_type="solid")
-                        cell.font = Font(color="FFFFFF", bold=True)
-                    elif "ALERTA" in val_str:
-                        cell.fill = PatternFill(start_color="FF8C00", fill_type="solid")
-                        cell.font = Font(color="FFFFFF", bold=True)
-                    elif "EXCESSO" in val_str:
-                        cell.fill = fill_yellow
-                    elif "COMPRAR" in val_str:
-                        cell.fill = fill_green
-                
-                # 7. Tendência
-                if col_name == "tendencia_vendas":
-                    val_str = str(val).upper()
-                    if "ALTA" in val_str:
-                        cell.font = Font(color="006400", bold=True)
-                    elif "QUEDA" in val_str:
-                        cell.font = Font(color="FF0000", bold=True)
-                
-                # 8. Validação Giro
-                if col_name == "validacao_giro":
-                    val_str = str(val)
-                    if "ITEM NOVO" in val_str:
-                        cell.fill = fill_implanta
-                        cell.font = Font(color="00008B", bold=True)
-                    elif "SEM MOVIMENTO" in val_str:
-                        cell.font = Font(color="808080", italic=True)
-                    elif "Excesso" in val_str:
-                        cell.font = Font(bold=True, color="B22222")
-                        cell.fill = fill_orange
+                self._formatar_celula(cell, col_name, val, row_data, estilos)
         
         # Ajuste de largura
         for col_idx, column_cells in enumerate(ws.columns, 1):
@@ -223,4 +177,141 @@ class ExcelExporter:
         
         wb.save(filepath)
         logger.info("export_excel_concluido")
-        return filepath
\ No newline at end of file
+        return filepath
+
+    @staticmethod
+    def _formatar_celula(cell, col_name, val, row_data, estilos):
+        """Borda, alinhamento, formato numérico e formatação condicional de uma célula de dados."""
+        cell.border = estilos["thin_border"]
+
+        # Alinhamento
+        if col_name == "descricao":
+            cell.alignment = estilos["left_align"]
+        else:
+            cell.alignment = estilos["center_align"]
+
+        # Formatação numérica
+        if col_name in ["custo_unitario", "subtotal"]:
+            cell.number_format = 'R$ #,##0.00'
+        elif col_name in ["media_venda_dia", "media_venda_base", "fator_sazonal"]:
+            cell.number_format = '0.00'
+        elif col_name in ["cobertura_virtual_meses"]:
+            cell.number_format = '0.0'
+        elif col_name in ["share_top1"]:
+            cell.number_format = '0%'
+        elif col_name in ["hhi_clientes"]:
+            cell.number_format = '0.00'
+        elif col_name == "score":
+            cell.number_format = '#,##0'
+
+        # ======== FORMATAÇÃO CONDICIONAL ========
+
+        # 1. ALERTA DE DADOS
+        if col_name == "alerta_dados" and val:
+            cell.font = Font(bold=True, color="FF0000")
+            cell.fill = estilos["fill_alert"]
+
+        # 2. Sugestões de compra
+        if col_name in ["sugestao_final", "subtotal"] and row_data.get("sugestao_final", 0) > 0:
+            cell.font = Font(bold=True, color="006400")
+            cell.fill = estilos["fill_green"]
+
+        # 3. Produtos bloqueados
+        if col_name == "calculado_mas_bloqueado" and val == "SIM":
+            cell.fill = estilos["fill_red"]
+            cell.font = Font(bold=True, color="8B0000")
+
+        # 4. Motivo do bloqueio
+        if col_name == "motivo_bloqueio" and val:
+            cell.font = Font(color="DC143C", italic=True)
+
+        # 5. Fator sazonal
+        if col_name == "fator_sazonal":
+            if isinstance(val, (int, float)):
+                if val < 0.90:
+                    cell.font = Font(color="0000FF")
+                    cell.fill = estilos["fill_blue_light"]
+                elif val > 1.10:
+                    cell.font = Font(color="B22222", bold=True)
+
+        # 6. Status diagnóstico
+        if col_name == "status_diagnostico":
+            val_str = str(val).upper()
+            if "IMPLANTAÇÃO" in val_str:
+                cell.fill = estilos["fill_implanta"]
+                cell.font = Font(color="00008B", bold=True)
+            elif "RUPTURA" in val_str:
+                cell.fill = PatternFill(start_color="FF0000", fill_type="solid")
+                cell.font = Font(color="FFFFFF", bold=True)
+            elif "BLOQUEADO" in val_str:
+                cell.fill = PatternFill(start_color="808080", fill_type="solid")
+                cell.font = Font(color="FFFFFF", bold=True)
+            elif "INATIVO" in val_str:
+                cell.fill = PatternFill(start_color="000000", fill_type="solid")
+                cell.font = Font(color="FFFFFF", bold=True)
+            elif "ALERTA" in val_str:
+                cell.fill = PatternFill(start_color="FF8C00", fill_type="solid")
+                cell.font = Font(color="FFFFFF", bold=True)
+            elif "EXCESSO" in val_str:
+                cell.fill = estilos["fill_yellow"]
+            elif "COMPRAR" in val_str:
+                cell.fill = estilos["fill_green"]
+
+        # 7. Tendência
+        if col_name == "tendencia_vendas":
+            val_str = str(val).upper()
+            if "ALTA" in val_str:
+                cell.font = Font(color="006400", bold=True)
+            elif "QUEDA" in val_str:
+                cell.font = Font(color="FF0000", bold=True)
+
+        # 8. Validação Giro
+        if col_name == "validacao_giro":
+            val_str = str(val)
+            if "ITEM NOVO" in val_str:
+                cell.fill = estilos["fill_implanta"]
+                cell.font = Font(color="00008B", bold=True)
+            elif "SEM MOVIMENTO" in val_str:
+                cell.font = Font(color="808080", italic=True)
+            elif "Excesso" in val_str:
+                cell.font = Font(bold=True, color="B22222")
+                cell.fill = estilos["fill_orange"]
+
+    def _exportar_streaming(self, df: pl.DataFrame, filepath: Path, cols_presentes: list,
+                            headers: list, estilos: dict, linhas_por_bloco: int = 5000) -> Path:
+        """Workbook write_only: as linhas vão direto para o arquivo, sem a planilha inteira em memória."""
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Analise Compras")
+
+        # Larguras antes das linhas (write_only não permite ajustar depois): maior texto por coluna
+        df_export = df.select(cols_presentes)
+        larguras = df_export.select([
+            pl.col(c).cast(pl.Utf8).fill_null("None").str.len_chars().max().alias(c) for c in cols_presentes
+        ]).row(0, named=True) if df_export.height else {}
+        for col_idx, (col_name, header) in enumerate(zip(cols_presentes, headers), 1):
+            limit = 60 if col_name == "descricao" else 40
+            max_length = max(len(header), larguras.get(col_name) or 0)
+            ws.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 3, limit)
+
+        linha_header = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = estilos["header_font"]
+            cell.fill = estilos["header_fill"]
+            cell.alignment = estilos["center_align"]
+            linha_header.append(cell)
+        ws.append(linha_header)
+
+        for bloco in df_export.iter_slices(n_rows=linhas_por_bloco):
+            for row_data in bloco.iter_rows(named=True):
+                linha = []
+                for col_name in cols_presentes:
+                    val = row_data[col_name]
+                    cell = WriteOnlyCell(ws, value=val)
+                    self._formatar_celula(cell, col_name, val, row_data, estilos)
+                    linha.append(cell)
+                ws.append(linha)
+
+        wb.save(filepath)
+        logger.info("export_excel_concluido", modo="streaming", linhas=df_export.height)
+        return filepath
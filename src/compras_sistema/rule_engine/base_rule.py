@@ -1,16 +1,39 @@
 from abc import ABC, abstractmethod
 import polars as pl
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 
 class BaseRule(ABC):
     """
     Classe abstrata para todas as regras de negócio.
     Garante que toda regra tenha um método 'apply'.
+
+    Cada regra declara o contrato usado pelo RuleRegistry:
+        nome           -> identificador único no registro
+        entradas       -> colunas que a regra lê (obrigatórias)
+        saidas         -> colunas que a regra cria/sobrescreve
+        secoes_config  -> seções do config que alteram o resultado
+    Uma coluna em 'entradas' E em 'saidas' é modificada no lugar.
     """
-    
+
+    nome: str = ""
+    entradas: Tuple[str, ...] = ()
+    saidas: Tuple[str, ...] = ()
+    secoes_config: Tuple[str, ...] = ()
+
     @abstractmethod
     def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
         """
         Aplica a regra de negócio ao DataFrame.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def preparar(self, df: pl.LazyFrame, config: Any) -> "BaseRule":
+        """
+        Chamado uma vez sobre o frame inteiro antes da execução em partições.
+        Regras que dependem de agregados globais devolvem uma cópia com esses
+        valores fixados; as demais (por linha) devolvem a própria regra.
+        """
+        return self
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.nome!r})"
@@ -1,5 +1,6 @@
 import polars as pl
 from pathlib import Path
+from datetime import date
 from ...data_engine.duckdb_manager import DuckDBManager
 from ...core.config import ConfigManager
 import structlog
@@ -12,8 +13,10 @@ class ABCClassifier:
     Refatorado (Fase 4): Lógica movida do SQL para Python (Polars) para permitir configuração.
     """
     
-    def __init__(self, db_manager: DuckDBManager):
+    def __init__(self, db_manager: DuckDBManager, data_referencia: date | None = None):
         self.db = db_manager
+        # Data "as_of" da execução (bind parameter nas queries)
+        self.data_referencia = data_referencia or date.today()
         # [MUDANÇA] Agora apontamos para um SQL 'burro' que só traz totais
         self.query_path = Path(__file__).parent.parent.parent / "data_engine" / "queries" / "abc_financeiro_base.sql"
         # Se o arquivo novo não existir, usamos o antigo temporariamente (fallback)
@@ -21,10 +24,47 @@ class ABCClassifier:
             self.query_path = Path(__file__).parent.parent.parent / "data_engine" / "queries" / "abc_financeiro.sql"
 
     @staticmethod
-    def calcular_abc_polars(df: pl.DataFrame, config_abc: dict) -> pl.DataFrame:
+    def aplicar_histerese(df: pl.DataFrame, df_anterior: pl.DataFrame, tolerancia: dict,
+                          corte_a: float, corte_b: float) -> pl.DataFrame:
+        """
+        Método Estático Puro: evita que itens na fronteira troquem de classe a cada execução.
+
+        Cada classe ocupa uma faixa do percentual acumulado (A: 0..corte_a,
+        B: corte_a..corte_b, C: corte_b..1). O item mantém a classe da execução
+        anterior enquanto o acumulado estiver dentro dessa faixa alargada pela
+        tolerância da classe (tolerancia_abc, em pontos percentuais); fora dela,
+        vale a classificação nova. Itens sem histórico usam a classificação nova.
+        """
+        tol = {c: float(tolerancia.get(c, 0.0)) / 100.0 for c in ("A", "B", "C")}
+        faixas = {"A": (0.0, corte_a), "B": (corte_a, corte_b), "C": (corte_b, 1.0)}
+
+        pct = pl.col("percentual_acumulado")
+        anterior = pl.col("curva_abc_anterior")
+        dentro_da_faixa = pl.lit(False)
+        for classe, (inicio, fim) in faixas.items():
+            dentro_da_faixa = dentro_da_faixa | (
+                (anterior == classe) & (pct > inicio - tol[classe]) & (pct <= fim + tol[classe])
+            )
+
+        return (df
+            .join(df_anterior.select(["cod_produto", "curva_abc_anterior"]), on="cod_produto", how="left")
+            .with_columns([
+                pl.when(anterior.is_not_null() & dentro_da_faixa)
+                .then(anterior)
+                .otherwise(pl.col("curva_abc"))
+                .alias("curva_abc")
+            ]))
+
+    @staticmethod
+    def calcular_abc_polars(df: pl.DataFrame, config_abc: dict,
+                            df_anterior: pl.DataFrame | None = None,
+                            tolerancia: dict | None = None) -> pl.DataFrame:
         """
         Método Estático Puro: Recebe dados brutos e aplica as regras ABC do config.
         Isso permite testar a lógica sem precisar de banco de dados.
+
+        Com `df_anterior` (cod_produto, curva_abc_anterior) e alguma tolerância > 0,
+        aplica a histerese (ver aplicar_histerese).
         """
         if df.height == 0:
             return df.with_columns(pl.lit("C").alias("curva_abc"))
@@ -65,10 +105,18 @@ class ABCClassifier:
             .alias("curva_abc")
         ])
 
+        if df_anterior is not None and df_anterior.height > 0 and tolerancia and any(
+            float(v) > 0 for v in tolerancia.values()
+        ):
+            df = ABCClassifier.aplicar_histerese(df, df_anterior, tolerancia, corte_a, corte_b)
+
         return df
 
-    def run(self) -> pl.DataFrame:
-        """Executa o fluxo completo: Banco -> Lógica -> Resultado"""
+    def run(self, df_anterior: pl.DataFrame | None = None) -> pl.DataFrame:
+        """
+        Executa o fluxo completo: Banco -> Lógica -> Resultado.
+        `df_anterior` é a curva da execução anterior (HistoryRecorder.carregar_ultima_curva_abc).
+        """
         logger.info("iniciando_curva_abc_v2")
         
         # 1. Carregar Configuração
@@ -76,9 +124,11 @@ class ABCClassifier:
             config = ConfigManager().parametros
             # Tenta pegar dict de float, se der erro converte ou usa padrao
             abc_dict = config.abc if hasattr(config, 'abc') else {'A': 80.0, 'B': 15.0, 'C': 5.0}
+            tolerancia = getattr(config, 'tolerancia_abc', None) or {}
         except Exception as e:
             logger.warning(f"Erro ao ler config ABC ({e}). Usando padrão 80/15/5.")
             abc_dict = {'A': 80.0, 'B': 15.0, 'C': 5.0}
+            tolerancia = {}
 
         # 2. Buscar Dados Brutos (Total vendido por produto)
         # Se estivermos usando o SQL antigo (que já calcula ABC), precisamos apenas das colunas de valor
@@ -88,8 +138,11 @@ class ABCClassifier:
         with open(self.query_path, 'r', encoding='utf-8') as f:
             query = f.read()
 
+        # DuckDB rejeita parâmetros nomeados que não aparecem na query
+        params = {"data_referencia": self.data_referencia} if "$data_referencia" in query else None
+
         with self.db.get_connection() as conn:
-            df_bruto = conn.execute(query).pl()
+            df_bruto = conn.execute(query, params).pl()
 
         # 3. Aplicar Lógica Python
         # Se o SQL for o antigo, ele retorna 'curva_abc'. Vamos sobrescrever.
@@ -98,7 +151,13 @@ class ABCClassifier:
             logger.error("Coluna 'total_vendido' não encontrada no retorno do SQL.")
             return df_bruto
 
-        df_final = self.calcular_abc_polars(df_bruto, abc_dict)
+        df_final = self.calcular_abc_polars(df_bruto, abc_dict, df_anterior, tolerancia)
+
+        if "curva_abc_anterior" in df_final.columns:
+            mudancas = df_final.filter(
+                pl.col("curva_abc_anterior").is_not_null() & (pl.col("curva_abc") != pl.col("curva_abc_anterior"))
+            ).height
+            logger.info("histerese_abc_aplicada", mudancas_de_classe=mudancas)
         
         logger.info("curva_abc_concluida", total_produtos=len(df_final))
         return df_final
\ No newline at end of file
@@ -0,0 +1,94 @@
+import polars as pl
+from pathlib import Path
+from datetime import date
+from compras_sistema.data_engine.duckdb_manager import DuckDBManager
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class ABCMultiCriterioClassifier:
+    """
+    Curva ABC Multicritério (faturamento, unidades, frequência e margem).
+
+    Todas as curvas saem de UMA passada sobre o frame agregado: para cada
+    critério, cum_sum ordenado dentro da partição (global ou por marca) via
+    over(order_by=...), sem consultas separadas. A curva combinada (AA..CC)
+    concatena as classes de dois critérios configuráveis.
+    """
+
+    # Critério -> coluna de valor vinda do SQL
+    CRITERIOS = {
+        "faturamento": "total_vendido",
+        "quantidade": "qtd_vendida",
+        "frequencia": "qtd_linhas",
+        "margem": "margem",
+    }
+    COMBINADA_PADRAO = ("faturamento", "frequencia")
+
+    def __init__(self, db_manager: DuckDBManager, config_abc: dict, config_multi: dict,
+                 data_referencia: date | None = None):
+        self.db = db_manager
+        self.config_abc = config_abc
+        self.config_multi = config_multi or {}
+        # Data "as_of" da execução (bind parameter na query)
+        self.data_referencia = data_referencia or date.today()
+        self.query_path = Path(__file__).parent.parent.parent / "data_engine" / "queries" / "abc_multicriterio.sql"
+
+    @staticmethod
+    def calcular_multicriterio_polars(df: pl.DataFrame, config_abc: dict, config_multi: dict) -> pl.DataFrame:
+        """
+        Método Estático Puro: recebe o frame agregado (cod_produto, marca e colunas
+        de valor) e devolve curva_<criterio> para cada critério + curva_combinada.
+        Valores <= 0 (ex.: margem negativa) não entram no Pareto e ficam em C.
+        """
+        criterios = list(config_multi.get("criterios", ABCMultiCriterioClassifier.CRITERIOS))
+        invalidos = [c for c in criterios if c not in ABCMultiCriterioClassifier.CRITERIOS]
+        if invalidos:
+            raise ValueError(f"Critérios ABC inválidos: {invalidos}. Use {list(ABCMultiCriterioClassifier.CRITERIOS)}")
+
+        combinada = list(config_multi.get("combinada", ABCMultiCriterioClassifier.COMBINADA_PADRAO))
+        if len(combinada) != 2 or any(c not in criterios for c in combinada):
+            raise ValueError(f"'combinada' deve ter 2 critérios entre {criterios}")
+
+        corte_a = config_abc.get("A", 80.0) / 100.0
+        corte_b = corte_a + config_abc.get("B", 15.0) / 100.0
+
+        # Partição do Pareto: global ou por marca
+        particao = pl.col("marca") if config_multi.get("por_marca", False) else pl.lit(0)
+
+        curvas = []
+        for criterio in criterios:
+            valor = pl.col(ABCMultiCriterioClassifier.CRITERIOS[criterio]).fill_null(0.0).clip(lower_bound=0.0)
+            acumulado = valor.cum_sum().over(particao, order_by=valor, descending=True)
+            total = valor.sum().over(particao)
+            # Acumulado ANTES do item: o item fica na classe em que "começa".
+            # Evita que uma marca com 1 só item (100% acumulado) caia em C.
+            pct_inicio = (acumulado - valor) / total
+
+            curvas.append(
+                pl.when(valor <= 0).then(pl.lit("C"))
+                .when(pct_inicio < corte_a).then(pl.lit("A"))
+                .when(pct_inicio < corte_b).then(pl.lit("B"))
+                .otherwise(pl.lit("C"))
+                .alias(f"curva_{criterio}")
+            )
+
+        df = df.with_columns(curvas)
+        return df.with_columns([
+            (pl.col(f"curva_{combinada[0]}") + pl.col(f"curva_{combinada[1]}")).alias("curva_combinada")
+        ])
+
+    def carregar_base(self) -> pl.DataFrame:
+        """Frame agregado do SQL (faturamento, unidades, frequência e margem por SKU)."""
+        with open(self.query_path, 'r', encoding='utf-8') as f:
+            query = f.read()
+
+        with self.db.get_connection() as conn:
+            return conn.execute(query, {"data_referencia": self.data_referencia}).pl()
+
+    def run(self) -> pl.DataFrame:
+        """Executa o fluxo completo: Banco (1 GROUP BY) -> Pareto por critério."""
+        df = self.calcular_multicriterio_polars(self.carregar_base(), self.config_abc, self.config_multi)
+        logger.info("curva_abc_multicriterio_concluida", total_produtos=df.height,
+                    por_marca=bool(self.config_multi.get("por_marca", False)))
+        return df
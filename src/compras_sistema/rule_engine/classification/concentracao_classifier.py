@@ -0,0 +1,63 @@
+import polars as pl
+from datetime import date
+from compras_sistema.data_engine.duckdb_manager import DuckDBManager
+
+class ConcentracaoClassifier:
+    """
+    Concentração de Clientes por SKU (risco de dependência).
+
+    Uma única passada agrupada em vendas (produto x cliente) traz a quantidade
+    por cliente nas janelas de 365 e 90 dias; o resto é Polars puro:
+        qtd_clientes_365d / qtd_clientes_90d -> clientes com compra na janela
+        hhi_clientes  -> Índice Herfindahl (Σ participação²): 1.0 = cliente único
+        share_top1    -> participação do maior cliente
+        share_top3    -> participação dos 3 maiores clientes
+    """
+
+    JANELA_DIAS = 365
+    JANELA_RECENTE_DIAS = 90
+
+    def __init__(self, db_manager: DuckDBManager, data_referencia: date | None = None):
+        self.db = db_manager
+        # Data "as_of" da execução (bind parameter na query)
+        self.data_referencia = data_referencia or date.today()
+
+    def carregar_vendas_por_cliente(self) -> pl.DataFrame:
+        """Quantidade por produto/cliente nas duas janelas (um único GROUP BY no banco)."""
+        query = f"""
+            SELECT
+                CAST(cod_produto AS VARCHAR) as cod_produto,
+                cod_clifor,
+                CAST(SUM(quantidade) AS DOUBLE) as qtd_365d,
+                CAST(SUM(CASE WHEN CAST(data_movimento AS DATE) > (CAST($data_referencia AS DATE) - INTERVAL '{self.JANELA_RECENTE_DIAS} days')
+                              THEN quantidade ELSE 0 END) AS DOUBLE) as qtd_90d
+            FROM sqlite_db.vendas
+            WHERE CAST(data_movimento AS DATE) > (CAST($data_referencia AS DATE) - INTERVAL '{self.JANELA_DIAS} days')
+              AND CAST(data_movimento AS DATE) <= CAST($data_referencia AS DATE)
+            GROUP BY 1, 2
+        """
+        with self.db.get_connection() as conn:
+            return conn.execute(query, {"data_referencia": self.data_referencia}).pl()
+
+    @staticmethod
+    def calcular_concentracao_polars(df_clientes: pl.DataFrame) -> pl.DataFrame:
+        """
+        Método Estático Puro: recebe (cod_produto, cod_clifor, qtd_365d, qtd_90d)
+        e devolve as métricas de concentração por SKU em uma única agregação.
+        Devoluções líquidas (quantidade <= 0) não contam como cliente.
+        """
+        df = df_clientes.filter(pl.col("qtd_365d") > 0).with_columns([
+            (pl.col("qtd_365d") / pl.col("qtd_365d").sum().over("cod_produto")).alias("share")
+        ])
+
+        share_ordenado = pl.col("share").sort(descending=True)
+        return df.group_by("cod_produto").agg([
+            pl.len().cast(pl.Int64).alias("qtd_clientes_365d"),
+            (pl.col("qtd_90d") > 0).sum().cast(pl.Int64).alias("qtd_clientes_90d"),
+            pl.col("share").pow(2).sum().alias("hhi_clientes"),
+            share_ordenado.first().alias("share_top1"),
+            share_ordenado.head(3).sum().alias("share_top3")
+        ])
+
+    def run(self) -> pl.DataFrame:
+        return self.calcular_concentracao_polars(self.carregar_vendas_por_cliente())
@@ -1,9 +1,12 @@
 import polars as pl
+from datetime import date
 from compras_sistema.data_engine.duckdb_manager import DuckDBManager
 
 class TrendClassifier:
-    def __init__(self, db_manager: DuckDBManager):
+    def __init__(self, db_manager: DuckDBManager, data_referencia: date | None = None):
         self.db = db_manager
+        # Data "as_of" da execução (bind parameter na query)
+        self.data_referencia = data_referencia or date.today()
 
     def run(self) -> pl.DataFrame:
         """
@@ -15,22 +18,23 @@ class TrendClassifier:
                 cod_produto,
                 MAX(data_movimento) as ultima_venda,
                 -- Vendas Recentes (90 dias) vs Ano (365 dias)
-                SUM(CASE WHEN CAST(data_movimento AS DATE) >= (CURRENT_DATE - INTERVAL '90 days') THEN quantidade ELSE 0 END) as qtd_90d,
-                SUM(CASE WHEN CAST(data_movimento AS DATE) >= (CURRENT_DATE - INTERVAL '365 days') THEN quantidade ELSE 0 END) as qtd_365d,
+                SUM(CASE WHEN CAST(data_movimento AS DATE) >= (CAST($data_referencia AS DATE) - INTERVAL '90 days') THEN quantidade ELSE 0 END) as qtd_90d,
+                SUM(CASE WHEN CAST(data_movimento AS DATE) >= (CAST($data_referencia AS DATE) - INTERVAL '365 days') THEN quantidade ELSE 0 END) as qtd_365d,
                 
                 -- Contagem de Clientes Únicos
-                COUNT(DISTINCT CASE WHEN CAST(data_movimento AS DATE) >= (CURRENT_DATE - INTERVAL '90 days') THEN cod_clifor END) as clientes_atuais,
-                COUNT(DISTINCT CASE WHEN CAST(data_movimento AS DATE) < (CURRENT_DATE - INTERVAL '90 days') 
-                                     AND CAST(data_movimento AS DATE) >= (CURRENT_DATE - INTERVAL '180 days') THEN cod_clifor END) as clientes_anteriores
+                COUNT(DISTINCT CASE WHEN CAST(data_movimento AS DATE) >= (CAST($data_referencia AS DATE) - INTERVAL '90 days') THEN cod_clifor END) as clientes_atuais,
+                COUNT(DISTINCT CASE WHEN CAST(data_movimento AS DATE) < (CAST($data_referencia AS DATE) - INTERVAL '90 days') 
+                                     AND CAST(data_movimento AS DATE) >= (CAST($data_referencia AS DATE) - INTERVAL '180 days') THEN cod_clifor END) as clientes_anteriores
             FROM sqlite_db.vendas
-            WHERE CAST(data_movimento AS DATE) >= (CURRENT_DATE - INTERVAL '365 days')
+            WHERE CAST(data_movimento AS DATE) >= (CAST($data_referencia AS DATE) - INTERVAL '365 days')
+              AND CAST(data_movimento AS DATE) <= CAST($data_referencia AS DATE)
             GROUP BY 1
         )
         SELECT 
             CAST(cod_produto AS VARCHAR) as cod_produto,
             
             -- Cálculo de dias sem venda (usado para boost de ruptura)
-            date_diff('day', CAST(ultima_venda AS DATE), CURRENT_DATE) as dias_sem_venda,
+            date_diff('day', CAST(ultima_venda AS DATE), CAST($data_referencia AS DATE)) as dias_sem_venda,
 
             -- Variação de Vendas (%)
             CASE 
@@ -45,4 +49,4 @@ class TrendClassifier:
         """
         
         with self.db.get_connection() as conn:
-            return conn.execute(query).pl()
\ No newline at end of file
+            return conn.execute(query, {"data_referencia": self.data_referencia}).pl()
\ No newline at end of file
@@ -1,56 +1,118 @@
 import polars as pl
+from datetime import date
 from compras_sistema.data_engine.duckdb_manager import DuckDBManager
+from compras_sistema.rule_engine.forecast.outlier_treatment import OutlierTreatment
 
 class XYZClassifier:
-    def __init__(self, db_manager: DuckDBManager, config):
+    """
+    Calcula a Curva XYZ (Variabilidade da Demanda Diária).
+
+    As estatísticas são "zero-filled": os dias sem venda dentro da janela
+    entram na média e no desvio. Em vez de expandir a grade de dias, usamos
+    Soma (S) e Soma dos Quadrados (Q) com contagem de dias conhecida (N):
+        média = S / N
+        var   = (Q - S² / N) / (N - 1)
+
+    Antes das estatísticas, a série diária passa pelo corte de outliers
+    (seção 'outlier' do config), e a contagem de pontos cortados por SKU
+    sai na coluna qtd_outliers_cortados.
+    """
+
+    JANELA_DIAS = 365
+    THRESHOLDS_PADRAO = {"X": 0.5, "Y": 1.0}
+
+    def __init__(self, db_manager: DuckDBManager, config, data_referencia: date | None = None):
         self.db = db_manager
         self.config = config
+        # Data "as_of" da execução (bind parameter na query)
+        self.data_referencia = data_referencia or date.today()
+        self.df_diario: pl.DataFrame | None = None
 
-    def run(self) -> pl.DataFrame:
-        # A Query continua a mesma (Corrigida para olhar apenas os últimos 365 dias)
-        query = """
-        WITH vendas_recentes AS (
-            -- 1. Pega apenas vendas dos últimos 365 dias
-            SELECT 
-                cod_produto,
+    @staticmethod
+    def _ler_thresholds(config) -> dict:
+        """Lê xyz.X.threshold / xyz.Y.threshold aceitando Objeto (Pydantic) ou Dict."""
+        def ler(obj, chave):
+            try:
+                return getattr(obj, chave)
+            except AttributeError:
+                return obj[chave]
+
+        thresholds = dict(XYZClassifier.THRESHOLDS_PADRAO)
+        try:
+            cfg_xyz = ler(config, "xyz")
+            for classe in thresholds:
+                thresholds[classe] = float(ler(ler(cfg_xyz, classe), "threshold"))
+        except (AttributeError, KeyError, TypeError):
+            pass
+        return thresholds
+
+    @staticmethod
+    def _ler_config_outlier(config) -> dict:
+        """Seção 'outlier' do config (vazia = tratamento desativado)."""
+        try:
+            return getattr(config, "outlier")
+        except AttributeError:
+            try:
+                return config["outlier"]
+            except (KeyError, TypeError):
+                return {}
+
+    def carregar_vendas_diarias(self) -> pl.DataFrame:
+        """Total vendido por produto/dia na janela (um único GROUP BY no banco)."""
+        query = f"""
+            SELECT
+                CAST(cod_produto AS VARCHAR) as cod_produto,
                 CAST(data_movimento AS DATE) as data,
-                SUM(quantidade) as qtd_dia
+                CAST(SUM(quantidade) AS DOUBLE) as qtd_dia
             FROM sqlite_db.vendas
-            WHERE CAST(data_movimento AS DATE) >= (CURRENT_DATE - INTERVAL '365 days')
+            WHERE CAST(data_movimento AS DATE) > (CAST($data_referencia AS DATE) - INTERVAL '{self.JANELA_DIAS} days')
+              AND CAST(data_movimento AS DATE) <= CAST($data_referencia AS DATE)
             GROUP BY 1, 2
-        ),
-        estatisticas AS (
-            SELECT 
-                cod_produto,
-                -- Desvio padrão das vendas nos dias que houve venda
-                STDDEV(qtd_dia) as std_venda_dia,
-                
-                -- MÉDIA CORRETA: Total vendido no ano / 365 dias
-                -- (Isso garante que dias sem venda puxem a média para baixo)
-                SUM(qtd_dia) / 365.0 as media_venda_dia,
-                
-                -- Coeficiente de Variação (CV)
-                (STDDEV(qtd_dia) / NULLIF(AVG(qtd_dia), 0)) as cv
-            FROM vendas_recentes
-            GROUP BY 1
-        )
-        SELECT 
-            CAST(cod_produto AS VARCHAR) as cod_produto,
-            COALESCE(media_venda_dia, 0.0) as media_venda_dia,
-            COALESCE(std_venda_dia, 0.0) as std_venda_dia,
-            CASE 
-                WHEN media_venda_dia <= 0 THEN 'Z' -- Se média é 0, é Z (Morto)
-                WHEN cv <= 0.5 THEN 'X'  -- Muito estável
-                WHEN cv <= 1.0 THEN 'Y'  -- Variável
-                ELSE 'Z'                 -- Imprevisível
-            END as curva_xyz
-        FROM estatisticas
         """
-        
-        # --- CORREÇÃO AQUI ---
-        # Usamos o gerenciador de contexto para abrir a conexão de forma segura
         with self.db.get_connection() as conn:
-            # Executa a query e converte direto para Polars
-            df = conn.execute(query).pl()
-        
-        return df
\ No newline at end of file
+            return conn.execute(query, {"data_referencia": self.data_referencia}).pl()
+
+    @staticmethod
+    def calcular_xyz_polars(df_diario: pl.DataFrame, config, janela_dias: int = JANELA_DIAS) -> pl.DataFrame:
+        """
+        Método Estático Puro: recebe vendas diárias (cod_produto, data, qtd_dia)
+        e devolve média, desvio e CV zero-filled + curva XYZ em uma única agregação.
+        """
+        thresholds = XYZClassifier._ler_thresholds(config)
+        n = float(janela_dias)
+
+        soma = pl.col("qtd_dia").sum()
+        soma_quadrados = pl.col("qtd_dia").pow(2).sum()
+        variancia = ((soma_quadrados - soma.pow(2) / n) / (n - 1)).clip(lower_bound=0.0)
+
+        agregacoes = [
+            (soma / n).alias("media_venda_dia"),
+            variancia.sqrt().alias("std_venda_dia")
+        ]
+        if "outlier_cortado" in df_diario.columns:
+            agregacoes.append(pl.col("outlier_cortado").sum().cast(pl.Int64).alias("qtd_outliers_cortados"))
+
+        df = df_diario.group_by("cod_produto").agg(agregacoes).with_columns([
+            pl.when(pl.col("media_venda_dia") > 0)
+            .then(pl.col("std_venda_dia") / pl.col("media_venda_dia"))
+            .otherwise(None)
+            .alias("cv_venda_dia")
+        ])
+
+        return df.with_columns([
+            pl.col("media_venda_dia").fill_null(0.0),
+            pl.col("std_venda_dia").fill_null(0.0),
+            pl.when(pl.col("media_venda_dia").fill_null(0.0) <= 0).then(pl.lit("Z"))   # Morto
+            .when(pl.col("cv_venda_dia") <= thresholds["X"]).then(pl.lit("X"))         # Muito estável
+            .when(pl.col("cv_venda_dia") <= thresholds["Y"]).then(pl.lit("Y"))         # Variável
+            .otherwise(pl.lit("Z"))                                                    # Imprevisível
+            .alias("curva_xyz")
+        ])
+
+    def run(self) -> pl.DataFrame:
+        # Guardamos a série diária para reaproveitamento (ex.: motores de previsão)
+        # (já com os outliers cortados, para que a previsão use a mesma série)
+        self.df_diario = OutlierTreatment.cortar_outliers(
+            self.carregar_vendas_diarias(), self._ler_config_outlier(self.config)
+        )
+        return self.calcular_xyz_polars(self.df_diario, self.config, self.JANELA_DIAS)
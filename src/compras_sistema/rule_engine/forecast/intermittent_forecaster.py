@@ -0,0 +1,142 @@
+import numpy as np
+import polars as pl
+from datetime import date, timedelta
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class IntermittentForecaster:
+    """
+    Previsão de Demanda Intermitente (Croston / SBA / TSB).
+
+    Todos os SKUs são processados de uma vez: a série diária vira uma matriz
+    NumPy (SKUs x Dias) e a recursão de suavização avança dia a dia sobre
+    vetores, nunca SKU a SKU.
+
+    Saída compatível com o EstoqueMath: media_venda_dia / std_venda_dia.
+    """
+
+    METODOS = ("croston", "sba", "tsb")
+    JANELA_DIAS = 365
+
+    @staticmethod
+    def montar_matriz(df_diario: pl.DataFrame, janela_dias: int = JANELA_DIAS,
+                      data_referencia: date | None = None) -> tuple[pl.Series, np.ndarray]:
+        """
+        Converte (cod_produto, data, qtd_dia) em matriz densa [SKU, dia].
+        A coluna 0 é o dia mais antigo da janela e a última é a data de referência.
+        """
+        data_referencia = data_referencia or date.today()
+        inicio = data_referencia - timedelta(days=janela_dias - 1)
+
+        df = df_diario.filter(
+            (pl.col("data") >= inicio) & (pl.col("data") <= data_referencia)
+        )
+        codigos = df["cod_produto"].unique().sort()
+        matriz = np.zeros((len(codigos), janela_dias), dtype=np.float64)
+
+        if df.height == 0:
+            return codigos, matriz
+
+        df_idx = df.join(
+            codigos.to_frame().with_row_index("idx_sku"), on="cod_produto", how="left"
+        ).with_columns([
+            (pl.col("data") - pl.lit(inicio)).dt.total_days().alias("idx_dia")
+        ])
+
+        np.add.at(
+            matriz,
+            (df_idx["idx_sku"].to_numpy(), df_idx["idx_dia"].to_numpy()),
+            df_idx["qtd_dia"].cast(pl.Float64).to_numpy()
+        )
+        return codigos, matriz
+
+    @staticmethod
+    def prever_matriz(matriz: np.ndarray, metodo: str = "sba",
+                      alpha: float = 0.1, beta: float = 0.1) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Aplica Croston/SBA/TSB em todas as linhas simultaneamente.
+
+        Returns:
+            (previsao_dia, sigma_dia): previsão para o próximo dia e desvio
+            dos erros um-passo-à-frente (resíduo) de cada SKU.
+        """
+        metodo = metodo.lower()
+        if metodo not in IntermittentForecaster.METODOS:
+            raise ValueError(f"Método de previsão intermitente inválido: '{metodo}'")
+
+        n_skus, n_dias = matriz.shape
+        previsao = np.zeros(n_skus)
+        sigma = np.zeros(n_skus)
+        if n_skus == 0:
+            return previsao, sigma
+
+        tem_venda = matriz > 0
+        com_historico = tem_venda.any(axis=1)
+        linhas = np.arange(n_skus)
+
+        # Inicialização na primeira ocorrência de demanda de cada SKU
+        primeiro = tem_venda.argmax(axis=1)
+        z = matriz[linhas, primeiro].copy()      # tamanho da demanda
+        p = (primeiro + 1).astype(np.float64)    # intervalo entre demandas
+        prob = 1.0 / p                           # probabilidade de demanda (TSB)
+        q = np.zeros(n_skus)                     # períodos desde a última demanda
+
+        fator_sba = (1.0 - alpha / 2.0) if metodo == "sba" else 1.0
+        soma_erro2 = np.zeros(n_skus)
+        n_erros = np.zeros(n_skus)
+
+        def prever_atual():
+            if metodo == "tsb":
+                return prob * z
+            return fator_sba * z / p
+
+        for t in range(n_dias):
+            ativo = com_historico & (t > primeiro)
+            if not ativo.any():
+                continue
+
+            d_t = matriz[:, t]
+            demanda = tem_venda[:, t] & ativo
+
+            # Resíduo um-passo-à-frente (antes de atualizar os estados)
+            erro = np.where(ativo, d_t - prever_atual(), 0.0)
+            soma_erro2 += erro * erro
+            n_erros += ativo
+
+            q = np.where(ativo, q + 1.0, q)
+            z = np.where(demanda, z + alpha * (d_t - z), z)
+            if metodo == "tsb":
+                prob = np.where(ativo, prob + beta * (demanda - prob), prob)
+            else:
+                p = np.where(demanda, p + alpha * (q - p), p)
+            q = np.where(demanda, 0.0, q)
+
+        previsao = np.where(com_historico, prever_atual(), 0.0)
+        sigma = np.sqrt(np.divide(soma_erro2, n_erros, out=np.zeros(n_skus), where=n_erros > 0))
+        return previsao, sigma
+
+    @staticmethod
+    def prever_polars(df_diario: pl.DataFrame, config_intermitente: dict,
+                      skus: list | None = None, janela_dias: int = JANELA_DIAS,
+                      data_referencia: date | None = None) -> pl.DataFrame:
+        """
+        Método Estático Puro: devolve cod_produto, media_venda_dia, std_venda_dia
+        e metodo_demanda para os SKUs informados (ou todos da série).
+        """
+        metodo = str(config_intermitente.get("metodo", "sba")).lower()
+        alpha = float(config_intermitente.get("alpha", 0.1))
+        beta = float(config_intermitente.get("beta", 0.1))
+
+        if skus is not None:
+            df_diario = df_diario.filter(pl.col("cod_produto").is_in(skus))
+
+        codigos, matriz = IntermittentForecaster.montar_matriz(df_diario, janela_dias, data_referencia)
+        previsao, sigma = IntermittentForecaster.prever_matriz(matriz, metodo, alpha, beta)
+
+        logger.info("previsao_intermitente_concluida", metodo=metodo, skus=len(codigos))
+        return pl.DataFrame({
+            "cod_produto": codigos,
+            "media_venda_dia": previsao,
+            "std_venda_dia": sigma,
+        }).with_columns(pl.lit(metodo.upper()).alias("metodo_demanda"))
@@ -0,0 +1,95 @@
+import polars as pl
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class OutlierTreatment:
+    """
+    Tratamento de Outliers de Demanda (corte/capping por SKU).
+
+    Pedidos pontuais (ex.: venda em lote para um único cliente) inflam o desvio
+    e, por consequência, o estoque de segurança por meses. Antes de calcular as
+    estatísticas de XYZ e dos motores de previsão, cada ponto acima do limite
+    do próprio SKU é cortado para o limite:
+        desvio -> limite = média + k * σ
+        mad    -> limite = mediana + k * 1.4826 * MAD
+
+    As estatísticas do corte usam apenas os períodos COM venda: em série
+    zero-filled, um item intermitente teria média/σ quase nulos e a única
+    venda do ano seria cortada. SKUs com menos de `minimo_pontos` períodos
+    com venda não são tratados.
+
+    Tudo é feito em uma única passada com janelas (over) por cod_produto.
+    """
+
+    METODOS = ("desvio", "mad")
+    FATOR_MAD = 1.4826  # Torna o MAD comparável ao desvio padrão (distribuição normal)
+
+    @staticmethod
+    def _ler_config(config_outlier) -> dict:
+        """Normaliza a seção 'outlier' (Objeto, Dict ou None) com valores padrão."""
+        if config_outlier is None:
+            config_outlier = {}
+        elif not isinstance(config_outlier, dict):
+            config_outlier = dict(config_outlier)
+
+        metodo = str(config_outlier.get("metodo", "desvio")).lower()
+        if metodo not in OutlierTreatment.METODOS:
+            raise ValueError(f"Método de outlier inválido: '{metodo}'. Use um de {OutlierTreatment.METODOS}")
+
+        return {
+            "ativada": bool(config_outlier.get("ativada", False)),
+            "fator": float(config_outlier.get("fator_multiplicador", 2.0)),
+            "metodo": metodo,
+            "minimo_pontos": int(config_outlier.get("minimo_pontos", 5)),
+        }
+
+    @staticmethod
+    def cortar_outliers(df: pl.DataFrame, config_outlier, coluna: str = "qtd_dia",
+                        chave: str = "cod_produto") -> pl.DataFrame:
+        """
+        Método Estático Puro: corta `coluna` no limite do SKU e acrescenta a
+        coluna booleana 'outlier_cortado'. Com o tratamento desativado, devolve
+        a série intacta (outlier_cortado = False).
+        """
+        cfg = OutlierTreatment._ler_config(config_outlier)
+        if not cfg["ativada"] or df.height == 0:
+            return df.with_columns(pl.lit(False).alias("outlier_cortado"))
+
+        valor = pl.col(coluna)
+        com_venda = valor.filter(valor > 0)
+        k = cfg["fator"]
+
+        if cfg["metodo"] == "mad":
+            mediana = com_venda.median()
+            mad = (com_venda - mediana).abs().median()
+            limite = mediana + k * OutlierTreatment.FATOR_MAD * mad
+        else:
+            limite = com_venda.mean() + k * com_venda.std()
+
+        df = df.with_columns([
+            limite.over(chave).alias("_limite_outlier"),
+            (valor > 0).sum().over(chave).alias("_pontos_venda")
+        ])
+
+        cortado = (
+            (pl.col("_pontos_venda") >= cfg["minimo_pontos"])
+            & pl.col("_limite_outlier").is_not_null()
+            & (valor > pl.col("_limite_outlier"))
+        )
+
+        df = df.with_columns([
+            pl.when(cortado).then(pl.col("_limite_outlier")).otherwise(valor).cast(pl.Float64).alias(coluna),
+            cortado.alias("outlier_cortado")
+        ]).drop(["_limite_outlier", "_pontos_venda"])
+
+        logger.info("outliers_cortados", metodo=cfg["metodo"], fator=k,
+                    pontos=int(df["outlier_cortado"].sum()))
+        return df
+
+    @staticmethod
+    def contar_por_sku(df: pl.DataFrame, chave: str = "cod_produto") -> pl.DataFrame:
+        """Quantidade de pontos cortados por SKU (qtd_outliers_cortados)."""
+        return df.group_by(chave).agg(
+            pl.col("outlier_cortado").sum().cast(pl.Int64).alias("qtd_outliers_cortados")
+        )
@@ -0,0 +1,260 @@
+import numpy as np
+import polars as pl
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import product
+import structlog
+
+from compras_sistema.rule_engine.forecast.outlier_treatment import OutlierTreatment
+
+logger = structlog.get_logger(__name__)
+
+class SmoothingForecaster:
+    """
+    Previsão por Suavização Exponencial em baldes mensais (SES / Holt / Holt-Winters).
+
+    Cada modelo é "ajustado" por busca em grade: para cada combinação de
+    parâmetros a recursão roda sobre TODOS os SKUs ao mesmo tempo (vetores
+    NumPy) e cada SKU fica com a combinação de menor erro. Em catálogos muito
+    grandes a matriz é fatiada e distribuída em um pool de processos.
+
+    Saída compatível com o EstoqueMath: media_venda_dia / std_venda_dia.
+    """
+
+    MODELOS = ("ses", "holt", "holt_winters")
+    SAZONALIDADE = 12
+    DIAS_MES = 30
+
+    GRADE_ALPHA = (0.1, 0.3, 0.5, 0.7, 0.9)
+    GRADE_BETA = (0.05, 0.15, 0.3)
+    GRADE_GAMMA = (0.1, 0.3)
+
+    def __init__(self, db_manager, config_suavizacao: dict, data_referencia: date | None = None,
+                 config_outlier: dict | None = None):
+        self.db = db_manager
+        self.config = config_suavizacao
+        self.config_outlier = config_outlier
+        # Data "as_of" da execução (bind parameter na query)
+        self.data_referencia = data_referencia or date.today()
+
+    # ------------------------------------------------------------------
+    # Dados
+    # ------------------------------------------------------------------
+    def carregar_vendas_mensais(self, meses: int) -> pl.DataFrame:
+        """Total vendido por produto/mês nos últimos N meses fechados."""
+        query = f"""
+            SELECT
+                CAST(cod_produto AS VARCHAR) as cod_produto,
+                CAST(date_trunc('month', CAST(data_movimento AS DATE)) AS DATE) as mes,
+                CAST(SUM(quantidade) AS DOUBLE) as qtd_mes
+            FROM sqlite_db.vendas
+            WHERE CAST(data_movimento AS DATE) >= (date_trunc('month', CAST($data_referencia AS DATE)) - INTERVAL '{int(meses)} months')
+              AND CAST(data_movimento AS DATE) < date_trunc('month', CAST($data_referencia AS DATE))
+            GROUP BY 1, 2
+        """
+        with self.db.get_connection() as conn:
+            return conn.execute(query, {"data_referencia": self.data_referencia}).pl()
+
+    @staticmethod
+    def montar_matriz_mensal(df_mensal: pl.DataFrame, meses: int,
+                             data_referencia: date | None = None) -> tuple[pl.Series, np.ndarray]:
+        """
+        Converte (cod_produto, mes, qtd_mes) em matriz densa [SKU, mês].
+        A última coluna é o mês fechado imediatamente anterior à data de referência.
+        """
+        data_referencia = data_referencia or date.today()
+        indice_ref = data_referencia.year * 12 + (data_referencia.month - 1)
+
+        df = df_mensal.with_columns([
+            (pl.lit(indice_ref) - (pl.col("mes").dt.year() * 12 + pl.col("mes").dt.month() - 1))
+            .alias("meses_atras")
+        ]).filter((pl.col("meses_atras") >= 1) & (pl.col("meses_atras") <= meses))
+
+        codigos = df["cod_produto"].unique().sort()
+        matriz = np.zeros((len(codigos), meses), dtype=np.float64)
+        if df.height == 0:
+            return codigos, matriz
+
+        df_idx = df.join(codigos.to_frame().with_row_index("idx_sku"), on="cod_produto", how="left")
+        np.add.at(
+            matriz,
+            (df_idx["idx_sku"].to_numpy(), meses - df_idx["meses_atras"].to_numpy()),
+            df_idx["qtd_mes"].cast(pl.Float64).to_numpy()
+        )
+        return codigos, matriz
+
+    # ------------------------------------------------------------------
+    # Recursões vetorizadas (uma combinação de parâmetros, todos os SKUs)
+    # ------------------------------------------------------------------
+    # Erros de 1 passo só contam a partir de 'inicio' (janela comum no modo auto)
+    @staticmethod
+    def _rodar_ses(y: np.ndarray, alpha: float, inicio: int = 1):
+        nivel = y[:, 0].copy()
+        sse = np.zeros(y.shape[0])
+        for t in range(1, y.shape[1]):
+            erro = y[:, t] - nivel
+            if t >= inicio:
+                sse += erro * erro
+            nivel = nivel + alpha * erro
+        return nivel, sse, y.shape[1] - max(inicio, 1)
+
+    @staticmethod
+    def _rodar_holt(y: np.ndarray, alpha: float, beta: float, inicio: int = 1):
+        nivel = y[:, 0].copy()
+        tendencia = y[:, 1] - y[:, 0]
+        sse = np.zeros(y.shape[0])
+        for t in range(1, y.shape[1]):
+            erro = y[:, t] - (nivel + tendencia)
+            if t >= inicio:
+                sse += erro * erro
+            nivel_novo = alpha * y[:, t] + (1 - alpha) * (nivel + tendencia)
+            tendencia = beta * (nivel_novo - nivel) + (1 - beta) * tendencia
+            nivel = nivel_novo
+        return nivel + tendencia, sse, y.shape[1] - max(inicio, 1)
+
+    @staticmethod
+    def _rodar_holt_winters(y: np.ndarray, alpha: float, beta: float, gamma: float, inicio: int = 1):
+        m = SmoothingForecaster.SAZONALIDADE
+        nivel = y[:, :m].mean(axis=1)
+        tendencia = (y[:, m:2 * m].mean(axis=1) - nivel) / m
+        sazonal = y[:, :m] - nivel[:, None]
+        sse = np.zeros(y.shape[0])
+        for t in range(m, y.shape[1]):
+            s_t = sazonal[:, t % m]
+            erro = y[:, t] - (nivel + tendencia + s_t)
+            if t >= inicio:
+                sse += erro * erro
+            nivel_novo = alpha * (y[:, t] - s_t) + (1 - alpha) * (nivel + tendencia)
+            tendencia = beta * (nivel_novo - nivel) + (1 - beta) * tendencia
+            sazonal[:, t % m] = gamma * (y[:, t] - nivel_novo) + (1 - gamma) * s_t
+            nivel = nivel_novo
+        prox = nivel + tendencia + sazonal[:, y.shape[1] % m]
+        return prox, sse, y.shape[1] - max(inicio, m)
+
+    @staticmethod
+    def ajustar_modelo(y: np.ndarray, modelo: str, inicio: int = 1) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Busca em grade (batched) para um modelo.
+
+        'inicio' é o primeiro mês cujo erro de 1 passo entra no SSE: para o AIC
+        ser comparável entre modelos todos precisam ser pontuados na MESMA
+        janela (n·log(SSE/n) muda com n).
+
+        Returns:
+            (previsao_mes, sigma_mes, aic) por SKU.
+        """
+        if modelo == "ses":
+            grade, rodar, k = [(a,) for a in SmoothingForecaster.GRADE_ALPHA], SmoothingForecaster._rodar_ses, 2
+        elif modelo == "holt":
+            grade = list(product(SmoothingForecaster.GRADE_ALPHA, SmoothingForecaster.GRADE_BETA))
+            rodar, k = SmoothingForecaster._rodar_holt, 4
+        else:
+            grade = list(product(SmoothingForecaster.GRADE_ALPHA, SmoothingForecaster.GRADE_BETA,
+                                 SmoothingForecaster.GRADE_GAMMA))
+            rodar, k = SmoothingForecaster._rodar_holt_winters, 4 + SmoothingForecaster.SAZONALIDADE
+
+        melhor_prev = np.zeros(y.shape[0])
+        melhor_sse = np.full(y.shape[0], np.inf)
+        n_obs = 1
+        for params in grade:
+            prev, sse, n_obs = rodar(y, *params, inicio=inicio)
+            melhor = sse < melhor_sse
+            melhor_prev = np.where(melhor, prev, melhor_prev)
+            melhor_sse = np.where(melhor, sse, melhor_sse)
+
+        n_obs = max(n_obs, 1)
+        sigma = np.sqrt(melhor_sse / n_obs)
+        aic = n_obs * np.log(melhor_sse / n_obs + 1e-9) + 2 * k
+        return np.clip(melhor_prev, 0.0, None), sigma, aic
+
+    @staticmethod
+    def prever_matriz(matriz: np.ndarray, modelo: str = "auto") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Previsão do próximo mês para todas as linhas.
+
+        modelo='auto' escolhe, por SKU, o menor AIC entre os modelos viáveis
+        (Holt-Winters exige ao menos 2 ciclos de 12 meses). Todos são pontuados
+        nos mesmos últimos n - m erros (m = 12 se Holt-Winters for viável).
+
+        Returns:
+            (previsao_mes, sigma_mes, indice_modelo) onde indice_modelo aponta para MODELOS.
+        """
+        n_skus, n_meses = matriz.shape
+        if n_skus == 0:
+            return np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64)
+
+        viaveis = ["ses"]
+        if n_meses >= 3:
+            viaveis.append("holt")
+        if n_meses >= 2 * SmoothingForecaster.SAZONALIDADE:
+            viaveis.append("holt_winters")
+
+        if modelo != "auto":
+            if modelo not in SmoothingForecaster.MODELOS:
+                raise ValueError(f"Modelo de suavização inválido: '{modelo}'")
+            if modelo not in viaveis:
+                raise ValueError(f"Histórico de {n_meses} meses insuficiente para '{modelo}'")
+            viaveis = [modelo]
+
+        inicio = SmoothingForecaster.SAZONALIDADE if "holt_winters" in viaveis else 1
+        resultados = [SmoothingForecaster.ajustar_modelo(matriz, m, inicio) for m in viaveis]
+        aics = np.vstack([r[2] for r in resultados])
+        escolha = aics.argmin(axis=0)
+        linhas = np.arange(n_skus)
+
+        previsao = np.vstack([r[0] for r in resultados])[escolha, linhas]
+        sigma = np.vstack([r[1] for r in resultados])[escolha, linhas]
+        indice_modelo = np.array([SmoothingForecaster.MODELOS.index(m) for m in viaveis])[escolha]
+        return previsao, sigma, indice_modelo
+
+    @staticmethod
+    def prever_matriz_paralelo(matriz: np.ndarray, modelo: str, tamanho_lote: int,
+                               max_workers: int | None = None):
+        """Fallback para catálogos grandes: fatia a matriz e distribui entre processos."""
+        fatias = [matriz[i:i + tamanho_lote] for i in range(0, matriz.shape[0], tamanho_lote)]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            partes = list(pool.map(SmoothingForecaster.prever_matriz, fatias, [modelo] * len(fatias)))
+        return tuple(np.concatenate([p[i] for p in partes]) for i in range(3))
+
+    @staticmethod
+    def prever_polars(df_mensal: pl.DataFrame, config_suavizacao: dict,
+                      skus: list | None = None, data_referencia: date | None = None) -> pl.DataFrame:
+        """
+        Método Estático Puro: devolve cod_produto, media_venda_dia, std_venda_dia
+        e metodo_demanda (modelo escolhido) para os SKUs informados.
+        """
+        meses = int(config_suavizacao.get("meses_historico", 36))
+        modelo = str(config_suavizacao.get("modelo", "auto")).lower()
+        limite_paralelo = int(config_suavizacao.get("limite_skus_paralelo", 50000))
+
+        if skus is not None:
+            df_mensal = df_mensal.filter(pl.col("cod_produto").is_in(skus))
+
+        codigos, matriz = SmoothingForecaster.montar_matriz_mensal(df_mensal, meses, data_referencia)
+
+        if matriz.shape[0] > limite_paralelo:
+            logger.info("suavizacao_modo_paralelo", skus=matriz.shape[0], lote=limite_paralelo)
+            previsao, sigma, idx_modelo = SmoothingForecaster.prever_matriz_paralelo(
+                matriz, modelo, limite_paralelo, config_suavizacao.get("processos")
+            )
+        else:
+            previsao, sigma, idx_modelo = SmoothingForecaster.prever_matriz(matriz, modelo)
+
+        nomes = np.array([m.upper() for m in SmoothingForecaster.MODELOS])
+        dias = SmoothingForecaster.DIAS_MES
+
+        logger.info("previsao_suavizacao_concluida", modelo=modelo, skus=len(codigos))
+        return pl.DataFrame({
+            "cod_produto": codigos,
+            "media_venda_dia": previsao / dias,
+            "std_venda_dia": sigma / np.sqrt(dias),
+            "metodo_demanda": nomes[idx_modelo] if len(codigos) else np.array([], dtype=str),
+        })
+
+    def run(self, skus: list | None = None) -> pl.DataFrame:
+        """Executa o fluxo completo: Banco -> Matriz Mensal -> Previsão."""
+        meses = int(self.config.get("meses_historico", 36))
+        df_mensal = OutlierTreatment.cortar_outliers(
+            self.carregar_vendas_mensais(meses), self.config_outlier, coluna="qtd_mes"
+        )
+        return self.prever_polars(df_mensal, self.config, skus=skus, data_referencia=self.data_referencia)
@@ -0,0 +1,238 @@
+import io
+import shutil
+import tempfile
+import polars as pl
+import structlog
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set
+
+from compras_sistema.rule_engine.base_rule import BaseRule
+
+logger = structlog.get_logger(__name__)
+
+class RuleRegistry:
+    """
+    Registro de Regras (BaseRule) com execução em um único plano lazy.
+
+    A ordem vem das colunas declaradas, não da ordem de chamada:
+      - quem CRIA uma coluna (saída que não é entrada) roda antes de quem a lê;
+      - quem MODIFICA uma coluna no lugar (entrada e saída) roda antes de quem
+        só a lê, e depois de quem a cria;
+      - entre modificadores da mesma coluna vale a ordem de registro.
+    executar() só inclui as regras necessárias para as colunas pedidas e
+    recalcular() só refaz as regras afetadas por uma mudança de config. Todas
+    as regras escolhidas são encadeadas sobre o mesmo LazyFrame e o plano é
+    coletado uma única vez.
+    """
+
+    def __init__(self):
+        self._regras: Dict[str, BaseRule] = {}
+
+    def registrar(self, regra: BaseRule) -> "RuleRegistry":
+        if not regra.nome:
+            raise ValueError(f"Regra sem nome: {regra!r}")
+        if regra.nome in self._regras:
+            raise ValueError(f"Regra já registrada: '{regra.nome}'")
+        self._regras[regra.nome] = regra
+        return self
+
+    @property
+    def regras(self) -> List[BaseRule]:
+        return list(self._regras.values())
+
+    @property
+    def secoes_config(self) -> List[str]:
+        """Todas as seções de config lidas por alguma regra registrada."""
+        return sorted({s for r in self._regras.values() for s in r.secoes_config})
+
+    @classmethod
+    def padrao(cls, indices_sazonais: dict | None = None, score_engine=None,
+               data_referencia: date | None = None) -> "RuleRegistry":
+        """Registro com as etapas do Motor Matemático (equivalente à sequência de EstoqueMath)."""
+        from compras_sistema.rule_engine.stock.estoque_rules import (
+            SanitizeRule, SeasonalityRule, TrendRule, SafetyStockRule,
+            NeedsRule, LotRule, ScoreRule, DiagnosisRule,
+        )
+        return (cls()
+            .registrar(SanitizeRule())
+            .registrar(SeasonalityRule(indices_sazonais, data_referencia))
+            .registrar(TrendRule())
+            .registrar(SafetyStockRule())
+            .registrar(NeedsRule(data_referencia))
+            .registrar(LotRule())
+            .registrar(ScoreRule(score_engine))
+            .registrar(DiagnosisRule(data_referencia)))
+
+    # ------------------------------------------------------------------
+    # Grafo de dependências
+    # ------------------------------------------------------------------
+    def _dependencias(self) -> Dict[str, Set[str]]:
+        """nome -> regras que precisam rodar antes dele."""
+        posicao = {nome: i for i, nome in enumerate(self._regras)}
+        deps: Dict[str, Set[str]] = {nome: set() for nome in self._regras}
+
+        for leitor in self._regras.values():
+            for coluna in leitor.entradas:
+                leitor_modifica = coluna in leitor.saidas
+                for autor in self._regras.values():
+                    if autor is leitor or coluna not in autor.saidas:
+                        continue
+                    autor_modifica = coluna in autor.entradas
+                    if not autor_modifica:
+                        deps[leitor.nome].add(autor.nome)
+                    elif not leitor_modifica or posicao[autor.nome] < posicao[leitor.nome]:
+                        deps[leitor.nome].add(autor.nome)
+        return deps
+
+    def _dependentes(self) -> Dict[str, Set[str]]:
+        """nome -> regras que dependem dele (arestas invertidas)."""
+        inversas: Dict[str, Set[str]] = {nome: set() for nome in self._regras}
+        for nome, antes in self._dependencias().items():
+            for dep in antes:
+                inversas[dep].add(nome)
+        return inversas
+
+    @staticmethod
+    def _fecho(inicio: Iterable[str], arestas: Dict[str, Set[str]]) -> Set[str]:
+        visitados, pilha = set(), list(inicio)
+        while pilha:
+            nome = pilha.pop()
+            if nome not in visitados:
+                visitados.add(nome)
+                pilha.extend(arestas[nome])
+        return visitados
+
+    def ordenar(self, nomes: Iterable[str] | None = None) -> List[BaseRule]:
+        """Ordem topológica (Kahn); empates seguem a ordem de registro."""
+        escolhidas = set(self._regras) if nomes is None else set(nomes)
+        desconhecidas = escolhidas - set(self._regras)
+        if desconhecidas:
+            raise ValueError(f"Regras não registradas: {sorted(desconhecidas)}")
+
+        dependencias = self._dependencias()
+        pendentes = {n: dependencias[n] & escolhidas for n in escolhidas}
+        ordem = []
+        while pendentes:
+            prontas = [n for n in self._regras if n in pendentes and not pendentes[n]]
+            if not prontas:
+                raise ValueError(f"Dependência circular entre regras: {sorted(pendentes)}")
+            nome = prontas[0]
+            ordem.append(self._regras[nome])
+            del pendentes[nome]
+            for restantes in pendentes.values():
+                restantes.discard(nome)
+        return ordem
+
+    # ------------------------------------------------------------------
+    # Seleção
+    # ------------------------------------------------------------------
+    def selecionar(self, colunas: Iterable[str] | None = None) -> List[BaseRule]:
+        """Regras necessárias para produzir 'colunas' (todas, se None)."""
+        if colunas is None:
+            return self.ordenar()
+        colunas = set(colunas)
+        alvo = [r.nome for r in self._regras.values() if colunas & set(r.saidas)]
+        return self.ordenar(self._fecho(alvo, self._dependencias()))
+
+    def afetadas(self, secoes_alteradas: Iterable[str]) -> List[BaseRule]:
+        """
+        Regras a refazer quando 'secoes_alteradas' do config mudam (aceita chaves
+        achatadas como 'compras.meses_cobertura'): as que usam
+        a seção, tudo que depende delas e, para colunas modificadas no lugar,
+        as regras que as criam (senão a modificação seria aplicada sobre o
+        valor já modificado da execução anterior).
+        """
+        secoes = {s.split(".")[0] for s in secoes_alteradas}
+        dependencias, dependentes = self._dependencias(), self._dependentes()
+        nomes = self._fecho([r.nome for r in self._regras.values() if secoes & set(r.secoes_config)], dependentes)
+
+        while True:
+            modificadas = {c for n in nomes for c in self._regras[n].saidas if c in self._regras[n].entradas}
+            autores = {
+                dep for n in nomes for dep in dependencias[n]
+                if modificadas & (set(self._regras[dep].saidas) - set(self._regras[dep].entradas))
+            }
+            novos = self._fecho(autores, dependentes) - nomes
+            if not novos:
+                return self.ordenar(nomes)
+            nomes |= novos
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+    def plano(self, df: pl.LazyFrame, config: Any, regras: List[BaseRule]) -> pl.LazyFrame:
+        """Encadeia as regras em um único LazyFrame, validando as entradas declaradas."""
+        disponiveis = set(df.collect_schema().names())
+        for regra in regras:
+            faltantes = [c for c in regra.entradas if c not in disponiveis]
+            if faltantes:
+                raise ValueError(f"Regra '{regra.nome}' sem colunas de entrada: {faltantes}")
+            disponiveis |= set(regra.saidas)
+            df = regra.apply(df, config)
+        return df
+
+    def executar(self, df: pl.DataFrame | pl.LazyFrame, config: Any,
+                 colunas: Iterable[str] | None = None, particoes: int = 1,
+                 pasta_spill: Path | None = None) -> pl.DataFrame | pl.LazyFrame:
+        """
+        Roda as regras necessárias para 'colunas' (todas, se None).
+        DataFrame -> coleta uma vez e devolve DataFrame; LazyFrame -> devolve o plano.
+        Com particoes > 1 (modo baixa memória) ver executar_particionado().
+        """
+        regras = self.selecionar(colunas)
+        logger.info("regras_executadas", regras=[r.nome for r in regras], particoes=particoes)
+        return self._rodar(df, config, regras, particoes, pasta_spill)
+
+    def recalcular(self, df: pl.DataFrame | pl.LazyFrame, config: Any,
+                   secoes_alteradas: Iterable[str], particoes: int = 1,
+                   pasta_spill: Path | None = None) -> pl.DataFrame | pl.LazyFrame:
+        """
+        Recomputação parcial sobre o resultado de uma execução anterior.
+        Ex.: mudou lote.limite_virada -> refaz só lote, score e diagnóstico.
+        """
+        regras = self.afetadas(secoes_alteradas)
+        logger.info("regras_recalculadas", secoes=list(secoes_alteradas), regras=[r.nome for r in regras])
+        return self._rodar(df, config, regras, particoes, pasta_spill)
+
+    def executar_particionado(self, df: pl.DataFrame, config: Any, regras: List[BaseRule],
+                              particoes: int, pasta_spill: Path | None = None) -> pl.DataFrame:
+        """
+        Modo baixa memória: divide os SKUs por hash de cod_produto, roda o plano
+        em cada partição e grava o resultado em Arrow IPC (pasta_spill), liberando
+        os intermediários antes da próxima. Regras com agregado global são
+        "preparadas" no frame inteiro antes (ver BaseRule.preparar), então o
+        resultado é idêntico ao da execução em memória, inclusive a ordem das linhas.
+        """
+        regras = [r.preparar(df.lazy(), config) for r in regras]
+        df = df.with_row_index("_ordem_particao").with_columns(
+            (pl.col("cod_produto").hash(seed=0) % particoes).alias("_particao")
+        )
+
+        pasta = Path(pasta_spill) if pasta_spill else Path(tempfile.mkdtemp(prefix="motor_"))
+        pasta.mkdir(parents=True, exist_ok=True)
+        arquivos = []
+        try:
+            # Uma partição materializada por vez (partition_by copiaria todas de uma vez)
+            for indice in range(particoes):
+                parte = df.lazy().filter(pl.col("_particao") == indice).drop("_particao")
+                arquivo = pasta / f"motor_parte_{indice}.arrow"
+                self.plano(parte, config, regras).collect().write_ipc(arquivo)
+                arquivos.append(arquivo)
+            del df
+            resultado = pl.concat([pl.read_ipc(io.BytesIO(a.read_bytes())) for a in arquivos], how="vertical")
+        finally:
+            for arquivo in arquivos:
+                arquivo.unlink(missing_ok=True)
+            if not pasta_spill:
+                shutil.rmtree(pasta, ignore_errors=True)
+
+        logger.info("regras_particionadas", particoes=len(arquivos), linhas=resultado.height)
+        return resultado.sort("_ordem_particao").drop("_ordem_particao")
+
+    def _rodar(self, df, config, regras: List[BaseRule], particoes: int = 1, pasta_spill: Path | None = None):
+        if isinstance(df, pl.LazyFrame):
+            return self.plano(df, config, regras)
+        if particoes > 1 and df.height > 0:
+            return self.executar_particionado(df, config, regras, particoes, pasta_spill)
+        return self.plano(df.lazy(), config, regras).collect()
@@ -0,0 +1,179 @@
+import polars as pl
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class BudgetOptimizer:
+    """
+    Otimização da Compra sob Orçamento (mochila gulosa vetorizada).
+
+    Cada sugestão é quebrada em LOTES (múltiplos de lote_economico). Cada lote
+    recebe um valor marginal por real:
+        valor = score x (un. que cobrem a ruptura + peso_excedente x un. restantes)
+        razão = valor / custo do lote
+    As unidades "de ruptura" são as que levam a posição (estoque + OC) até o
+    ponto de suprimento; acima disso o ganho de nível de serviço é menor.
+
+    Dentro de cada grupo (marca/fornecedor) os lotes são ordenados pela razão e
+    aprovados enquanto o custo acumulado couber no orçamento (cum_sum). Passadas
+    extras de preenchimento aproveitam a sobra com lotes menores que ficaram de
+    fora. Tudo em expressões Polars (explode + over), sem laço por SKU.
+    """
+
+    PESO_EXCEDENTE_PADRAO = 0.5
+    PASSADAS_PREENCHIMENTO = 3
+
+    @staticmethod
+    def _ler_config(config_orcamento) -> dict:
+        config_orcamento = config_orcamento or {}
+        return {
+            "agrupar_por": config_orcamento.get("agrupar_por", "marca"),
+            "valores": {str(k): float(v) for k, v in (config_orcamento.get("valores") or {}).items()},
+            "padrao": config_orcamento.get("padrao"),
+            "peso_excedente": float(config_orcamento.get("peso_excedente", BudgetOptimizer.PESO_EXCEDENTE_PADRAO)),
+        }
+
+    @staticmethod
+    def sobra_orcamento(config_orcamento: dict) -> tuple[str, pl.Expr]:
+        """
+        (coluna do grupo, expressão) com o orçamento ainda livre do grupo de cada
+        linha, dada a sugestao_final atual. Nulo = grupo sem orçamento.
+        Usado por etapas posteriores (ex.: antecipação de pedidos) para não estourar o corte.
+        """
+        cfg = BudgetOptimizer._ler_config(config_orcamento)
+        grupo = cfg["agrupar_por"]
+        orcamento = pl.col(grupo).cast(pl.Utf8).replace_strict(
+            cfg["valores"], default=cfg["padrao"], return_dtype=pl.Float64
+        )
+        gasto = (pl.col("sugestao_final") * pl.col("custo_unitario").fill_null(0.0)).sum().over(grupo)
+        return grupo, orcamento - gasto
+
+    @staticmethod
+    def _expandir_lotes(df: pl.DataFrame, grupo: str, peso_excedente: float) -> pl.DataFrame:
+        """Uma linha por lote candidato, com custo e razão valor/custo."""
+        lote = pl.max_horizontal(pl.col("lote_economico").fill_null(1), pl.lit(1))
+        posicao = pl.col("saldo_estoque").clip(lower_bound=0) + pl.col("saldo_oc").clip(lower_bound=0)
+        ruptura = (pl.col("ponto_suprimento").fill_null(0) - posicao).clip(lower_bound=0)
+
+        df_lotes = (df
+            .filter(pl.col("sugestao_final") > 0)
+            .select([
+                "cod_produto", grupo, "sugestao_final", "custo_unitario",
+                pl.col("score").fill_null(0).clip(lower_bound=0).cast(pl.Float64).alias("_score"),
+                lote.alias("_lote"),
+                ruptura.alias("_ruptura"),
+            ])
+            .with_columns(pl.int_ranges(0, (pl.col("sugestao_final") / pl.col("_lote")).ceil().cast(pl.Int64)).alias("_k"))
+            .explode("_k"))
+
+        inicio = pl.col("_k") * pl.col("_lote")
+        qtd = pl.min_horizontal(pl.col("_lote"), pl.col("sugestao_final") - inicio)
+        un_ruptura = (pl.min_horizontal(inicio + qtd, pl.col("_ruptura")) - inicio).clip(lower_bound=0)
+
+        return df_lotes.with_columns([
+            qtd.alias("_qtd"),
+            (qtd * pl.col("custo_unitario").fill_null(0.0)).alias("_custo"),
+        ]).with_columns([
+            (pl.col("_score") * (un_ruptura + peso_excedente * (pl.col("_qtd") - un_ruptura))).alias("_valor"),
+        ]).with_columns([
+            # Lote de custo zero não consome orçamento: vai para o topo
+            pl.when(pl.col("_custo") > 0).then(pl.col("_valor") / pl.col("_custo"))
+            .otherwise(float("inf")).alias("_razao")
+        ])
+
+    @staticmethod
+    def otimizar(df: pl.DataFrame, config_orcamento: dict) -> dict:
+        """
+        Método Estático Puro: aplica o orçamento por grupo.
+
+        Devolve dict com:
+            'df'       -> df original + sugestao_orcamento, corte_orcamento, subtotal_orcamento
+            'cortes'   -> linhas com corte (lista para o comprador)
+            'impacto'  -> por grupo: orçamento, valor sugerido/aprovado e nível de
+                          serviço ponderado pelo score antes/depois
+        Grupos sem orçamento (nem 'padrao') não são limitados.
+        """
+        cfg = BudgetOptimizer._ler_config(config_orcamento)
+        grupo = cfg["agrupar_por"]
+        if grupo not in df.columns:
+            raise ValueError(f"Coluna de agrupamento do orçamento não encontrada: '{grupo}'")
+
+        orcamento = pl.col(grupo).cast(pl.Utf8).replace_strict(
+            cfg["valores"], default=cfg["padrao"], return_dtype=pl.Float64
+        )
+
+        lotes = BudgetOptimizer._expandir_lotes(df, grupo, cfg["peso_excedente"]).with_columns([
+            orcamento.alias("_orcamento"),
+            pl.lit(False).alias("_aprovado"),
+        ])
+
+        # 1ª passada: prefixo guloso por razão; passadas seguintes: preenchem a sobra
+        for _ in range(1 + BudgetOptimizer.PASSADAS_PREENCHIMENTO):
+            gasto = pl.when(pl.col("_aprovado")).then(pl.col("_custo")).otherwise(0.0).sum().over(grupo)
+            sobra = pl.col("_orcamento") - gasto
+            lotes = lotes.with_columns(sobra.fill_null(pl.col("_orcamento")).alias("_sobra"))
+
+            candidato = ~pl.col("_aprovado") & (pl.col("_custo") <= pl.col("_sobra"))
+            acumulado = (pl.when(candidato).then(pl.col("_custo")).otherwise(0.0)
+                         .cum_sum().over(grupo, order_by=pl.col("_razao"), descending=True))
+            novos = candidato & (acumulado <= pl.col("_sobra"))
+            if not lotes.select(novos.any()).item():
+                break
+            lotes = lotes.with_columns((pl.col("_aprovado") | novos).alias("_aprovado"))
+
+        # Grupos sem orçamento: tudo aprovado
+        lotes = lotes.with_columns((pl.col("_aprovado") | pl.col("_orcamento").is_null()).alias("_aprovado"))
+
+        aprovado = lotes.group_by("cod_produto").agg(
+            pl.col("_qtd").filter(pl.col("_aprovado")).sum().alias("sugestao_orcamento")
+        )
+
+        df_out = (df
+            .join(aprovado, on="cod_produto", how="left")
+            .with_columns(pl.col("sugestao_orcamento").fill_null(0).cast(df.schema["sugestao_final"]))
+            .with_columns([
+                (pl.col("sugestao_final") - pl.col("sugestao_orcamento")).alias("corte_orcamento"),
+                (pl.col("sugestao_orcamento") * pl.col("custo_unitario")).alias("subtotal_orcamento"),
+            ]))
+
+        impacto = BudgetOptimizer.impacto_servico(df_out, grupo, cfg)
+        cortes = df_out.filter(pl.col("corte_orcamento") > 0).select([
+            c for c in ("cod_produto", "descricao", grupo, "curva_abc", "score", "sugestao_final",
+                        "sugestao_orcamento", "corte_orcamento", "custo_unitario")
+            if c in df_out.columns
+        ]).with_columns((pl.col("corte_orcamento") * pl.col("custo_unitario")).alias("valor_cortado"))
+
+        logger.info("orcamento_aplicado", grupos=impacto.height, linhas_cortadas=cortes.height)
+        return {"df": df_out, "cortes": cortes, "impacto": impacto}
+
+    @staticmethod
+    def impacto_servico(df: pl.DataFrame, grupo: str, cfg: dict) -> pl.DataFrame:
+        """
+        Nível de serviço ponderado por score (Σ score x min(1, posição / meta) / Σ score)
+        antes (sugestão cheia) e depois do orçamento, por grupo.
+        """
+        posicao = pl.col("saldo_estoque").clip(lower_bound=0) + pl.col("saldo_oc").clip(lower_bound=0)
+        meta = (pl.col("estoque_meta") if "estoque_meta" in df.columns
+                else posicao + pl.col("sugestao_final")).fill_null(0)
+        score = pl.col("score").fill_null(0).clip(lower_bound=0).cast(pl.Float64)
+
+        def servico(qtd):
+            return pl.when(meta > 0).then(((posicao + qtd) / meta).clip(upper_bound=1.0)).otherwise(1.0)
+
+        def ponderado(expr):
+            return pl.when(score.sum() > 0).then((score * expr).sum() / score.sum()).otherwise(None)
+
+        return (df.filter(pl.col("sugestao_final") > 0)
+            .group_by(grupo)
+            .agg([
+                (pl.col("sugestao_final") * pl.col("custo_unitario")).sum().alias("valor_sugerido"),
+                pl.col("subtotal_orcamento").sum().alias("valor_aprovado"),
+                (pl.col("corte_orcamento") > 0).sum().alias("linhas_cortadas"),
+                ponderado(servico(pl.col("sugestao_final"))).alias("nivel_servico_antes"),
+                ponderado(servico(pl.col("sugestao_orcamento"))).alias("nivel_servico_depois"),
+            ])
+            .with_columns(
+                pl.col(grupo).cast(pl.Utf8).replace_strict(cfg["valores"], default=cfg["padrao"],
+                                                           return_dtype=pl.Float64).alias("orcamento")
+            )
+            .sort("valor_sugerido", descending=True))
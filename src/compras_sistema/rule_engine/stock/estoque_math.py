@@ -1,9 +1,41 @@
 import polars as pl
 import numpy as np
-from datetime import datetime
+from datetime import date, datetime
+
+from compras_sistema.rule_engine.stock.score_engine import ScoreEngine
 
 class EstoqueMath:
-    """Classe com métodos estáticos para cálculos de estoque (Refatorada Fases 2 e 3)"""
+    """
+    Classe com métodos estáticos para cálculos de estoque (Refatorada Fases 2 e 3).
+    Os métodos aceitam DataFrame ou LazyFrame (ver rule_engine/stock/estoque_rules.py).
+    """
+
+    # Categorias fixas (pl.Enum): classificações e diagnóstico guardados como códigos inteiros
+    CURVA_ABC = pl.Enum(["A", "B", "C"])
+    CURVA_XYZ = pl.Enum(["X", "Y", "Z"])
+    TENDENCIA_VENDAS = pl.Enum(["EM ALTA", "EM QUEDA", "ESTÁVEL"])
+    PERFIL_CLIENTE = pl.Enum(["Sem Venda", "Dedicado (1-2)", "Concentrado (3-9)", "Pulverizado (10+)"])
+    STATUS_DIAGNOSTICO = pl.Enum(["INATIVO", "BLOQUEADO", "IMPLANTAÇÃO", "RUPTURA", "COMPRAR", "EXCESSO", "OK"])
+    ITEM_NOVO = "SEM MOVIMENTO - ITEM NOVO (Implantação)"
+
+    @staticmethod
+    def alertas_giro(limite_cobertura: float) -> list:
+        """Textos de validacao_giro que bloqueiam a compra (o de excesso depende do limite do config)."""
+        return [f"ALERTA: Excesso > {limite_cobertura}m", "ALERTA: Sem Venda Recente"]
+
+    @staticmethod
+    def tipo_validacao_giro(limite_cobertura: float) -> pl.Enum:
+        return pl.Enum([EstoqueMath.ITEM_NOVO, "SEM MOVIMENTO (Item velho parado)",
+                        *EstoqueMath.alertas_giro(limite_cobertura), "COERENTE"])
+
+    @staticmethod
+    def tipar_classificacoes(df: pl.DataFrame) -> pl.DataFrame:
+        """curva_abc/curva_xyz (texto vindo do SQL) -> Enum. Valor fora das categorias é erro."""
+        colunas = df.collect_schema().names()
+        return df.with_columns([
+            pl.col(coluna).cast(tipo) for coluna, tipo in
+            (("curva_abc", EstoqueMath.CURVA_ABC), ("curva_xyz", EstoqueMath.CURVA_XYZ)) if coluna in colunas
+        ])
     
     @staticmethod
     def _ler_config(objeto_config, atributo_ou_chave):
@@ -18,13 +50,21 @@ class EstoqueMath:
                 raise Exception(f"Configuração '{atributo_ou_chave}' não encontrada")
 
     @staticmethod
-    def aplicar_sazonalidade_projetada(df: pl.DataFrame, indices_dict: dict) -> pl.DataFrame:
+    def _instante_referencia(data_referencia: date | None) -> datetime:
+        """Instante "as_of" da execução (agora, se nenhuma data de referência for passada)."""
+        if data_referencia is None:
+            return datetime.now()
+        return datetime.combine(data_referencia, datetime.min.time())
+
+    @staticmethod
+    def aplicar_sazonalidade_projetada(df: pl.DataFrame, indices_dict: dict,
+                                       data_referencia: date | None = None) -> pl.DataFrame:
         """Calcula o fator sazonal baseando-se na DATA DE CHEGADA da mercadoria."""
         if not indices_dict or len(indices_dict) != 12:
             return df.with_columns(pl.lit(1.0).alias("fator_sazonal_projetado"))
         
         lista_indices = [indices_dict.get(m, 1.0) for m in range(1, 13)]
-        mes_atual = datetime.now().month
+        mes_atual = EstoqueMath._instante_referencia(data_referencia).month
         
         def calcular_fator_futuro(leadtime):
             if leadtime is None:
@@ -56,10 +96,33 @@ class EstoqueMath:
             ).alias("fator_sazonal_projetado")
         ])
 
+    @staticmethod
+    def aplicar_previsao_demanda(df: pl.DataFrame, df_previsao: pl.DataFrame) -> pl.DataFrame:
+        """
+        Substitui media_venda_dia / std_venda_dia pelas previsões recebidas
+        (cod_produto, media_venda_dia, std_venda_dia, metodo_demanda).
+        SKUs sem previsão mantêm a média histórica e a marcação de origem.
+        """
+        if "metodo_demanda" not in df.collect_schema().names():
+            df = df.with_columns(pl.lit("MEDIA_365D").alias("metodo_demanda"))
+
+        df_prev = df_previsao.select([
+            pl.col("cod_produto"),
+            pl.col("media_venda_dia").alias("_media_prevista"),
+            pl.col("std_venda_dia").alias("_std_prevista"),
+            pl.col("metodo_demanda").alias("_metodo_previsto"),
+        ])
+
+        return df.join(df_prev, on="cod_produto", how="left").with_columns([
+            pl.coalesce("_media_prevista", "media_venda_dia").alias("media_venda_dia"),
+            pl.coalesce("_std_prevista", "std_venda_dia").alias("std_venda_dia"),
+            pl.coalesce("_metodo_previsto", "metodo_demanda").alias("metodo_demanda"),
+        ]).drop(["_media_prevista", "_std_prevista", "_metodo_previsto"])
+
     @staticmethod
     def calcular_tendencias(df: pl.DataFrame) -> pl.DataFrame:
         """Calcula as classificações de Tendência e Perfil de Cliente."""
-        if "var_vendas" not in df.columns:
+        if "var_vendas" not in df.collect_schema().names():
             df = df.with_columns([
                 pl.lit(0.0).alias("var_vendas"),
                 pl.lit(0).alias("saldo_clientes"),
@@ -69,7 +132,7 @@ class EstoqueMath:
         return df.with_columns([
             pl.when(pl.col("var_vendas").fill_null(0.0) > 0.20).then(pl.lit("EM ALTA"))
             .when(pl.col("var_vendas").fill_null(0.0) < -0.20).then(pl.lit("EM QUEDA"))
-            .otherwise(pl.lit("ESTÁVEL")).alias("tendencia_vendas"),
+            .otherwise(pl.lit("ESTÁVEL")).cast(EstoqueMath.TENDENCIA_VENDAS).alias("tendencia_vendas"),
             
             pl.when(pl.col("saldo_clientes").fill_null(0) > 0)
             .then(pl.format("GANHO +{}", pl.col("saldo_clientes")))
@@ -80,12 +143,20 @@ class EstoqueMath:
             pl.when(pl.col("qtd_clientes_ativos").fill_null(0) == 0).then(pl.lit("Sem Venda"))
             .when(pl.col("qtd_clientes_ativos").fill_null(0) <= 2).then(pl.lit("Dedicado (1-2)"))
             .when(pl.col("qtd_clientes_ativos").fill_null(0) <= 9).then(pl.lit("Concentrado (3-9)"))
-            .otherwise(pl.lit("Pulverizado (10+)")).alias("perfil_cliente")
+            .otherwise(pl.lit("Pulverizado (10+)")).cast(EstoqueMath.PERFIL_CLIENTE).alias("perfil_cliente")
         ])
 
     @staticmethod
     def calcular_seguranca(df: pl.DataFrame, config) -> pl.DataFrame:
-        """Calcula Estoque de Segurança (Refatorado FASE 2 - Config Dinâmica)."""
+        """
+        Calcula Estoque de Segurança (Refatorado FASE 2 - Config Dinâmica).
+
+        Modos (estoque.modo_seguranca):
+            'demanda'   -> ES = z * σd * raiz(LT)                    (padrão)
+            'combinado' -> ES = z * raiz(LT * σd² + d² * σLT²)
+        No modo combinado o σLT vem da coluna 'desvio_lead_time_dias' quando
+        existir (por linha); caso contrário usa lead_time.desvio_padrao.
+        """
         # --- Lógica de Leitura de Configuração com Fallback ---
         try:
             cfg_estoque = EstoqueMath._ler_config(config, 'estoque')
@@ -96,22 +167,47 @@ class EstoqueMath:
         except Exception:
             z_x, z_y, z_z = 1.65, 1.28, 0.84
 
-        def get_z_factor(xyz):
-            if xyz == "X": return z_x
-            if xyz == "Y": return z_y
-            return z_z
-        
+        try:
+            modo = str(EstoqueMath._ler_config(cfg_estoque, 'modo_seguranca')).lower()
+        except Exception:
+            modo = "demanda"
+
+        # Fator Z nativo (sem map_elements -> sem custo Python por linha)
+        fator_z = (
+            pl.when(pl.col("curva_xyz") == "X").then(pl.lit(z_x))
+            .when(pl.col("curva_xyz") == "Y").then(pl.lit(z_y))
+            .otherwise(pl.lit(z_z))
+        )
+        lead_time = pl.col("lead_time_dias").fill_null(7)
+
+        if modo == "combinado":
+            try:
+                cfg_lead = EstoqueMath._ler_config(config, 'lead_time')
+                desvio_lt_padrao = float(EstoqueMath._ler_config(cfg_lead, 'desvio_padrao'))
+            except Exception:
+                desvio_lt_padrao = 0.0
+
+            if "desvio_lead_time_dias" in df.collect_schema().names():
+                desvio_lt = pl.col("desvio_lead_time_dias").fill_null(desvio_lt_padrao)
+            else:
+                desvio_lt = pl.lit(desvio_lt_padrao)
+
+            variancia = (
+                lead_time * pl.col("std_venda_dia").pow(2) +
+                pl.col("media_venda_dia").pow(2) * desvio_lt.pow(2)
+            )
+            seguranca = pl.col("fator_z") * variancia.sqrt()
+        else:
+            seguranca = pl.col("fator_z") * pl.col("std_venda_dia") * lead_time.sqrt()
+
         return df.with_columns([
-            pl.col("curva_xyz").map_elements(get_z_factor, return_dtype=pl.Float64).alias("fator_z"),
-            (
-                pl.col("curva_xyz").map_elements(get_z_factor, return_dtype=pl.Float64) *
-                pl.col("std_venda_dia") *
-                pl.col("lead_time_dias").fill_null(7).sqrt()
-            ).fill_null(0).alias("estoque_seguranca")
+            fator_z.cast(pl.Float64).alias("fator_z")
+        ]).with_columns([
+            seguranca.fill_null(0).alias("estoque_seguranca")
         ])
 
     @staticmethod
-    def calcular_necessidades(df: pl.DataFrame, config) -> pl.DataFrame:
+    def calcular_necessidades(df: pl.DataFrame, config, data_referencia: date | None = None) -> pl.DataFrame:
         """Calcula Ponto de Suprimento e Estoque Meta (COM TRAVA ZUMBI)."""
         cfg_compras = EstoqueMath._ler_config(config, 'compras')
         cfg_produto = EstoqueMath._ler_config(config, 'produto')
@@ -120,7 +216,7 @@ class EstoqueMath:
         
         # Cria a coluna dias_vida
         df = df.with_columns([
-            (pl.lit(datetime.now()) - pl.col("data_cadastro").cast(pl.Datetime)).dt.total_days().alias("dias_vida")
+            (pl.lit(EstoqueMath._instante_referencia(data_referencia)) - pl.col("data_cadastro").cast(pl.Datetime)).dt.total_days().alias("dias_vida")
         ])
         
         # Calcula a média ajustada (Boost anti-ruptura já está correto aqui)
@@ -176,20 +272,80 @@ class EstoqueMath:
         ])
 
     @staticmethod
-    def calcular_score(df: pl.DataFrame) -> pl.DataFrame:
-        """Calcula pontuação de prioridade."""
+    def calcular_score(df: pl.DataFrame, pesos_score: dict | ScoreEngine | None = None) -> pl.DataFrame:
+        """
+        Calcula pontuação de prioridade com os pesos de pesos_score.yaml (ScoreEngine).
+        Aceita o dicionário de pesos ou um ScoreEngine já compilado.
+        Sem pesos, usa o padrão equivalente ao score fixo original.
+        """
+        engine = pesos_score if isinstance(pesos_score, ScoreEngine) else ScoreEngine(pesos_score)
+        return engine.aplicar(df)
+
+    @staticmethod
+    def aplicar_risco_dependencia(df: pl.DataFrame, config) -> pl.DataFrame:
+        """
+        Classifica o risco de dependência de cliente e corta a sugestão dos itens
+        com dependência TOTAL (cliente único / maior cliente acima do limite).
+        Requer as métricas do ConcentracaoClassifier; sem elas, marca 'N/D'.
+
+        O corte só vale para as curvas A e B (as chaves *_A/*_B do config): um
+        item C de cliente único fica em ALERTA, sem corte, já que a sugestão dele
+        costuma ser de um lote só. O corte arredonda para cima em lotes
+        inteiros, preservando o múltiplo do lote_economico.
+        """
+        colunas = ("qtd_clientes_365d", "share_top1")
+        if not all(c in df.collect_schema().names() for c in colunas):
+            return df.with_columns(pl.lit("N/D").alias("risco_dependencia"))
+
+        try:
+            cfg_risco = EstoqueMath._ler_config(config, 'risco')
+        except Exception:
+            cfg_risco = {}
+
+        def ler_risco(chave, padrao):
+            try:
+                return float(EstoqueMath._ler_config(cfg_risco, chave))
+            except Exception:
+                return padrao
+
+        alerta_a = ler_risco('clientes_dependencia_alerta_A', 5)
+        alerta_b = ler_risco('clientes_dependencia_alerta_B', 2)
+        total_a = ler_risco('clientes_dependencia_total_A', 2)
+        share_maximo = ler_risco('share_top1_maximo', 0.8)
+        fator_corte = ler_risco('fator_corte_dependencia', 0.5)
+
+        clientes = pl.col("qtd_clientes_365d").fill_null(0)
+        share_top1 = pl.col("share_top1").fill_null(0.0)
+        curva = pl.col("curva_abc").cast(pl.Utf8)
+        dependente = (clientes == 1) | (share_top1 >= share_maximo)
+
+        df = df.with_columns([
+            pl.when(clientes == 0).then(pl.lit("SEM VENDA"))
+            .when((curva.is_in(["A", "B"]) & dependente)
+                  | ((curva == "A") & (clientes <= total_a))).then(pl.lit("TOTAL"))
+            .when(dependente
+                  | ((curva == "A") & (clientes < alerta_a))
+                  | ((curva == "B") & (clientes <= alerta_b))).then(pl.lit("ALERTA"))
+            .otherwise(pl.lit("OK")).alias("risco_dependencia")
+        ])
+
+        schema = df.collect_schema()
+        tipo_sugestao = schema["sugestao_final"]
+        lote = (pl.col("lote_economico").fill_null(1).clip(lower_bound=1)
+                if "lote_economico" in schema.names() else pl.lit(1))
+        corte = (pl.col("risco_dependencia") == "TOTAL") & (pl.col("sugestao_final") > 0)
         return df.with_columns([
-            (
-                pl.when(pl.col("saldo_estoque") == 0).then(5000).otherwise(0) +
-                pl.when(pl.col("saldo_estoque") < pl.col("media_venda_dia") * pl.col("lead_time_dias")).then(2500).otherwise(0) +
-                pl.when(pl.col("curva_abc") == "A").then(1000).when(pl.col("curva_abc") == "B").then(500).otherwise(100) +
-                pl.when(pl.col("tendencia_vendas") == "EM ALTA").then(500).otherwise(0) +
-                (pl.col("media_venda_dia") * pl.col("custo_unitario")).fill_null(0)
-            ).round(0).cast(pl.Int32).alias("score")
+            pl.when(corte)
+            .then(((pl.col("sugestao_final") * fator_corte / lote).ceil() * lote).cast(tipo_sugestao))
+            .otherwise(pl.col("sugestao_final")).alias("sugestao_final"),
+
+            pl.when(corte & (pl.col("motivo_bloqueio") == ""))
+            .then(pl.format("RISCO: Dependência de cliente (top1 {}%)", (share_top1 * 100).round(0).cast(pl.Int64)))
+            .otherwise(pl.col("motivo_bloqueio")).alias("motivo_bloqueio")
         ])
 
     @staticmethod
-    def gerar_diagnostico(df: pl.DataFrame, config) -> pl.DataFrame:
+    def gerar_diagnostico(df: pl.DataFrame, config, data_referencia: date | None = None) -> pl.DataFrame:
         """Gera diagnósticos e bloqueios de segurança (Refatorado FASE 3 - Config Dinâmica)."""
         
         # --- 1. Leitura de Parâmetros (Giro e Risco) ---
@@ -211,9 +367,9 @@ class EstoqueMath:
         estoque_total = pl.col("saldo_estoque") + pl.col("saldo_oc")
         venda_mensal = pl.col("media_venda_dia") * 30
         
-        if "dias_vida" not in df.columns:
+        if "dias_vida" not in df.collect_schema().names():
             df = df.with_columns([
-                (pl.lit(datetime.now()) - pl.col("data_cadastro").cast(pl.Datetime)).dt.total_days().alias("dias_vida")
+                (pl.lit(EstoqueMath._instante_referencia(data_referencia)) - pl.col("data_cadastro").cast(pl.Datetime)).dt.total_days().alias("dias_vida")
             ])
         
         base_calc = pl.when(estoque_total == 0).then(0.0).otherwise(estoque_total / venda_mensal)
@@ -226,48 +382,57 @@ class EstoqueMath:
             pl.when((pl.col("saldo_estoque") == 0) & (pl.col("saldo_oc") == 0) & (pl.col("media_venda_dia") == 0))
                 .then(
                     pl.when(pl.col("dias_vida") <= dias_novo)
-                    .then(pl.lit("SEM MOVIMENTO - ITEM NOVO (Implantação)"))
+                    .then(pl.lit(EstoqueMath.ITEM_NOVO))
                     .otherwise(pl.lit("SEM MOVIMENTO (Item velho parado)"))
                 )
                 .when(pl.col("cobertura_virtual_meses") > limite_cobertura)
                 .then(pl.lit(f"ALERTA: Excesso > {limite_cobertura}m"))
                 .when((pl.col("media_venda_dia") < min_venda_dia) & (pl.col("sugestao_final") > 0))
                 .then(pl.lit("ALERTA: Sem Venda Recente"))
-                .otherwise(pl.lit("COERENTE")).alias("validacao_giro")
+                .otherwise(pl.lit("COERENTE")).cast(EstoqueMath.tipo_validacao_giro(limite_cobertura))
+                .alias("validacao_giro")
         ])
         
-        df = df.with_columns([pl.col("sugestao_final").alias("sugestao_calculada")])
+        # Flags booleanas calculadas uma vez (antes: str.contains("ALERTA") em cada regra abaixo)
+        df = df.with_columns([
+            pl.col("sugestao_final").alias("sugestao_calculada"),
+            (pl.col("ativo") == "NO").fill_null(False).alias("_inativo"),
+            pl.col("validacao_giro").is_in(EstoqueMath.alertas_giro(limite_cobertura)).alias("_alerta_giro"),
+            (pl.col("validacao_giro") == EstoqueMath.ITEM_NOVO).alias("_item_novo"),
+        ])
         
         # --- 4. Bloqueios ---
         df = df.with_columns([
-            pl.when(pl.col("ativo") == "NO").then(pl.lit("Produto inativo no cadastro"))
-            .when(pl.col("validacao_giro").str.contains("ALERTA")).then(pl.col("validacao_giro"))
+            pl.when(pl.col("_inativo")).then(pl.lit("Produto inativo no cadastro"))
+            .when(pl.col("_alerta_giro")).then(pl.col("validacao_giro").cast(pl.Utf8))
             .otherwise(pl.lit("")).alias("motivo_bloqueio"),
             
-            pl.when((pl.col("sugestao_final") > 0) & ((pl.col("ativo") == "NO") | pl.col("validacao_giro").str.contains("ALERTA")))
+            pl.when((pl.col("sugestao_final") > 0) & (pl.col("_inativo") | pl.col("_alerta_giro")))
             .then(pl.lit("SIM")).otherwise(pl.lit("NÃO")).alias("calculado_mas_bloqueado"),
             
-            pl.when(pl.col("ativo") == "NO").then(0)
-            .when(pl.col("validacao_giro").str.contains("ALERTA")).then(0)
-            .when(pl.col("validacao_giro") == "SEM MOVIMENTO - ITEM NOVO (Implantação)")
+            pl.when(pl.col("_inativo") | pl.col("_alerta_giro")).then(0)
+            .when(pl.col("_item_novo"))
             .then(pl.col("lote_economico"))  
             .otherwise(pl.col("sugestao_final")).alias("sugestao_final")
         ])
         
+        # --- 4.1 Risco de Dependência de Cliente (Concentração) ---
+        df = EstoqueMath.aplicar_risco_dependencia(df, config)
+
         # --- 5. Score e Status Final ---
         df = df.with_columns([
             pl.when(pl.col("sugestao_final") == 0).then(0)
-            .when(pl.col("validacao_giro") == "SEM MOVIMENTO - ITEM NOVO (Implantação)").then(pl.lit(9999))
+            .when(pl.col("_item_novo")).then(pl.lit(9999))
             .otherwise(pl.col("score")).alias("score")
         ])
         
         return df.with_columns([
             (pl.col("sugestao_final") * pl.col("custo_unitario")).alias("subtotal"),
-            pl.when(pl.col("ativo") == "NO").then(pl.lit("INATIVO"))
-            .when(pl.col("validacao_giro").str.contains("ALERTA")).then(pl.lit("BLOQUEADO"))
-            .when(pl.col("validacao_giro") == "SEM MOVIMENTO - ITEM NOVO (Implantação)").then(pl.lit("IMPLANTAÇÃO"))
+            pl.when(pl.col("_inativo")).then(pl.lit("INATIVO"))
+            .when(pl.col("_alerta_giro")).then(pl.lit("BLOQUEADO"))
+            .when(pl.col("_item_novo")).then(pl.lit("IMPLANTAÇÃO"))
             .when(pl.col("saldo_estoque") == 0).then(pl.lit("RUPTURA"))
             .when(pl.col("sugestao_final") > 0).then(pl.lit("COMPRAR"))
             .when(pl.col("cobertura_virtual_meses") > 12).then(pl.lit("EXCESSO"))
-            .otherwise(pl.lit("OK")).alias("status_diagnostico")
-        ])
\ No newline at end of file
+            .otherwise(pl.lit("OK")).cast(EstoqueMath.STATUS_DIAGNOSTICO).alias("status_diagnostico")
+        ]).drop(["_inativo", "_alerta_giro", "_item_novo"])
\ No newline at end of file
@@ -0,0 +1,138 @@
+import polars as pl
+from datetime import date
+from typing import Any
+
+from compras_sistema.rule_engine.base_rule import BaseRule
+from compras_sistema.rule_engine.stock.estoque_math import EstoqueMath
+from compras_sistema.rule_engine.stock.score_engine import ScoreEngine
+from compras_sistema.utils.sanitizer import sanear_dados_lazy
+
+# ==============================================================================
+# Etapas do Motor Matemático como BaseRule.
+# Cada regra só declara o contrato (entradas/saídas/config) e delega a conta
+# para o método estático correspondente de EstoqueMath, que aceita LazyFrame.
+# ==============================================================================
+
+class SanitizeRule(BaseRule):
+    """Blindagem numérica (lead time negativo, nulos em média/estoque/OC)."""
+    nome = "sanitize"
+    entradas = ("lead_time_dias", "media_venda_dia", "saldo_estoque", "saldo_oc")
+    saidas = ("lead_time_dias", "media_venda_dia", "saldo_estoque", "saldo_oc")
+
+    def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
+        return sanear_dados_lazy(df)
+
+
+class SeasonalityRule(BaseRule):
+    """
+    Sazonalidade projetada na data de chegada. Ajusta media_venda_dia a partir
+    de media_venda_base (se já existir), então pode ser reaplicada sem acumular.
+    """
+    nome = "sazonalidade"
+    entradas = ("lead_time_dias", "media_venda_dia")
+    saidas = ("media_venda_base", "fator_sazonal_projetado", "fator_sazonal", "media_venda_dia")
+    secoes_config = ("sazonalidade",)
+
+    def __init__(self, indices_sazonais: dict | None = None, data_referencia: date | None = None):
+        self.indices_sazonais = indices_sazonais or {}
+        self.data_referencia = data_referencia
+
+    def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
+        colunas = df.collect_schema().names()
+        base = "media_venda_base" if "media_venda_base" in colunas else "media_venda_dia"
+        df = df.with_columns(pl.col(base).alias("media_venda_base"))
+        df = EstoqueMath.aplicar_sazonalidade_projetada(df, self.indices_sazonais, self.data_referencia)
+
+        if "metodo_demanda" in colunas:
+            # Holt-Winters já projeta a sazonalidade do próprio SKU: não aplicar o índice global de novo
+            df = df.with_columns([
+                pl.when(pl.col("metodo_demanda") == "HOLT_WINTERS").then(1.0)
+                .otherwise(pl.col("fator_sazonal_projetado")).alias("fator_sazonal_projetado")
+            ])
+        return df.with_columns([
+            pl.col("fator_sazonal_projetado").alias("fator_sazonal"),
+            (pl.col("media_venda_base") * pl.col("fator_sazonal_projetado")).alias("media_venda_dia")
+        ])
+
+
+class TrendRule(BaseRule):
+    """Tendência de vendas, tendência e perfil de clientes."""
+    nome = "tendencias"
+    saidas = ("tendencia_vendas", "tendencia_clientes", "perfil_cliente")
+
+    def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
+        return EstoqueMath.calcular_tendencias(df)
+
+
+class SafetyStockRule(BaseRule):
+    """Estoque de segurança (fator Z por curva XYZ)."""
+    nome = "seguranca"
+    entradas = ("curva_xyz", "lead_time_dias", "std_venda_dia", "media_venda_dia")
+    saidas = ("fator_z", "estoque_seguranca")
+    secoes_config = ("estoque", "lead_time")
+
+    def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
+        return EstoqueMath.calcular_seguranca(df, config)
+
+
+class NeedsRule(BaseRule):
+    """Ponto de suprimento, estoque meta e sugestão bruta."""
+    nome = "necessidades"
+    entradas = ("data_cadastro", "saldo_estoque", "saldo_oc", "curva_abc", "dias_sem_venda",
+                "media_venda_dia", "lead_time_dias", "estoque_seguranca")
+    saidas = ("dias_vida", "media_calculo", "ponto_suprimento", "estoque_meta", "sugestao_bruta")
+    secoes_config = ("compras", "produto")
+
+    def __init__(self, data_referencia: date | None = None):
+        self.data_referencia = data_referencia
+
+    def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
+        return EstoqueMath.calcular_necessidades(df, config, self.data_referencia)
+
+
+class LotRule(BaseRule):
+    """Arredondamento para lote econômico (limite de virada)."""
+    nome = "lote"
+    entradas = ("sugestao_bruta", "lote_economico", "custo_unitario")
+    saidas = ("necessidade_liquida", "resto", "lotes_cheios", "sugestao_final", "subtotal")
+    secoes_config = ("lote",)
+
+    def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
+        return EstoqueMath.aplicar_lote_economico(df, config)
+
+
+class ScoreRule(BaseRule):
+    """Score de prioridade (ScoreEngine compilado de pesos_score.yaml)."""
+    nome = "score"
+    entradas = ("saldo_estoque", "saldo_oc", "media_venda_dia", "lead_time_dias",
+                "curva_abc", "custo_unitario", "tendencia_vendas")
+    saidas = ("score",)
+    secoes_config = ("pesos_score",)
+
+    def __init__(self, score_engine: ScoreEngine | None = None):
+        self.score_engine = score_engine or ScoreEngine()
+
+    def preparar(self, df: pl.LazyFrame, config: Any) -> BaseRule:
+        # contribuicao_margem normaliza pela maior margem do catálogo inteiro
+        engine = self.score_engine.com_margem_maxima(df)
+        return self if engine is self.score_engine else ScoreRule(engine)
+
+    def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
+        return EstoqueMath.calcular_score(df, self.score_engine)
+
+
+class DiagnosisRule(BaseRule):
+    """Diagnóstico de giro, bloqueios, risco de dependência e status final."""
+    nome = "diagnostico"
+    entradas = ("saldo_estoque", "saldo_oc", "media_venda_dia", "dias_vida", "ativo", "curva_abc",
+                "lote_economico", "custo_unitario", "sugestao_final", "score")
+    saidas = ("cobertura_virtual_meses", "validacao_giro", "sugestao_calculada", "motivo_bloqueio",
+              "calculado_mas_bloqueado", "risco_dependencia", "sugestao_final", "score",
+              "subtotal", "status_diagnostico")
+    secoes_config = ("giro", "produto", "risco")
+
+    def __init__(self, data_referencia: date | None = None):
+        self.data_referencia = data_referencia
+
+    def apply(self, df: pl.LazyFrame, config: Any) -> pl.LazyFrame:
+        return EstoqueMath.gerar_diagnostico(df, config, self.data_referencia)
@@ -0,0 +1,205 @@
+import polars as pl
+import structlog
+
+from compras_sistema.rule_engine.stock.budget_optimizer import BudgetOptimizer
+
+logger = structlog.get_logger(__name__)
+
+class POConsolidator:
+    """
+    Consolidação de Pedidos de Compra por Fornecedor (marca).
+
+    Roda depois do gerar_diagnostico, em operações agrupadas sobre TODOS os
+    fornecedores de uma vez:
+      1. Antecipação para frete grátis: se o pedido do fornecedor não atinge
+         frete_gratis_valor, itens sem sugestão mas próximos do ponto de
+         suprimento (posição <= PS x (1 + margem_antecipacao)) recebem 1 lote,
+         do mais próximo ao mais distante, até cruzar o limite. Só antecipa se
+         os candidatos forem suficientes para chegar lá.
+      2. Pedido mínimo (valor e/ou quantidade): fornecedor abaixo do mínimo é
+         sinalizado ou retido (acao_abaixo_minimo).
+      3. Saída: cabeçalho por fornecedor + linhas do pedido.
+    Limites por fornecedor podem ser sobrescritos em 'fornecedores'.
+
+    Com orçamento ativo (config_orcamento), a antecipação só usa a sobra do
+    orçamento já aplicado: um fornecedor que não alcança o frete grátis dentro
+    dela não antecipa nada. Itens antecipados passam a status_diagnostico COMPRAR;
+    itens retidos pelo pedido mínimo passam a BLOQUEADO.
+    """
+
+    ACOES_ABAIXO_MINIMO = ("sinalizar", "reter")
+
+    @staticmethod
+    def _ler_config(config_pedido) -> dict:
+        config_pedido = config_pedido or {}
+        acao = str(config_pedido.get("acao_abaixo_minimo", "sinalizar")).lower()
+        if acao not in POConsolidator.ACOES_ABAIXO_MINIMO:
+            raise ValueError(f"acao_abaixo_minimo inválida: '{acao}'. Use {POConsolidator.ACOES_ABAIXO_MINIMO}")
+        return {
+            "agrupar_por": config_pedido.get("agrupar_por", "marca"),
+            "minimo_valor": float(config_pedido.get("pedido_minimo_valor", 0.0)),
+            "minimo_qtd": float(config_pedido.get("pedido_minimo_qtd", 0.0)),
+            "frete_gratis": float(config_pedido.get("frete_gratis_valor", 0.0)),
+            "margem_antecipacao": float(config_pedido.get("margem_antecipacao", 0.2)),
+            "acao": acao,
+            "fornecedores": config_pedido.get("fornecedores") or {},
+        }
+
+    @staticmethod
+    def _limites(cfg: dict, grupo: str) -> pl.DataFrame:
+        """Tabela de limites por fornecedor (só os sobrescritos; o resto usa o padrão)."""
+        linhas = [
+            {
+                grupo: str(nome),
+                "_minimo_valor": float(lim.get("pedido_minimo_valor", cfg["minimo_valor"])),
+                "_minimo_qtd": float(lim.get("pedido_minimo_qtd", cfg["minimo_qtd"])),
+                "_frete_gratis": float(lim.get("frete_gratis_valor", cfg["frete_gratis"])),
+            }
+            for nome, lim in cfg["fornecedores"].items()
+        ]
+        return pl.DataFrame(linhas, schema={grupo: pl.Utf8, "_minimo_valor": pl.Float64,
+                                            "_minimo_qtd": pl.Float64, "_frete_gratis": pl.Float64})
+
+    @staticmethod
+    def consolidar(df: pl.DataFrame, config_pedido: dict, config_orcamento: dict | None = None) -> dict:
+        """
+        Método Estático Puro. Devolve dict com:
+            'df'      -> df com sugestao_final ajustada, qtd_antecipada e status_pedido
+            'pedidos' -> cabeçalho por fornecedor (valor, qtd, itens, mínimos, frete)
+            'itens'   -> linhas de pedido (sugestao_final > 0) por fornecedor
+        """
+        cfg = POConsolidator._ler_config(config_pedido)
+        grupo = cfg["agrupar_por"]
+        if grupo not in df.columns:
+            raise ValueError(f"Coluna de agrupamento do pedido não encontrada: '{grupo}'")
+
+        tipo_sugestao = df.schema["sugestao_final"]
+        # Chave de agrupamento própria: fornecedor nulo vira "N/D" só aqui, o df exportado não muda
+        por_grupo = lambda expr: expr.over("_grupo")
+
+        df = (df
+            .with_columns(pl.col(grupo).cast(pl.Utf8).fill_null("N/D").alias("_grupo"))
+            .join(POConsolidator._limites(cfg, grupo).rename({grupo: "_grupo"}), on="_grupo", how="left")
+            .with_columns([
+                pl.col("_minimo_valor").fill_null(cfg["minimo_valor"]),
+                pl.col("_minimo_qtd").fill_null(cfg["minimo_qtd"]),
+                pl.col("_frete_gratis").fill_null(cfg["frete_gratis"]),
+            ]))
+
+        # --- 1. Antecipação para frete grátis ---
+        posicao = pl.col("saldo_estoque").clip(lower_bound=0) + pl.col("saldo_oc").clip(lower_bound=0)
+        lote = pl.max_horizontal(pl.col("lote_economico").fill_null(1), pl.lit(1))
+        valor_lote = lote * pl.col("custo_unitario").fill_null(0.0)
+        motivo_vazio = pl.col("motivo_bloqueio").fill_null("") == ""
+
+        candidato = (
+            (pl.col("sugestao_final") == 0) & motivo_vazio & (pl.col("ativo") != "NO")
+            & (pl.col("media_venda_dia") > 0) & (pl.col("ponto_suprimento") > 0)
+            & (posicao <= pl.col("ponto_suprimento") * (1 + cfg["margem_antecipacao"]))
+        )
+        proximidade = posicao / pl.col("ponto_suprimento")
+
+        valor_pedido = por_grupo((pl.col("sugestao_final") * pl.col("custo_unitario")).sum())
+        falta_frete = pl.col("_frete_gratis") - pl.col("_valor_pedido")
+        valor_candidato = pl.when(pl.col("_candidato")).then(valor_lote).otherwise(0.0)
+        # Acumulado ANTES do item: antecipa enquanto ainda falta para o frete grátis
+        acumulado_antes = valor_candidato.cum_sum().over("_grupo", order_by=pl.col("_proximidade")) - valor_candidato
+        alcancavel = por_grupo(valor_candidato.sum()) >= falta_frete
+
+        df = df.with_columns([
+            candidato.fill_null(False).alias("_candidato"),
+            proximidade.alias("_proximidade"),
+            valor_pedido.alias("_valor_pedido"),
+        ]).with_columns([
+            (
+                (pl.col("_frete_gratis") > 0) & (pl.col("_valor_pedido") > 0) & (falta_frete > 0)
+                & alcancavel & pl.col("_candidato") & (acumulado_antes < falta_frete)
+            ).alias("_antecipa")
+        ])
+
+        if config_orcamento and config_orcamento.get("ativada", False):
+            # Teto: antecipações acumuladas (mais próximas primeiro) cabem na sobra do grupo de orçamento
+            grupo_orc, sobra = BudgetOptimizer.sobra_orcamento(config_orcamento)
+            valor_antecipado = pl.when(pl.col("_antecipa")).then(valor_lote).otherwise(0.0)
+            acumulado_orc = valor_antecipado.cum_sum().over(grupo_orc, order_by=pl.col("_proximidade"))
+            df = df.with_columns(
+                (pl.col("_antecipa") & (sobra.is_null() | (acumulado_orc <= sobra))).alias("_antecipa")
+            ).with_columns(
+                # Sem alcançar o frete grátis dentro do teto, o fornecedor não antecipa nada
+                (pl.col("_antecipa") & (por_grupo(valor_antecipado.sum()) >= falta_frete)).alias("_antecipa")
+            )
+
+        df = df.with_columns([
+            pl.when(pl.col("_antecipa")).then(lote).otherwise(0).cast(tipo_sugestao).alias("qtd_antecipada")
+        ]).with_columns([
+            (pl.col("sugestao_final") + pl.col("qtd_antecipada")).alias("sugestao_final")
+        ])
+
+        # --- 2. Pedido mínimo ---
+        valor_final = por_grupo((pl.col("sugestao_final") * pl.col("custo_unitario")).sum())
+        qtd_final = por_grupo(pl.col("sugestao_final").sum())
+        abaixo_minimo = (valor_final > 0) & ((valor_final < pl.col("_minimo_valor")) | (qtd_final < pl.col("_minimo_qtd")))
+
+        df = df.with_columns([
+            pl.when(valor_final <= 0).then(pl.lit("SEM PEDIDO"))
+            .when(abaixo_minimo).then(pl.lit("ABAIXO DO MÍNIMO"))
+            .when((pl.col("_frete_gratis") > 0) & (valor_final >= pl.col("_frete_gratis"))).then(pl.lit("FRETE GRÁTIS"))
+            .otherwise(pl.lit("OK")).alias("status_pedido")
+        ])
+
+        reter = cfg["acao"] == "reter"
+        df = df.with_columns(
+            (pl.lit(reter) & (pl.col("status_pedido") == "ABAIXO DO MÍNIMO") & (pl.col("sugestao_final") > 0))
+            .alias("_retido")
+        )
+        if reter:
+            retido = pl.col("_retido")
+            df = df.with_columns([
+                pl.when(retido & motivo_vazio).then(pl.lit("PEDIDO: abaixo do mínimo do fornecedor"))
+                .otherwise(pl.col("motivo_bloqueio")).alias("motivo_bloqueio"),
+                pl.when(retido).then(0).otherwise(pl.col("sugestao_final")).cast(tipo_sugestao).alias("sugestao_final"),
+                pl.when(retido).then(0).otherwise(pl.col("qtd_antecipada")).cast(tipo_sugestao).alias("qtd_antecipada"),
+            ])
+
+        df = df.with_columns((pl.col("sugestao_final") * pl.col("custo_unitario")).alias("subtotal"))
+        if "status_diagnostico" in df.columns:
+            # Item antecipado agora tem compra: não pode continuar "OK"; item retido não é mais compra
+            tipo_status = df.schema["status_diagnostico"]
+            df = df.with_columns(
+                pl.when(pl.col("_retido")).then(pl.lit("BLOQUEADO").cast(tipo_status))
+                .when(pl.col("qtd_antecipada") > 0).then(pl.lit("COMPRAR").cast(tipo_status))
+                .otherwise(pl.col("status_diagnostico")).alias("status_diagnostico")
+            )
+        if "calculado_mas_bloqueado" in df.columns:
+            df = df.with_columns(
+                pl.when(pl.col("_retido")).then(pl.lit("SIM"))
+                .otherwise(pl.col("calculado_mas_bloqueado")).alias("calculado_mas_bloqueado")
+            )
+
+        # --- 3. Saídas ---
+        pedidos = (df
+            .group_by("_grupo")
+            .agg([
+                pl.col("subtotal").sum().alias("valor_total"),
+                pl.col("sugestao_final").sum().alias("qtd_total"),
+                (pl.col("sugestao_final") > 0).sum().alias("itens"),
+                (pl.col("qtd_antecipada") * pl.col("custo_unitario")).sum().alias("valor_antecipado"),
+                pl.col("_minimo_valor").first().alias("pedido_minimo_valor"),
+                pl.col("_minimo_qtd").first().alias("pedido_minimo_qtd"),
+                pl.col("_frete_gratis").first().alias("frete_gratis_valor"),
+                pl.col("status_pedido").first(),
+            ])
+            .filter(pl.col("status_pedido") != "SEM PEDIDO")
+            .rename({"_grupo": grupo})
+            .sort("valor_total", descending=True))
+
+        itens = df.filter(pl.col("sugestao_final") > 0).select([pl.col("_grupo").alias(grupo)] + [
+            c for c in ("cod_produto", "ref_fornecedor", "descricao", "sugestao_final",
+                        "qtd_antecipada", "custo_unitario", "subtotal", "status_pedido")
+            if c in df.columns
+        ]).sort([grupo, "cod_produto"])
+
+        df = df.drop([c for c in df.columns if c.startswith("_")])
+        logger.info("pedidos_consolidados", fornecedores=pedidos.height, itens=itens.height,
+                    antecipados=int((df["qtd_antecipada"] > 0).sum()))
+        return {"df": df, "pedidos": pedidos, "itens": itens}
@@ -0,0 +1,175 @@
+import polars as pl
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class ScoreEngine:
+    """
+    Score de Prioridade de Compra dirigido por config/pesos_score.yaml.
+
+    Os pesos são "compilados" UMA vez (no __init__) em uma única expressão
+    Polars nativa; aplicar() só executa a expressão. Três blocos:
+        regras       -> pontos fixos quando a condição é verdadeira
+        curva_abc    -> pontos por classe ABC
+        componentes  -> valores normalizados em [0, 1] x peso
+                        (exceto giro_financeiro, que entra em R$/dia como no score original)
+
+    Sem arquivo (ou com chaves ausentes) valem os PESOS_PADRAO, idênticos ao
+    score fixo anterior: 5000 / 2500 / 1000-500-100 / 500 + giro financeiro.
+    """
+
+    PESOS_PADRAO = {
+        "regras": {
+            "estoque_zerado": 5000,
+            "abaixo_lead_time": 2500,
+            "tendencia_alta": 500,
+        },
+        "curva_abc": {"A": 1000, "B": 500, "C": 100},
+        "componentes": {
+            "giro_financeiro": 1.0,
+            "risco_ruptura": 0.0,
+            "contribuicao_margem": 0.0,
+            "tendencia": 0.0,
+            "gap_cobertura": 0.0,
+        },
+        "cobertura_alvo_meses": 3.0,
+        "top_n": 0,
+    }
+
+    # Colunas opcionais por componente (criadas nulas se faltarem no DataFrame)
+    COLUNAS_OPCIONAIS = {
+        "contribuicao_margem": ("margem",),
+        "tendencia": ("var_vendas",),
+    }
+
+    def __init__(self, pesos: dict | None = None, margem_maxima: float | None = None):
+        pesos = pesos or {}
+        self.pesos = pesos
+        # Maior margem do catálogo fixada de fora (execução em partições); None = calcula no frame
+        self.margem_maxima = margem_maxima
+        self.regras = {**self.PESOS_PADRAO["regras"], **(pesos.get("regras") or {})}
+        self.curva_abc = {**self.PESOS_PADRAO["curva_abc"], **(pesos.get("curva_abc") or {})}
+        self.componentes = {**self.PESOS_PADRAO["componentes"], **(pesos.get("componentes") or {})}
+        self.cobertura_alvo = float(pesos.get("cobertura_alvo_meses", self.PESOS_PADRAO["cobertura_alvo_meses"]))
+        self.top_n = int(pesos.get("top_n", self.PESOS_PADRAO["top_n"]))
+        self.expressao = self._compilar()
+
+    # ------------------------------------------------------------------
+    # Compilação
+    # ------------------------------------------------------------------
+    def _condicoes(self) -> dict:
+        venda_lead_time = pl.col("media_venda_dia") * pl.col("lead_time_dias")
+        return {
+            "estoque_zerado": pl.col("saldo_estoque") == 0,
+            "abaixo_lead_time": pl.col("saldo_estoque") < venda_lead_time,
+            "tendencia_alta": pl.col("tendencia_vendas") == "EM ALTA",
+            "tendencia_queda": pl.col("tendencia_vendas") == "EM QUEDA",
+            "item_novo": pl.col("validacao_giro") == "SEM MOVIMENTO - ITEM NOVO (Implantação)",
+        }
+
+    def _componentes(self) -> dict:
+        venda_lead_time = pl.col("media_venda_dia") * pl.col("lead_time_dias")
+        venda_mensal = pl.col("media_venda_dia") * 30
+        margem = pl.col("margem").fill_null(0.0).clip(lower_bound=0.0)
+        margem_max = margem.max() if self.margem_maxima is None else pl.lit(float(self.margem_maxima))
+        cobertura = (pl.col("saldo_estoque") + pl.col("saldo_oc")) / venda_mensal
+
+        return {
+            # R$ vendidos por dia (sem normalização, como no score original)
+            "giro_financeiro": (pl.col("media_venda_dia") * pl.col("custo_unitario")).fill_null(0),
+            # 1 = sem estoque; 0 = estoque cobre o lead time
+            "risco_ruptura": pl.when(venda_lead_time > 0)
+                .then(1.0 - (pl.col("saldo_estoque") / venda_lead_time).clip(0.0, 1.0))
+                .otherwise(0.0),
+            # Margem do item relativa à maior margem do catálogo
+            "contribuicao_margem": pl.when(margem_max > 0).then(margem / margem_max).otherwise(0.0),
+            # var_vendas em [-100%, +100%] -> [0, 1]
+            "tendencia": (pl.col("var_vendas").fill_null(0.0).clip(-1.0, 1.0) + 1.0) / 2.0,
+            # Quanto falta para a cobertura alvo (1 = sem cobertura)
+            "gap_cobertura": pl.when(venda_mensal > 0)
+                .then(((self.cobertura_alvo - cobertura) / self.cobertura_alvo).clip(0.0, 1.0))
+                .otherwise(0.0),
+        }
+
+    def _compilar(self) -> pl.Expr:
+        condicoes = self._condicoes()
+        componentes = self._componentes()
+
+        desconhecidas = [r for r in self.regras if r not in condicoes]
+        desconhecidas += [c for c in self.componentes if c not in componentes]
+        if desconhecidas:
+            raise ValueError(f"Regras/componentes de score desconhecidos: {desconhecidas}")
+
+        termos = [
+            pl.when(condicoes[nome]).then(float(peso)).otherwise(0.0)
+            for nome, peso in self.regras.items() if float(peso) != 0
+        ]
+
+        # Classe desconhecida/nula pontua como C (mesmo "otherwise" do score original)
+        curva = pl.lit(float(self.curva_abc.get("C", 0.0)))
+        for classe, peso in reversed(list(self.curva_abc.items())):
+            curva = pl.when(pl.col("curva_abc") == classe).then(float(peso)).otherwise(curva)
+        termos.append(curva)
+
+        termos += [
+            componentes[nome] * float(peso)
+            for nome, peso in self.componentes.items() if float(peso) != 0
+        ]
+
+        return pl.sum_horizontal(termos).fill_null(0).round(0).cast(pl.Int32).alias("score")
+
+    @property
+    def usa_margem(self) -> bool:
+        """True se contribuicao_margem tem peso: o df precisa trazer a coluna 'margem'."""
+        return float(self.componentes.get("contribuicao_margem", 0)) != 0
+
+    @property
+    def usa_agregado_global(self) -> bool:
+        """True se o score depende do catálogo inteiro (não pode ser calculado por partição)."""
+        return self.margem_maxima is None and self.usa_margem
+
+    def com_margem_maxima(self, df: pl.DataFrame | pl.LazyFrame) -> "ScoreEngine":
+        """Cópia com a maior margem de 'df' fixada, para aplicar partição a partição."""
+        if not self.usa_agregado_global or "margem" not in df.collect_schema().names():
+            return self
+        maxima = (df.lazy().select(pl.col("margem").fill_null(0.0).clip(lower_bound=0.0).max())
+                  .collect().item())
+        return ScoreEngine(self.pesos, margem_maxima=maxima or 0.0)
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+    def aplicar(self, df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+        """Calcula a coluna 'score' com a expressão compilada (DataFrame ou LazyFrame)."""
+        colunas_df = df.collect_schema().names()
+        faltantes = [
+            col
+            for nome, colunas in self.COLUNAS_OPCIONAIS.items() if float(self.componentes.get(nome, 0)) != 0
+            for col in colunas if col not in colunas_df
+        ]
+        if "validacao_giro" not in colunas_df and float(self.regras.get("item_novo", 0)) != 0:
+            faltantes.append("validacao_giro")
+        if faltantes:
+            # Componente com peso e sem coluna de entrada pontua 0 em todos os itens: avisa
+            logger.warning("score_componente_sem_coluna", colunas=faltantes)
+            df = df.with_columns([pl.lit(None).alias(c) for c in faltantes])
+        return df.with_columns(self.expressao)
+
+    def ranquear(self, df: pl.DataFrame, top_n: int | None = None) -> pl.DataFrame:
+        """
+        Coluna 'rank_prioridade' (1 = maior score).
+        Com top_n > 0 usa seleção parcial (top_k) e só os N primeiros recebem
+        rank; o resto fica nulo. Evita ordenar o catálogo inteiro.
+        """
+        top_n = self.top_n if top_n is None else int(top_n)
+        if top_n <= 0 or top_n >= df.height:
+            return df.with_columns(
+                pl.col("score").rank("ordinal", descending=True).cast(pl.Int64).alias("rank_prioridade")
+            )
+
+        df_top = (df.select(["cod_produto", "score"])
+                  .top_k(top_n, by="score")
+                  .sort("score", descending=True)
+                  .with_row_index("rank_prioridade", offset=1)
+                  .select(["cod_produto", pl.col("rank_prioridade").cast(pl.Int64)]))
+        return df.join(df_top, on="cod_produto", how="left")
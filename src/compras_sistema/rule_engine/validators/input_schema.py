@@ -35,4 +35,88 @@ class InputCalcSchema(pa.DataFrameModel):
     class Config:
         # strict=False permite que o DataFrame tenha colunas extras (descricao, marca, etc)
         # sem dar erro. Validamos apenas as colunas essenciais listadas acima.
-        strict = False
\ No newline at end of file
+        strict = False
+
+# ==============================================================================
+# Níveis de Validação
+#   completa  -> Pandera em todas as linhas (auditoria)
+#   amostrada -> esquema + min/max globais dos limites + Pandera numa amostra
+#   esquema   -> só tipos e nulos, lidos do schema e de um null_count (O(colunas))
+# ==============================================================================
+NIVEIS_VALIDACAO = ("completa", "amostrada", "esquema")
+_ALIASES_NIVEL = {"full": "completa", "sampled": "amostrada", "schema-only": "esquema", "schema": "esquema"}
+
+def normalizar_nivel(nivel: str) -> str:
+    """Nome canônico do nível ('full' -> 'completa'); valores desconhecidos voltam só em minúsculas."""
+    return _ALIASES_NIVEL.get(str(nivel).lower(), str(nivel).lower())
+
+# Checks de limite do Pandera -> (agregado global, comparação que precisa ser verdadeira)
+_CHECKS_LIMITE = {
+    "greater_than_or_equal_to": ("min", lambda v, lim: v >= lim),
+    "greater_than": ("min", lambda v, lim: v > lim),
+    "less_than_or_equal_to": ("max", lambda v, lim: v <= lim),
+    "less_than": ("max", lambda v, lim: v < lim),
+}
+
+
+def _tipo_compativel(atual: pl.DataType, esperado: pl.DataType, coerce: bool) -> bool:
+    if atual == esperado:
+        return True
+    # Com coerce=True o Pandera converteria números entre si (ex.: Int32 -> Int64)
+    return coerce and atual.is_numeric() and esperado.is_numeric()
+
+
+def _falha(schema, df: pl.DataFrame, mensagem: str, coluna: str | None = None):
+    raise pa.errors.SchemaError(schema, df, mensagem, column_name=coluna)
+
+
+def _validar_esquema(schema, df: pl.DataFrame) -> None:
+    """Colunas, tipos e nulos: só o schema do frame e um null_count."""
+    nulos = df.select([pl.col(c).null_count() for c in schema.columns if c in df.columns]).row(0, named=True)
+    for nome, coluna in schema.columns.items():
+        if nome not in df.columns:
+            _falha(schema, df, f"Coluna obrigatória ausente: {nome}", nome)
+        esperado = coluna.dtype.type
+        if not _tipo_compativel(df.schema[nome], esperado, coluna.coerce):
+            _falha(schema, df, f"Coluna {nome}: tipo {df.schema[nome]} (esperado {esperado})", nome)
+        if not coluna.nullable and nulos[nome]:
+            _falha(schema, df, f"Coluna {nome}: {nulos[nome]} valores nulos", nome)
+
+
+def _validar_limites(schema, df: pl.DataFrame) -> None:
+    """Checks de limite (ge/gt/le/lt) pelos min/max globais, em um único select."""
+    limites = [(nome, check.name, check.statistics["min_value" if check.name.startswith("greater") else "max_value"])
+               for nome, coluna in schema.columns.items() for check in coluna.checks
+               if check.name in _CHECKS_LIMITE]
+    if not limites:
+        return
+    agregados = df.select(
+        [getattr(pl.col(nome), _CHECKS_LIMITE[check][0])().alias(f"{nome}__{check}") for nome, check, _ in limites]
+    ).row(0, named=True)
+    for nome, check, limite in limites:
+        valor = agregados[f"{nome}__{check}"]
+        if valor is not None and not _CHECKS_LIMITE[check][1](valor, limite):
+            _falha(schema, df, f"Coluna {nome}: {check}({limite}) violado (valor {valor})", nome)
+
+
+def validar_entrada(df: pl.DataFrame, nivel: str = "amostrada", tamanho_amostra: int = 10_000,
+                    semente: int = 42) -> pl.DataFrame:
+    """
+    Valida df contra o InputCalcSchema no nível pedido (ver NIVEIS_VALIDACAO).
+    Erros saem como pandera.errors.SchemaError, igual à validação completa.
+    Só a completa devolve o frame convertido (coerce); as demais devolvem df.
+    """
+    nivel = normalizar_nivel(nivel)
+    if nivel not in NIVEIS_VALIDACAO:
+        raise ValueError(f"Nível de validação inválido: {nivel} (use {', '.join(NIVEIS_VALIDACAO)})")
+
+    if nivel == "completa":
+        return InputCalcSchema.validate(df)
+
+    schema = InputCalcSchema.to_schema()
+    _validar_esquema(schema, df)
+    if nivel == "amostrada":
+        _validar_limites(schema, df)
+        amostra = df.sample(tamanho_amostra, seed=semente) if df.height > tamanho_amostra else df
+        InputCalcSchema.validate(amostra)
+    return df
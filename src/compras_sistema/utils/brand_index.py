@@ -0,0 +1,97 @@
+import json
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+class BrandIndex:
+    """
+    Índice de busca das marcas do launcher (filtro digitado pelo usuário).
+
+    Antes cada tecla varria todas_marcas com 'termo in marca.upper()'. Aqui:
+        - prefixo: busca binária (bisect) nas chaves maiúsculas ordenadas;
+        - substring: índice de n-gramas (1 a 3 caracteres) -> posições. Termos
+          de até 3 letras saem direto do índice; termos maiores cruzam os
+          trigramas e só os candidatos são conferidos com 'in'.
+    O resultado traz primeiro as marcas que COMEÇAM com o termo (em ordem
+    alfabética) e depois as que apenas o contêm. "TODAS" fica sempre no topo.
+
+    O cache em disco (marcas_cache.json) guarda a impressão digital do banco
+    (tamanho + mtime do vendas.db): se o banco mudou, o cache é descartado.
+    """
+
+    TODAS = "TODAS"
+    N_MAX = 3
+
+    def __init__(self, marcas: List[str]):
+        self.marcas = sorted({str(m) for m in marcas if m and str(m) != self.TODAS}, key=lambda m: (m.upper(), m))
+        self._chaves = [m.upper() for m in self.marcas]
+        self._ngramas: Dict[str, List[int]] = {}
+        for i, chave in enumerate(self._chaves):
+            vistos = set()
+            for n in range(1, self.N_MAX + 1):
+                for j in range(len(chave) - n + 1):
+                    gram = chave[j:j + n]
+                    if gram not in vistos:
+                        vistos.add(gram)
+                        self._ngramas.setdefault(gram, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.marcas)
+
+    def _prefixo(self, termo: str) -> List[int]:
+        inicio = bisect_left(self._chaves, termo)
+        fim = inicio
+        while fim < len(self._chaves) and self._chaves[fim].startswith(termo):
+            fim += 1
+        return list(range(inicio, fim))
+
+    def _contem(self, termo: str) -> List[int]:
+        if len(termo) <= self.N_MAX:
+            return self._ngramas.get(termo, [])
+        candidatos = None
+        for j in range(len(termo) - self.N_MAX + 1):
+            postings = self._ngramas.get(termo[j:j + self.N_MAX])
+            if not postings:
+                return []
+            candidatos = set(postings) if candidatos is None else candidatos & set(postings)
+        return sorted(i for i in candidatos if termo in self._chaves[i])
+
+    def buscar(self, termo: str = "", limite: Optional[int] = None) -> List[str]:
+        """Marcas que casam com o termo (sem diferenciar maiúsculas), com "TODAS" na frente."""
+        termo = (termo or "").strip().upper()
+        if not termo:
+            posicoes = range(len(self.marcas))
+        else:
+            prefixo = self._prefixo(termo)
+            ja = set(prefixo)
+            posicoes = prefixo + [i for i in self._contem(termo) if i not in ja]
+        resultado = [self.TODAS] + [self.marcas[i] for i in posicoes]
+        return resultado[:limite] if limite else resultado
+
+    # ------------------------------------------------------------------
+    # Cache em disco validado pela impressão digital do banco
+    # ------------------------------------------------------------------
+    @staticmethod
+    def impressao_digital(db_path: Path) -> Optional[str]:
+        try:
+            st = Path(db_path).stat()
+        except OSError:
+            return None
+        return f"{st.st_size}-{st.st_mtime_ns}"
+
+    @staticmethod
+    def ler_cache(cache_path: Path, db_path: Path) -> Optional[List[str]]:
+        """Marcas do cache se ele foi gerado a partir do banco atual; None se ausente ou vencido."""
+        try:
+            dados: Any = json.loads(Path(cache_path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        # Formato antigo (lista pura) não tem impressão digital: trata como vencido
+        if not isinstance(dados, dict) or dados.get("impressao_digital") != BrandIndex.impressao_digital(db_path):
+            return None
+        return dados.get("marcas")
+
+    @staticmethod
+    def gravar_cache(cache_path: Path, db_path: Path, marcas: List[str]) -> None:
+        dados = {"impressao_digital": BrandIndex.impressao_digital(db_path), "marcas": marcas}
+        Path(cache_path).write_text(json.dumps(dados, ensure_ascii=False), encoding="utf-8")
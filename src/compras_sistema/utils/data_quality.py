@@ -0,0 +1,165 @@
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import polars as pl
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+class DataQualityProfiler:
+    """
+    Etapa única de qualidade de dados antes do Motor Matemático.
+
+    Substitui o bloco de fill_null + map_elements do lote, a coerção do Pandera
+    e o sanear_dados_dataframe (que contava anomalias com filter().height uma a
+    uma). Aqui:
+        1. todas as ocorrências são contadas em UM select (com amostra de SKUs);
+        2. coerção de tipo, preenchimento de nulos, limites e domínio viram UMA
+           expressão por coluna, aplicadas em um único with_columns.
+
+    Cada regra do relatório tem: regra, coluna, acao ('preencher', 'limitar',
+    'dominio' ou 'apenas_relatar'), ocorrencias e amostra (cod_produto).
+    """
+
+    # Tipos garantidos para o motor (antes: coerce=True no InputCalcSchema)
+    TIPOS = {
+        "saldo_estoque": pl.Int64,
+        "saldo_oc": pl.Int64,
+        "media_venda_dia": pl.Float64,
+        "std_venda_dia": pl.Float64,
+        "lead_time_dias": pl.Float64,
+        "lote_economico": pl.Int64,
+    }
+
+    # Nulo -> valor padrão
+    PADROES = {
+        "media_venda_dia": 0.0,
+        "std_venda_dia": 0.0,
+        "qtd_outliers_cortados": 0,
+        "dias_sem_venda": 0,
+        "qtd_clientes_365d": 0,
+        "qtd_clientes_90d": 0,
+        "hhi_clientes": 0.0,
+        "share_top1": 0.0,
+        "share_top3": 0.0,
+        "saldo_estoque": 0,
+        "saldo_oc": 0,
+        "custo_unitario": 0.0,
+        "curva_abc": "C",
+        "curva_xyz": "Z",
+        "marca": "N/D",
+        "descricao": "DESCRIÇÃO NÃO ENCONTRADA",
+        "ref_fornecedor": "",
+        "lote_economico": 1,
+        "ativo": "SIM",
+        "data_cadastro": date(2000, 1, 1),
+    }
+
+    # Limite inferior (lead time negativo, média negativa, lote 0 = divisão por zero)
+    MINIMOS = {
+        "lead_time_dias": 0,
+        "media_venda_dia": 0.0,
+        "std_venda_dia": 0.0,
+        "lote_economico": 1,
+    }
+
+    # Domínio das classificações: fora dele vira o padrão (C / Z)
+    DOMINIOS = {
+        "curva_abc": ["A", "B", "C"],
+        "curva_xyz": ["X", "Y", "Z"],
+    }
+
+    # Só relatados: o valor original é mantido (o Excel mostra o alerta_dados)
+    RELATAR = {
+        "estoque_negativo": ("saldo_estoque", lambda c: c < 0),
+        "oc_negativa": ("saldo_oc", lambda c: c < 0),
+        "custo_zerado": ("custo_unitario", lambda c: c <= 0),
+    }
+
+    def __init__(self, tamanho_amostra: int = 5):
+        self.tamanho_amostra = tamanho_amostra
+
+    def _regras(self, colunas: List[str]) -> List[Dict[str, Any]]:
+        """Regras aplicáveis às colunas presentes, com a condição avaliada nos dados de entrada."""
+        regras = []
+        for coluna in self.PADROES:
+            if coluna in colunas:
+                regras.append({"regra": f"{coluna}_nulo", "coluna": coluna, "acao": "preencher",
+                               "condicao": pl.col(coluna).is_null()})
+        for coluna, minimo in self.MINIMOS.items():
+            if coluna in colunas:
+                regras.append({"regra": f"{coluna}_abaixo_minimo", "coluna": coluna, "acao": "limitar",
+                               "condicao": pl.col(coluna) < minimo})
+        for coluna, valores in self.DOMINIOS.items():
+            if coluna in colunas:
+                regras.append({"regra": f"{coluna}_invalida", "coluna": coluna, "acao": "dominio",
+                               "condicao": pl.col(coluna).is_not_null() & ~pl.col(coluna).cast(pl.Utf8).is_in(valores)})
+        for nome, (coluna, condicao) in self.RELATAR.items():
+            if coluna in colunas:
+                regras.append({"regra": nome, "coluna": coluna, "acao": "apenas_relatar",
+                               "condicao": condicao(pl.col(coluna))})
+        return regras
+
+    def _correcao(self, coluna: str) -> pl.Expr:
+        """Coerção -> nulo -> limite -> domínio, em uma expressão só."""
+        expr = pl.col(coluna)
+        if coluna in self.TIPOS:
+            expr = expr.cast(self.TIPOS[coluna])
+        if coluna in self.PADROES:
+            expr = expr.fill_null(pl.lit(self.PADROES[coluna]))
+        if coluna in self.MINIMOS:
+            expr = expr.clip(lower_bound=self.MINIMOS[coluna])
+        if coluna in self.DOMINIOS:
+            expr = pl.when(expr.is_in(self.DOMINIOS[coluna])).then(expr).otherwise(pl.lit(self.PADROES[coluna]))
+        return expr.alias(coluna)
+
+    def perfilar(self, df: pl.DataFrame) -> Dict[str, Any]:
+        """Contagem de todas as regras em um único select (sem alterar o frame)."""
+        regras = self._regras(df.columns)
+        agregados = df.select(
+            [r["condicao"].fill_null(False).sum().alias(r["regra"]) for r in regras]
+            + [pl.col("cod_produto").filter(r["condicao"].fill_null(False)).head(self.tamanho_amostra)
+               .cast(pl.Utf8).implode().alias(f"{r['regra']}__amostra") for r in regras]
+        ).row(0, named=True) if regras else {}
+
+        return {
+            "gerado_em": datetime.now().isoformat(),
+            "linhas": df.height,
+            "total_ocorrencias": int(sum(agregados.get(r["regra"], 0) for r in regras)),
+            "regras": [{
+                "regra": r["regra"],
+                "coluna": r["coluna"],
+                "acao": r["acao"],
+                "ocorrencias": int(agregados[r["regra"]]),
+                "amostra": agregados[f"{r['regra']}__amostra"],
+            } for r in regras],
+        }
+
+    def aplicar(self, df: pl.DataFrame) -> tuple[pl.DataFrame, Dict[str, Any]]:
+        """Perfil dos dados de entrada + frame corrigido (coerção, nulos, limites, domínio)."""
+        relatorio = self.perfilar(df)
+        corrigir = [c for c in df.columns if c in self.TIPOS or c in self.PADROES]
+        df = df.with_columns([self._correcao(c) for c in corrigir])
+
+        ocorrencias = {r["regra"]: r["ocorrencias"] for r in relatorio["regras"] if r["ocorrencias"]}
+        logger.info("qualidade_dados", linhas=relatorio["linhas"], **ocorrencias)
+        return df, relatorio
+
+    @staticmethod
+    def salvar(relatorio: Dict[str, Any], caminho: Path) -> Path:
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        return caminho
+
+    @staticmethod
+    def resumo(relatorio: Dict[str, Any]) -> List[str]:
+        """Linhas legíveis (só regras com ocorrência) para o log do launcher/dashboard."""
+        return [
+            f"{r['regra']}: {r['ocorrencias']} SKUs ({r['acao']})"
+            + (f" ex.: {', '.join(r['amostra'])}" if r["amostra"] else "")
+            for r in relatorio.get("regras", []) if r["ocorrencias"]
+        ]
@@ -6,6 +6,7 @@ def sanear_dados_dataframe(df: pl.DataFrame) -> pl.DataFrame:
     """
     Blindagem de Dados (Refatoração Fase 1):
     Garante que números críticos para a matemática não quebrem o cálculo.
+    As regras ficam só em sanear_dados_lazy; aqui apenas o aviso de lead time negativo.
     """
     logger = logging.getLogger("Sanitizer")
     
@@ -13,32 +14,28 @@ def sanear_dados_dataframe(df: pl.DataFrame) -> pl.DataFrame:
     if df.height == 0:
         return df
 
-    # 1. Lead Time: Não pode ser negativo. Se for, assume 0.
     if "lead_time_dias" in df.columns:
-        qtd_negativos = df.filter(pl.col("lead_time_dias") < 0).height
+        qtd_negativos = df.select((pl.col("lead_time_dias") < 0).sum()).item()
         if qtd_negativos > 0:
             logger.warning(f"⚠️ BLINDAGEM: Encontrados {qtd_negativos} produtos com Lead Time negativo. Forçados para 0.")
-            
-        df = df.with_columns(
-            pl.when(pl.col("lead_time_dias") < 0)
-            .then(0)
-            .otherwise(pl.col("lead_time_dias"))
-            .alias("lead_time_dias")
-        )
-    
-    # 2. Média de Venda: Nulo vira 0.0
-    if "media_venda_dia" in df.columns:
-        df = df.with_columns(
-            pl.col("media_venda_dia").fill_null(0.0)
+
+    return sanear_dados_lazy(df.lazy()).collect()
+
+
+def sanear_dados_lazy(df: pl.LazyFrame | pl.DataFrame) -> pl.LazyFrame | pl.DataFrame:
+    """
+    Blindagem só com expressões (sem contagem nem log), para compor um plano
+    lazy no RuleRegistry. Lead time negativo -> 0; nulos de média, estoque e OC -> 0.
+    """
+    colunas = df.collect_schema().names()
+    expressoes = []
+
+    if "lead_time_dias" in colunas:
+        expressoes.append(
+            pl.when(pl.col("lead_time_dias") < 0).then(0).otherwise(pl.col("lead_time_dias")).alias("lead_time_dias")
         )
-    
-    # 3. Estoque e OC: Nulos viram 0
-    cols_zero = ["saldo_estoque", "saldo_oc"]
-    cols_existentes = [c for c in cols_zero if c in df.columns]
-    
-    if cols_existentes:
-        df = df.with_columns([
-            pl.col(c).fill_null(0) for c in cols_existentes
-        ])
-    
-    return df
\ No newline at end of file
+    if "media_venda_dia" in colunas:
+        expressoes.append(pl.col("media_venda_dia").fill_null(0.0))
+    expressoes += [pl.col(c).fill_null(0) for c in ("saldo_estoque", "saldo_oc") if c in colunas]
+
+    return df.with_columns(expressoes) if expressoes else df
@@ -1,5 +1,7 @@
 import customtkinter as ctk
+from collections import deque
 from typing import Callable, Optional, Dict, List
+import logging
 import time
 
 # --- PALETA DE CORES PROFISSIONAL (Light / Dark) ---
@@ -16,6 +18,15 @@ COLOR_SUCCESS = "#16a34a" # Green
 COLOR_WARNING = "#f59e0b" # Amber
 COLOR_DANGER = "#dc2626"  # Red 600
 
+# --- LOG ---
+LOG_INTERVALO_MS = 100     # No máximo um insert no Textbox a cada 100 ms
+LOG_MAX_LINHAS = 5000      # Anel de linhas retidas (as mais antigas saem do Textbox)
+# --- MARCAS ---
+MARCAS_COLUNAS = 5
+MARCAS_POOL = 60           # Botões criados uma vez e reaproveitados (só o texto/cor mudam)
+BUSCA_ATRASO_MS = 150      # Debounce do filtro: busca só depois que o usuário para de digitar
+LOG_FILTROS = {"Tudo": logging.DEBUG, "Info": logging.INFO, "Avisos": logging.WARNING, "Erros": logging.ERROR}
+
 class Dashboard(ctk.CTkFrame):
     
     def __init__(self, master, **kwargs):
@@ -24,6 +35,10 @@ class Dashboard(ctk.CTkFrame):
         # Estados
         self.var_marca = ctk.StringVar(value="TODAS")
         self.var_busca = ctk.StringVar()
+        self._busca_agendada = None
+        self._pool_marcas: List[ctk.CTkButton] = []
+        self._resultado_marcas: List[str] = []   # Resultado completo da busca
+        self._lista_marcas: List[str] = []       # Parte visível (ligada aos botões do pool)
         
         # KPIs Gerais
         self.kpi_valor = ctk.StringVar(value="R$ 0,00")
@@ -39,12 +54,19 @@ class Dashboard(ctk.CTkFrame):
         self.kpi_obs_pct_skus = ctk.StringVar(value="0.0%")
         self.kpi_obs_pecas = ctk.StringVar(value="0")
 
+        # Log bufferizado: log() só enfileira; _descarregar_log() escreve em lote
+        self._log_pendente: deque = deque(maxlen=LOG_MAX_LINHAS)
+        self._log_linhas: deque = deque(maxlen=LOG_MAX_LINHAS)  # (nível, linha) para refazer o filtro
+        self._log_visiveis = 0
+        self.var_log_filtro = ctk.StringVar(value="Tudo")
+
         # Callbacks
         self.on_simular: Optional[Callable] = None
         self.on_excel: Optional[Callable] = None
         self.on_filter_change: Optional[Callable] = None
 
         self._construir_layout()
+        self.after(LOG_INTERVALO_MS, self._descarregar_log)
 
     def _construir_layout(self):
         self.grid_rowconfigure(0, weight=1)
@@ -85,7 +107,7 @@ class Dashboard(ctk.CTkFrame):
             fg_color=("#f1f5f9", "#0f172a"), border_color=("#cbd5e1", "#334155"), text_color=COLOR_TEXT_PRIMARY
         )
         self.entry_busca.pack(side="right")
-        self.entry_busca.bind("<KeyRelease>", lambda e: self.on_filter_change(self.var_busca.get()) if self.on_filter_change else None)
+        self.entry_busca.bind("<KeyRelease>", lambda e: self._agendar_busca())
 
         self.scroll_marcas = ctk.CTkScrollableFrame(frame_top, height=80, orientation="vertical", fg_color="transparent")
         self.scroll_marcas.pack(fill="x", padx=20, pady=(0, 20))
@@ -195,6 +217,18 @@ class Dashboard(ctk.CTkFrame):
         ctk.CTkLabel(f_pec, textvariable=self.kpi_obs_pecas, font=("Arial", 16, "bold"), text_color=COLOR_TEXT_PRIMARY).pack()
 
     def _montar_aba_log(self):
+        # Progresso real do motor (eventos 'etapa' do ProgressServer)
+        f_prog = ctk.CTkFrame(self.tab_log, fg_color="transparent")
+        f_prog.pack(fill="x", pady=(0, 6))
+        self.lbl_progresso = ctk.CTkLabel(f_prog, text="Aguardando execução", font=("Arial", 12), text_color=COLOR_TEXT_SECONDARY, anchor="w")
+        self.lbl_progresso.pack(fill="x")
+        self.bar_progresso = ctk.CTkProgressBar(f_prog, progress_color=COLOR_PRIMARY)
+        self.bar_progresso.pack(fill="x", pady=(2, 0))
+        self.bar_progresso.set(0)
+
+        ctk.CTkSegmentedButton(f_prog, values=list(LOG_FILTROS), variable=self.var_log_filtro,
+                               command=lambda _: self._refazer_log()).pack(anchor="e", pady=(6, 0))
+
         self.txt_log = ctk.CTkTextbox(self.tab_log, font=("Consolas", 13), fg_color=("#ffffff", "#0f172a"), text_color=("#16a34a", "#22c55e"), border_width=1, border_color=("#e2e8f0", "#334155"))
         self.txt_log.pack(fill="both", expand=True, padx=0, pady=0)
         self.txt_log.configure(state="disabled")
@@ -212,25 +246,56 @@ class Dashboard(ctk.CTkFrame):
         self.on_excel = on_excel
         self.on_filter_change = on_filter_change
 
+    def _agendar_busca(self):
+        if self._busca_agendada: self.after_cancel(self._busca_agendada)
+        self._busca_agendada = self.after(BUSCA_ATRASO_MS, self._executar_busca)
+
+    def _executar_busca(self):
+        self._busca_agendada = None
+        if self.on_filter_change: self.on_filter_change(self.var_busca.get())
+
+    def _criar_pool_marcas(self):
+        self.lbl_loading.destroy()
+        self.scroll_marcas.grid_columnconfigure(tuple(range(MARCAS_COLUNAS)), weight=1)
+        for i in range(MARCAS_POOL):
+            btn = ctk.CTkButton(
+                self.scroll_marcas, text="", height=28,
+                border_width=1, border_color=("#cbd5e1", "#475569"),
+                command=lambda i=i: self._selecionar_marca_interna(self._lista_marcas[i])
+            )
+            self._pool_marcas.append(btn)
+        self.lbl_mais_marcas = ctk.CTkLabel(self.scroll_marcas, text="", text_color="gray")
+
     def renderizar_lista_marcas(self, lista_marcas: List[str]):
-        for w in self.scroll_marcas.winfo_children(): w.destroy()
-        self.scroll_marcas.grid_columnconfigure((0,1,2,3,4), weight=1)
+        """Reaproveita o pool fixo de botões: só os primeiros MARCAS_POOL resultados aparecem."""
+        if not self._pool_marcas: self._criar_pool_marcas()
+        self._resultado_marcas = lista_marcas
+        self._lista_marcas = lista_marcas[:MARCAS_POOL]
         sel = self.var_marca.get()
-        for i, marca in enumerate(lista_marcas):
+        for i, btn in enumerate(self._pool_marcas):
+            if i >= len(self._lista_marcas):
+                btn.grid_remove()
+                continue
+            marca = self._lista_marcas[i]
             is_sel = (marca == sel)
-            btn = ctk.CTkButton(
-                self.scroll_marcas, text=marca, height=28, 
+            btn.configure(
+                text=marca,
                 fg_color=COLOR_PRIMARY if is_sel else "transparent",
                 text_color="white" if is_sel else COLOR_TEXT_PRIMARY,
                 hover_color="#1d4ed8" if is_sel else ("#e2e8f0", "#334155"),
-                border_width=1, border_color=("#cbd5e1", "#475569"),
-                command=lambda m=marca: self._selecionar_marca_interna(m)
             )
-            btn.grid(row=i//5, column=i%5, padx=3, pady=3, sticky="ew")
+            btn.grid(row=i // MARCAS_COLUNAS, column=i % MARCAS_COLUNAS, padx=3, pady=3, sticky="ew")
+
+        ocultas = len(lista_marcas) - len(self._lista_marcas)
+        if ocultas > 0:
+            self.lbl_mais_marcas.configure(text=f"+ {ocultas} marcas — refine a busca")
+            self.lbl_mais_marcas.grid(row=MARCAS_POOL // MARCAS_COLUNAS + 1, column=0, columnspan=MARCAS_COLUNAS, pady=(4, 0))
+        else:
+            self.lbl_mais_marcas.grid_remove()
 
     def _selecionar_marca_interna(self, marca):
         self.var_marca.set(marca)
-        if self.on_filter_change: self.on_filter_change(self.var_busca.get())
+        self.renderizar_lista_marcas(self._resultado_marcas)  # Só recolore o pool
 
     def atualizar_abc_stats(self, abc_data: Dict):
         for w in self.container_abc.winfo_children(): w.destroy()
@@ -297,17 +362,60 @@ class Dashboard(ctk.CTkFrame):
             
     def habilitar_excel(self): self.btn_excel.configure(state="normal", fg_color=COLOR_SUCCESS)
 
-    def log(self, msg: str):
+    def log(self, msg: str, nivel: str = "INFO"):
+        """Enfileira a mensagem (seguro fora da thread da GUI); o Textbox é atualizado em lote."""
+        nivel_num = logging.getLevelName(str(nivel).upper())
+        if not isinstance(nivel_num, int): nivel_num = logging.INFO
+        self._log_pendente.append((nivel_num, f"{time.strftime('[%H:%M:%S] ')}{msg}"))
+
+    def _descarregar_log(self):
+        """Laço fixo (LOG_INTERVALO_MS): um único insert com tudo o que chegou desde o último quadro."""
+        try:
+            if self._log_pendente:
+                minimo = LOG_FILTROS.get(self.var_log_filtro.get(), logging.DEBUG)
+                novas = []
+                while self._log_pendente:
+                    nivel, linha = self._log_pendente.popleft()
+                    self._log_linhas.append((nivel, linha))
+                    if nivel >= minimo:
+                        novas.append(linha)
+                if novas:
+                    self._escrever_log(novas)
+        finally:
+            self.after(LOG_INTERVALO_MS, self._descarregar_log)
+
+    def _escrever_log(self, linhas: List[str], substituir: bool = False):
         self.txt_log.configure(state="normal")
-        timestamp = time.strftime("[%H:%M:%S] ")
-        self.txt_log.insert("end", f"{timestamp}{msg}\n")
+        if substituir:
+            self.txt_log.delete("1.0", "end")
+            self._log_visiveis = 0
+        linhas = linhas[-LOG_MAX_LINHAS:]
+        if linhas: self.txt_log.insert("end", "\n".join(linhas) + "\n")
+        self._log_visiveis += len(linhas)
+        excesso = self._log_visiveis - LOG_MAX_LINHAS
+        if excesso > 0:
+            self.txt_log.delete("1.0", f"{excesso + 1}.0")
+            self._log_visiveis = LOG_MAX_LINHAS
         self.txt_log.see("end")
         self.txt_log.configure(state="disabled")
-        
+
+    def _refazer_log(self):
+        """Troca de filtro: redesenha a partir do anel de linhas retidas."""
+        minimo = LOG_FILTROS.get(self.var_log_filtro.get(), logging.DEBUG)
+        self._escrever_log([l for n, l in self._log_linhas if n >= minimo], substituir=True)
+
     def limpar_log(self):
-        self.txt_log.configure(state="normal")
-        self.txt_log.delete("1.0", "end")
-        self.txt_log.configure(state="disabled")
+        self._log_pendente.clear()
+        self._log_linhas.clear()
+        self._escrever_log([], substituir=True)
+        self.atualizar_progresso("Aguardando execução", 0)
+
+    def atualizar_progresso(self, etapa: str, percentual: float, linhas: Optional[int] = None, decorrido: Optional[float] = None):
+        self.bar_progresso.set(max(0.0, min(float(percentual or 0) / 100, 1.0)))
+        texto = f"{etapa} · {float(percentual or 0):.0f}%"
+        if linhas is not None: texto += f" · {int(linhas):,} linhas".replace(",", ".")
+        if decorrido is not None: texto += f" · {float(decorrido):.1f}s"
+        self.lbl_progresso.configure(text=texto)
 
     def focar_aba_log(self): self.tabs.set("  📝 LOG & AUDITORIA  ")
     def focar_aba_dashboard(self): self.tabs.set("  📊 PAINEL DE DECISÃO  ")
@@ -341,4 +449,17 @@ class Dashboard(ctk.CTkFrame):
         
         self.kpi_obs_pecas.set(fmt_int(data.get('obs_pecas', 0)))
 
+        # Qualidade de Dados (DataQualityProfiler)
+        self.atualizar_qualidade(data.get('qualidade_dados', {}))
+
+    def atualizar_qualidade(self, relatorio: Dict):
+        """Resumo do relatório de qualidade no Log & Auditoria (só regras com ocorrência)."""
+        regras = [r for r in (relatorio or {}).get('regras', []) if r.get('ocorrencias')]
+        if not regras:
+            return
+        self.log(f"🩺 Qualidade de dados: {len(regras)} regras com ocorrência em {relatorio.get('linhas', 0)} SKUs")
+        for r in regras:
+            amostra = f" | ex.: {', '.join(r['amostra'])}" if r.get('amostra') else ""
+            self.log(f"   {r['regra']} ({r['acao']}): {r['ocorrencias']}{amostra}")
+
             # MELHOR ATÉ AGORA 18 12 2025 23H15M
\ No newline at end of file
@@ -9,6 +9,20 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.append(str(PROJECT_ROOT / "src"))
 
+def pytest_addoption(parser):
+    parser.addoption("--runslow", action="store_true", default=False, help="Roda também os testes @pytest.mark.slow (benchmarks)")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: benchmark de tempo de parede, pulado sem --runslow")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--runslow"):
+        return
+    pular = pytest.mark.skip(reason="benchmark: use --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(pular)
+
 @pytest.fixture
 def config_mock():
     """Simula o objeto de configuração carregado do YAML."""
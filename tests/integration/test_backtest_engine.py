@@ -0,0 +1,87 @@
+# tests/integration/test_backtest_engine.py
+import duckdb
+import polars as pl
+import pytest
+from datetime import date, timedelta
+from compras_sistema.data_engine.backtest_engine import BacktestEngine
+
+@pytest.fixture
+def ambiente_backtest(tmp_path):
+    """DuckDB em memória com vendas + arquivo de histórico com uma execução de 60 dias atrás."""
+    conn = duckdb.connect(":memory:")
+    conn.execute("CREATE SCHEMA sqlite_db")
+    conn.execute("CREATE TABLE sqlite_db.vendas (cod_produto VARCHAR, data_movimento DATE, quantidade INTEGER, cod_clifor INTEGER)")
+    conn.execute("CREATE TABLE sqlite_db.produtos_gerais (cod_produto VARCHAR, marca VARCHAR)")
+    conn.execute("INSERT INTO sqlite_db.produtos_gerais VALUES ('P1', 'ACME'), ('P2', 'ACME')")
+
+    # P1 vende 2/dia todos os dias (antes e depois da execução); P2 não vende depois
+    data_exec = date.today() - timedelta(days=60)
+    conn.execute("""
+        INSERT INTO sqlite_db.vendas
+        SELECT 'P1', CAST(CURRENT_DATE - CAST(i AS INTEGER) AS DATE), 2, 1 FROM range(500) t(i)
+    """)
+    conn.execute(f"INSERT INTO sqlite_db.vendas VALUES ('P2', DATE '{data_exec - timedelta(days=5)}', 365, 1)")
+
+    hist_path = tmp_path / "analytics.duckdb"
+    with duckdb.connect(str(hist_path)) as hist:
+        hist.execute("CREATE TABLE historico_execucoes (id_execucao INTEGER, data_registro TIMESTAMP, data_referencia DATE)")
+        hist.execute("""CREATE TABLE historico_detalhes (id_execucao INTEGER, cod_produto VARCHAR, curva_abc VARCHAR,
+                        media_venda_dia DOUBLE, saldo_estoque INTEGER, saldo_oc INTEGER, sugestao_final INTEGER)""")
+        # Reprocessamento "as_of": rodou hoje, mas calculou a posição de 60 dias atrás
+        hist.execute(f"INSERT INTO historico_execucoes VALUES (1, CURRENT_TIMESTAMP, DATE '{data_exec}')")
+        hist.execute("INSERT INTO historico_detalhes VALUES (1, 'P1', 'A', 2.0, 10, 0, 20), (1, 'P2', 'C', 1.0, 0, 0, 0)")
+
+    class MockDB:
+        def get_connection(self):
+            class ConnContext:
+                def __enter__(ctx): return conn
+                def __exit__(ctx, exc_type, exc_val, exc_tb): pass
+            return ConnContext()
+
+    return MockDB(), hist_path
+
+def test_backtest_metricas_por_metodo(ambiente_backtest):
+    db, hist_path = ambiente_backtest
+    engine = BacktestEngine(db, hist_path, horizonte_dias=30)
+
+    resultado = engine.run(metodos=("SUGERIDO", "MEDIA_365D", "CROSTON"))
+    df_sku = resultado["sku"]
+
+    p1 = df_sku.filter((pl.col("cod_produto") == "P1") & (pl.col("metodo") == "SUGERIDO")).row(0, named=True)
+    # Previsto = 2.0 * 30 = 60 ; Realizado = 2 * 30 = 60
+    assert p1["realizado"] == pytest.approx(60.0)
+    assert p1["wape"] == pytest.approx(0.0)
+    # Disponível = 10 + 0 + 20 = 30 -> atende metade da demanda
+    assert p1["fill_rate"] == pytest.approx(0.5)
+
+    p1_media = df_sku.filter((pl.col("cod_produto") == "P1") & (pl.col("metodo") == "MEDIA_365D")).row(0, named=True)
+    assert p1_media["previsto"] == pytest.approx(60.0)
+    assert p1_media["fill_rate"] is None
+
+    # P2: previu 30 (1/dia) e nada foi vendido -> viés sem denominador (nulo/inf), MAPE ignora a linha
+    p2 = df_sku.filter((pl.col("cod_produto") == "P2") & (pl.col("metodo") == "SUGERIDO")).row(0, named=True)
+    assert p2["realizado"] == 0.0
+    assert p2["mape"] is None
+    assert p2["wape"] is None and p2["vies"] is None and p2["fill_rate"] is None
+
+    assert set(resultado["metodo"]["metodo"].to_list()) == {"SUGERIDO", "MEDIA_365D", "CROSTON"}
+    assert resultado["marca"]["marca"].unique().to_list() == ["ACME"]
+
+def test_metricas_grupo_sem_demanda_ficam_nulas():
+    """Marca sem venda no horizonte: WAPE/Viés/Fill Rate nulos (sem inf/NaN na média por marca)."""
+    df_base = pl.DataFrame({
+        "id_execucao": [1, 1], "cod_produto": ["P1", "P2"], "curva_abc": ["A", "C"],
+        "marca": ["ACME", "PARADA"], "realizado": [60.0, 0.0],
+        "saldo_estoque": [10, 5], "saldo_oc": [0, 0], "sugestao_final": [20, 0],
+    })
+    df_prev = pl.DataFrame({
+        "id_execucao": [1, 1], "cod_produto": ["P1", "P2"],
+        "previsao_dia": [2.0, 1.0], "metodo": ["SUGERIDO", "SUGERIDO"],
+    })
+
+    df = BacktestEngine.calcular_metricas(df_base, df_prev, 30, ["marca"])
+    parada = df.filter(pl.col("marca") == "PARADA").row(0, named=True)
+    assert parada["previsto"] == pytest.approx(30.0)
+    assert parada["wape"] is None and parada["vies"] is None and parada["fill_rate"] is None
+    assert df.filter(pl.col("marca") == "ACME")["wape"].item() == pytest.approx(0.0)
+    assert df["wape"].mean() == pytest.approx(0.0)  # Média ignora o nulo
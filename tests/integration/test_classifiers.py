@@ -5,6 +5,7 @@ import polars as pl
 from datetime import datetime, timedelta
 from compras_sistema.rule_engine.classification.abc_classifier import ABCClassifier
 from compras_sistema.rule_engine.classification.xyz_classifier import XYZClassifier
+from compras_sistema.rule_engine.classification.concentracao_classifier import ConcentracaoClassifier
 
 @pytest.fixture
 def db_manager_mock():
@@ -70,19 +71,18 @@ def test_abc_classifier(db_manager_mock):
         pytest.skip("Arquivo SQL abc_financeiro.sql não encontrado no ambiente de teste")
 
 def test_xyz_classifier_z_score(db_manager_mock, config_mock):
-    """Testa a variabilidade (Coeficiente de Variação)."""
+    """Testa a variabilidade (Coeficiente de Variação zero-filled em 365 dias)."""
     conn = db_manager_mock.get_connection().__enter__()
     
-    # Prod X: Venda muito estável (10 todo dia)
-    # Prod Z: Venda errática (0, 100, 0, 0)
-    
-    base_date = datetime.now()
-    for i in range(10):
-        dt = (base_date - timedelta(days=i)).strftime("%Y-%m-%d")
-        conn.execute(f"INSERT INTO sqlite_db.vendas VALUES ('PROD-X', '{dt}', 10, 100, 1)")
-        
-        qtd_z = 100 if i == 0 else 0
-        conn.execute(f"INSERT INTO sqlite_db.vendas VALUES ('PROD-Z', '{dt}', {qtd_z}, 100, 1)")
+    # Prod X: Venda muito estável (10 todo dia, durante toda a janela)
+    # Prod Z: Venda errática (100 em um único dia, zero no resto do ano)
+    conn.execute("""
+        INSERT INTO sqlite_db.vendas
+        SELECT 'PROD-X', CAST(CURRENT_DATE - CAST(i AS INTEGER) AS DATE), 10, 100, 1
+        FROM range(365) t(i)
+    """)
+    hoje = datetime.now().strftime("%Y-%m-%d")
+    conn.execute(f"INSERT INTO sqlite_db.vendas VALUES ('PROD-Z', '{hoje}', 100, 100, 1)")
 
     classifier = XYZClassifier(db_manager_mock, config_mock)
     df = classifier.run()
@@ -91,4 +91,64 @@ def test_xyz_classifier_z_score(db_manager_mock, config_mock):
     xyz_z = df.filter(pl.col("cod_produto") == "PROD-Z")["curva_xyz"].item()
     
     assert xyz_x == "X"  # CV baixo
-    assert xyz_z == "Z"  # CV alto
\ No newline at end of file
+    assert xyz_z == "Z"  # CV alto
+
+def test_xyz_estatisticas_zero_filled():
+    """Média, desvio e CV devem considerar os dias sem venda (sem expandir a grade)."""
+    df_diario = pl.DataFrame({
+        "cod_produto": ["P1", "P1"],
+        "data": [datetime(2025, 1, 1).date(), datetime(2025, 1, 2).date()],
+        "qtd_dia": [4.0, 4.0]
+    })
+
+    # Janela de 4 dias -> série zero-filled [4, 4, 0, 0]
+    df = XYZClassifier.calcular_xyz_polars(df_diario, {}, janela_dias=4)
+    row = df.row(0, named=True)
+
+    assert row["media_venda_dia"] == pytest.approx(2.0)
+    assert row["std_venda_dia"] == pytest.approx((16.0 / 3) ** 0.5)
+    assert row["curva_xyz"] == "Z"  # CV ≈ 1.15 > 1.0 (threshold padrão Y)
+
+def test_xyz_thresholds_do_config():
+    """Os cortes X/Y devem vir de xyz.*.threshold."""
+    df_diario = pl.DataFrame({
+        "cod_produto": ["P1", "P1"],
+        "data": [datetime(2025, 1, 1).date(), datetime(2025, 1, 2).date()],
+        "qtd_dia": [4.0, 4.0]
+    })
+    config = {"xyz": {"X": {"threshold": 2.0}, "Y": {"threshold": 3.0}}}
+
+    df = XYZClassifier.calcular_xyz_polars(df_diario, config, janela_dias=4)
+    assert df["curva_xyz"].item() == "X"
+
+def test_xyz_data_referencia_as_of(db_manager_mock, config_mock):
+    """Com data de referência no passado, vendas posteriores a ela não podem entrar na janela."""
+    conn = db_manager_mock.get_connection().__enter__()
+    conn.execute("INSERT INTO sqlite_db.vendas VALUES ('PROD-1', DATE '2024-06-10', 365, 100, 1)")
+    conn.execute("INSERT INTO sqlite_db.vendas VALUES ('PROD-1', DATE '2024-07-10', 9999, 100, 1)")
+
+    classifier = XYZClassifier(db_manager_mock, config_mock, data_referencia=datetime(2024, 6, 30).date())
+    df = classifier.run()
+
+    assert classifier.df_diario["data"].max() == datetime(2024, 6, 10).date()
+    assert df.filter(pl.col("cod_produto") == "PROD-1")["media_venda_dia"].item() == pytest.approx(1.0)
+
+def test_concentracao_clientes_hhi_e_top_share():
+    """HHI e participação dos maiores clientes a partir da agregação produto x cliente."""
+    df_clientes = pl.DataFrame({
+        "cod_produto": ["P1", "P1", "P1", "P1", "P2"],
+        "cod_clifor": [1, 2, 3, 4, 9],
+        "qtd_365d": [50.0, 30.0, 20.0, -5.0, 10.0],
+        "qtd_90d": [10.0, 0.0, 5.0, 0.0, 10.0]
+    })
+
+    df = ConcentracaoClassifier.calcular_concentracao_polars(df_clientes)
+
+    p1 = df.filter(pl.col("cod_produto") == "P1").row(0, named=True)
+    assert p1["qtd_clientes_365d"] == 3   # Devolução líquida não conta
+    assert p1["qtd_clientes_90d"] == 2
+    assert p1["share_top1"] == pytest.approx(0.5)
+    assert p1["share_top3"] == pytest.approx(1.0)
+    assert p1["hhi_clientes"] == pytest.approx(0.25 + 0.09 + 0.04)
+
+    assert df.filter(pl.col("cod_produto") == "P2")["hhi_clientes"].item() == pytest.approx(1.0)
@@ -0,0 +1,40 @@
+# tests/unit/test_brand_index.py
+import json
+import os
+from compras_sistema.utils.brand_index import BrandIndex
+
+MARCAS = ["Bosch", "BOSCH AUTOMOTIVE", "Nakata", "Cofap", "Monroe", "Axios", "TODAS", "bosch", None, ""]
+
+def test_busca_prefixo_antes_de_substring():
+    indice = BrandIndex(MARCAS)
+
+    assert indice.buscar("") == ["TODAS", "Axios", "Bosch", "bosch", "BOSCH AUTOMOTIVE", "Cofap", "Monroe", "Nakata"]
+    assert indice.buscar("os") == ["TODAS", "Axios", "Bosch", "bosch", "BOSCH AUTOMOTIVE"]
+    assert indice.buscar("o")[:2] == ["TODAS", "Axios"] and "Monroe" in indice.buscar("o")
+    assert indice.buscar("auto") == ["TODAS", "BOSCH AUTOMOTIVE"]
+    assert indice.buscar("MON") == ["TODAS", "Monroe"]
+    assert indice.buscar("xyz") == ["TODAS"]
+
+def test_busca_confere_o_termo_inteiro_e_limite():
+    indice = BrandIndex(["ABCXBC", "ABC", "XBCA"])
+
+    # Todos os trigramas de "ABCA" existem, mas só casa quem contém o termo inteiro
+    assert indice.buscar("abca") == ["TODAS"]
+    assert indice.buscar("bc") == ["TODAS", "ABC", "ABCXBC", "XBCA"]
+    assert indice.buscar("bc", limite=2) == ["TODAS", "ABC"]
+
+def test_cache_invalida_quando_banco_muda(tmp_path):
+    db = tmp_path / "vendas.db"
+    cache = tmp_path / "marcas_cache.json"
+    db.write_bytes(b"v1")
+
+    assert BrandIndex.ler_cache(cache, db) is None
+    BrandIndex.gravar_cache(cache, db, ["Bosch", "Cofap"])
+    assert BrandIndex.ler_cache(cache, db) == ["Bosch", "Cofap"]
+
+    db.write_bytes(b"versao 2")
+    os.utime(db, ns=(1, 1))
+    assert BrandIndex.ler_cache(cache, db) is None
+
+    cache.write_text(json.dumps(["TODAS", "Bosch"]), encoding="utf-8")  # Formato antigo
+    assert BrandIndex.ler_cache(cache, db) is None
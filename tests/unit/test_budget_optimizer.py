@@ -0,0 +1,64 @@
+# tests/unit/test_budget_optimizer.py
+import time
+import numpy as np
+import polars as pl
+import pytest
+from compras_sistema.rule_engine.stock.budget_optimizer import BudgetOptimizer
+
+def _linhas():
+    return pl.DataFrame({
+        "cod_produto": ["P1", "P2", "P3", "P4"],
+        "marca": ["M1", "M1", "M1", "M2"],
+        "sugestao_final": [20, 10, 5, 50],
+        "lote_economico": [10, 5, 5, 10],
+        "custo_unitario": [10.0, 10.0, 10.0, 1.0],
+        "score": [9000, 3000, 100, 100],
+        "saldo_estoque": [0, 10, 50, 0],
+        "saldo_oc": [0, 0, 0, 0],
+        "ponto_suprimento": [20, 5, 10, 10],
+        "estoque_meta": [20, 20, 55, 50],
+    })
+
+def test_orcamento_respeita_lotes_e_prioriza_score():
+    """M1 sugere R$ 350 com orçamento de R$ 250; M2 não tem orçamento (sem limite)."""
+    resultado = BudgetOptimizer.otimizar(_linhas(), {"agrupar_por": "marca", "valores": {"M1": 250.0}})
+    df = resultado["df"]
+    aprovado = dict(zip(df["cod_produto"], df["sugestao_orcamento"]))
+
+    assert aprovado["P1"] == 20                      # Ruptura de maior score: integral
+    assert aprovado["P2"] == 5                       # Só cabe 1 lote de 5 (R$ 50)
+    assert aprovado["P3"] == 0
+    assert aprovado["P4"] == 50                      # Grupo sem orçamento
+    assert all(q % l == 0 for q, l in zip(df["sugestao_orcamento"], df["lote_economico"]))
+
+    m1 = resultado["impacto"].filter(pl.col("marca") == "M1").row(0, named=True)
+    assert m1["valor_aprovado"] <= 250.0
+    assert m1["nivel_servico_depois"] < m1["nivel_servico_antes"]
+    assert set(resultado["cortes"]["cod_produto"]) == {"P2", "P3"}
+
+def _catalogo_grande(n=100_000):
+    rng = np.random.default_rng(42)
+    return pl.DataFrame({
+        "cod_produto": [f"P{i}" for i in range(n)],
+        "marca": rng.integers(0, 200, n).astype(str),
+        "sugestao_final": rng.integers(1, 6, n) * 6,
+        "lote_economico": np.full(n, 6),
+        "custo_unitario": rng.uniform(1, 100, n),
+        "score": rng.integers(0, 9000, n),
+        "saldo_estoque": rng.integers(0, 20, n),
+        "saldo_oc": np.zeros(n, dtype=np.int64),
+        "ponto_suprimento": rng.integers(0, 30, n),
+    })
+
+def test_orcamento_100k_linhas_respeita_limite():
+    resultado = BudgetOptimizer.otimizar(_catalogo_grande(), {"padrao": 20_000.0})
+    assert (resultado["impacto"]["valor_aprovado"] <= 20_000.0 + 1e-6).all()
+
+@pytest.mark.slow
+def test_orcamento_100k_linhas_abaixo_de_um_segundo():
+    """Benchmark (tempo de parede): só roda com --runslow."""
+    df = _catalogo_grande()
+    BudgetOptimizer.otimizar(df.head(100), {"padrao": 20_000.0})  # Aquecimento (pool de threads do Polars)
+    inicio = time.perf_counter()
+    BudgetOptimizer.otimizar(df, {"padrao": 20_000.0})
+    assert time.perf_counter() - inicio < 1.0
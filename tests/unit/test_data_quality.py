@@ -0,0 +1,45 @@
+# tests/unit/test_data_quality.py
+from datetime import date
+import polars as pl
+from compras_sistema.utils.data_quality import DataQualityProfiler
+
+def _base_suja():
+    return pl.DataFrame({
+        "cod_produto": ["P1", "P2", "P3", "P4"],
+        "saldo_estoque": [10, None, -5, 3],
+        "saldo_oc": [0, 0, 0, None],
+        "media_venda_dia": [1.0, None, -0.5, 2.0],
+        "std_venda_dia": [0.1, 0.2, None, 0.3],
+        "lead_time_dias": [10, -3, 10, 10],
+        "lote_economico": [0, None, 6, 12],
+        "custo_unitario": [10.0, 5.0, None, 2.0],
+        "curva_abc": ["A", None, "D", "B"],
+        "curva_xyz": ["X", "Y", "Z", None],
+        "data_cadastro": [date(2024, 1, 1), None, date(2024, 1, 1), date(2024, 1, 1)],
+    })
+
+def test_corrige_em_uma_passada():
+    df, _ = DataQualityProfiler().aplicar(_base_suja())
+
+    assert df["saldo_estoque"].to_list() == [10, 0, -5, 3]  # Negativo é mantido (alerta no Excel)
+    assert df["media_venda_dia"].to_list() == [1.0, 0.0, 0.0, 2.0]
+    assert df["lead_time_dias"].to_list() == [10.0, 0.0, 10.0, 10.0]
+    assert df["lote_economico"].to_list() == [1, 1, 6, 12]
+    assert df["curva_abc"].to_list() == ["A", "C", "C", "B"]
+    assert df["curva_xyz"].to_list() == ["X", "Y", "Z", "Z"]
+    assert df["data_cadastro"][1] == date(2000, 1, 1)
+    assert df.schema["lead_time_dias"] == pl.Float64 and df.schema["saldo_oc"] == pl.Int64
+    assert df.null_count().sum_horizontal().item() == 0
+
+def test_relatorio_conta_regras_com_amostra():
+    _, relatorio = DataQualityProfiler(tamanho_amostra=1).aplicar(_base_suja())
+    regras = {r["regra"]: r for r in relatorio["regras"]}
+
+    assert relatorio["linhas"] == 4
+    assert regras["lote_economico_abaixo_minimo"]["ocorrencias"] == 1
+    assert regras["lote_economico_nulo"]["amostra"] == ["P2"]
+    assert regras["curva_abc_invalida"]["amostra"] == ["P3"]
+    assert regras["estoque_negativo"]["acao"] == "apenas_relatar"
+    assert regras["custo_zerado"]["ocorrencias"] == 0  # Nulo conta como custo_unitario_nulo
+    assert regras["media_venda_dia_abaixo_minimo"]["ocorrencias"] == 1
+    assert DataQualityProfiler.resumo(relatorio)[0].endswith("ex.: P2")
@@ -0,0 +1,33 @@
+# tests/unit/test_duckdb_manager.py
+import json
+import duckdb
+from compras_sistema.data_engine.duckdb_manager import DuckDBManager
+
+def test_from_config_auto_e_valores_fixos(tmp_path):
+    auto = DuckDBManager.from_config({"threads": "auto", "limite_memoria": "auto", "barra_progresso": "auto"})
+    assert auto.threads >= 1
+    assert auto.memory_limit.endswith("MB") and int(auto.memory_limit[:-2]) >= 256
+    assert auto.profiling_dir is None
+
+    fixo = DuckDBManager.from_config({
+        "threads": 2, "limite_memoria": "512MB", "barra_progresso": False,
+        "pasta_temporaria": "data/tmp/duckdb", "perfil_consultas": True, "pasta_perfil": "logs/perfil",
+    }, tmp_path)
+    assert (fixo.threads, fixo.memory_limit, fixo.progress_bar) == (2, "512MB", False)
+    assert fixo.temp_directory == tmp_path / "data" / "tmp" / "duckdb"
+    assert fixo.profiling_dir == tmp_path / "logs" / "perfil"
+
+def test_perfil_json_por_consulta_da_etapa(tmp_path):
+    db = DuckDBManager(threads=1, memory_limit="256MB", profiling_dir=tmp_path)
+    db._conn = duckdb.connect(":memory:")  # initialize() exige o SQLite do ERP
+
+    with db.perfilar("classificacao"), db.get_connection() as conn:
+        conn.execute("SELECT SUM(range) FROM range(1000)").fetchall()
+        conn.execute("SELECT 42").fetchall()
+    with db.get_connection() as conn:
+        conn.execute("SELECT 1").fetchall()  # fora da etapa: sem perfil
+
+    arquivos = sorted(p.name for p in tmp_path.glob("*.json"))
+    assert arquivos == ["classificacao_01.json", "classificacao_02.json"]
+    assert "42" in json.loads((tmp_path / "classificacao_02.json").read_text())["query_name"]
+    db.close()
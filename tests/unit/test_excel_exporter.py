@@ -0,0 +1,31 @@
+# tests/unit/test_excel_exporter.py
+import polars as pl
+from openpyxl import load_workbook
+from compras_sistema.export.excel_exporter import ExcelExporter
+
+def _linhas():
+    return pl.DataFrame({
+        "status_diagnostico": ["COMPRAR", "RUPTURA", "OK"],
+        "cod_produto": ["P1", "P2", "P3"],
+        "descricao": ["PARAFUSO", "PORCA SEXTAVADA", None],
+        "sugestao_final": [12, 6, 0],
+        "subtotal": [120.0, 30.5, 0.0],
+        "custo_unitario": [10.0, 5.0833, 1.0],
+        "fator_sazonal": [1.2, 0.8, 1.0],
+        "motivo_bloqueio": ["", "", "ALERTA: Excesso > 6m"],
+    })
+
+def _celulas(caminho):
+    ws = load_workbook(caminho).active
+    return [[(c.value, c.number_format, c.fill.start_color.rgb, bool(c.font.bold)) for c in linha]
+            for linha in ws.iter_rows()], {k: d.width for k, d in ws.column_dimensions.items()}
+
+def test_streaming_gera_mesma_planilha(tmp_path):
+    exporter = ExcelExporter(tmp_path)
+    normal = exporter.exportar_sugestao(_linhas(), "normal.xlsx")
+    streaming = exporter.exportar_sugestao(_linhas(), "streaming.xlsx", streaming=True)
+
+    celulas_normal, larguras_normal = _celulas(normal)
+    celulas_streaming, larguras_streaming = _celulas(streaming)
+    assert celulas_streaming == celulas_normal
+    assert larguras_streaming == larguras_normal
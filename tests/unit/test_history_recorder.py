@@ -0,0 +1,46 @@
+# tests/unit/test_history_recorder.py
+from datetime import date
+import duckdb
+import polars as pl
+import pytest
+from compras_sistema.data_engine.history_recorder import HistoryRecorder
+
+@pytest.fixture
+def recorder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # analytics.duckdb vai para tmp_path/data
+    rec = HistoryRecorder(db_manager=None)
+    rec.inicializar_tabela()
+    return rec
+
+def _snapshot(curvas: dict) -> pl.DataFrame:
+    return pl.DataFrame({"cod_produto": list(curvas), "curva_abc": list(curvas.values())})
+
+def test_reprocessamento_grava_data_de_referencia(recorder):
+    recorder.gravar_snapshot(_snapshot({"P1": "A"}), {"data_referencia": date(2026, 1, 10)})
+    recorder.gravar_snapshot(_snapshot({"P1": "C"}), {"data_referencia": date(2026, 3, 1)})
+
+    with duckdb.connect(str(recorder.history_db_path)) as conn:
+        datas = conn.execute("SELECT data_referencia FROM historico_execucoes ORDER BY id_execucao").fetchall()
+    assert [d[0] for d in datas] == [date(2026, 1, 10), date(2026, 3, 1)]
+
+    # "Curva anterior" de um as_of em fevereiro vem da execução de janeiro, não de quando ela rodou
+    anterior = recorder.carregar_ultima_curva_abc(date(2026, 2, 1))
+    assert anterior.rows() == [("P1", "A")]
+
+def test_reprocessamento_nao_altera_lookup_da_ultima_curva(recorder):
+    recorder.gravar_snapshot(_snapshot({"P1": "A", "P2": "B"}), {})  # Execução ao vivo (hoje)
+    recorder.gravar_snapshot(_snapshot({"P1": "C", "P2": "C"}), {"data_referencia": date(2026, 3, 1)})
+
+    atual = recorder.carregar_ultima_curva_abc()
+    assert sorted(atual.rows()) == [("P1", "A"), ("P2", "B")]
+
+    with duckdb.connect(str(recorder.history_db_path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM historico_detalhes").fetchone()[0] == 4
+
+def test_classificacoes_enum_gravadas_como_texto(recorder):
+    df = _snapshot({"P1": "A", "P2": "C"}).with_columns(pl.col("curva_abc").cast(pl.Enum(["A", "B", "C"])))
+    recorder.gravar_snapshot(df, {})
+
+    with duckdb.connect(str(recorder.history_db_path)) as conn:
+        linhas = conn.execute("SELECT cod_produto, curva_abc FROM historico_detalhes ORDER BY 1").fetchall()
+    assert linhas == [("P1", "A"), ("P2", "C")]
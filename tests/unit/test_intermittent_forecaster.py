@@ -0,0 +1,70 @@
+# tests/unit/test_intermittent_forecaster.py
+import numpy as np
+import polars as pl
+import pytest
+from datetime import date, timedelta
+from compras_sistema.rule_engine.forecast.intermittent_forecaster import IntermittentForecaster
+from compras_sistema.rule_engine.stock.estoque_math import EstoqueMath
+
+def test_croston_demanda_regular_intermitente():
+    """Demanda de 6 unidades a cada 3 dias -> Croston converge para 2/dia."""
+    serie = np.tile([6.0, 0.0, 0.0], 40)
+    matriz = np.vstack([serie, np.zeros_like(serie)])
+
+    previsao, sigma = IntermittentForecaster.prever_matriz(matriz, "croston", alpha=0.1)
+
+    assert previsao[0] == pytest.approx(2.0, rel=0.02)
+    assert sigma[0] > 0
+    # SKU sem nenhuma venda: previsão e desvio zerados
+    assert previsao[1] == 0.0
+    assert sigma[1] == 0.0
+
+def test_sba_aplica_correcao_de_vies():
+    """SBA = Croston * (1 - alpha/2)."""
+    serie = np.tile([6.0, 0.0, 0.0], 40)[None, :]
+
+    croston, _ = IntermittentForecaster.prever_matriz(serie, "croston", alpha=0.2)
+    sba, _ = IntermittentForecaster.prever_matriz(serie, "sba", alpha=0.2)
+
+    assert sba[0] == pytest.approx(croston[0] * 0.9)
+
+def test_tsb_decai_quando_item_para_de_vender():
+    """TSB reduz a probabilidade a cada período sem demanda (Croston não)."""
+    serie = np.concatenate([np.tile([5.0, 0.0], 30), np.zeros(60)])[None, :]
+
+    croston, _ = IntermittentForecaster.prever_matriz(serie, "croston", alpha=0.1)
+    tsb, _ = IntermittentForecaster.prever_matriz(serie, "tsb", alpha=0.1, beta=0.1)
+
+    assert tsb[0] < croston[0] * 0.1
+
+def test_metodo_invalido():
+    with pytest.raises(ValueError):
+        IntermittentForecaster.prever_matriz(np.zeros((1, 10)), "arima")
+
+def test_prever_polars_substitui_media_no_estoque_math():
+    """A saída deve ser consumida por EstoqueMath.aplicar_previsao_demanda."""
+    ref = date(2025, 6, 30)
+    df_diario = pl.DataFrame({
+        "cod_produto": ["Z1"] * 30,
+        "data": [ref - timedelta(days=3 * i) for i in range(30)],
+        "qtd_dia": [6.0] * 30
+    })
+
+    df_prev = IntermittentForecaster.prever_polars(
+        df_diario, {"metodo": "croston", "alpha": 0.1}, janela_dias=90, data_referencia=ref
+    )
+
+    df_base = pl.DataFrame({
+        "cod_produto": ["Z1", "X1"],
+        "media_venda_dia": [0.5, 3.0],
+        "std_venda_dia": [1.0, 0.2]
+    })
+    df = EstoqueMath.aplicar_previsao_demanda(df_base, df_prev)
+
+    z1 = df.filter(pl.col("cod_produto") == "Z1").row(0, named=True)
+    x1 = df.filter(pl.col("cod_produto") == "X1").row(0, named=True)
+
+    assert z1["media_venda_dia"] == pytest.approx(2.0, rel=0.01)
+    assert z1["metodo_demanda"] == "CROSTON"
+    assert x1["media_venda_dia"] == 3.0
+    assert x1["metodo_demanda"] == "MEDIA_365D"
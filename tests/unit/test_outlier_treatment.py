@@ -0,0 +1,41 @@
+# tests/unit/test_outlier_treatment.py
+import polars as pl
+import pytest
+from compras_sistema.rule_engine.forecast.outlier_treatment import OutlierTreatment
+
+def _serie_com_pico():
+    """P1: 10 dias vendendo 10 e um pedido pontual de 500. P2: venda única (intermitente)."""
+    return pl.DataFrame({
+        "cod_produto": ["P1"] * 11 + ["P2"],
+        "qtd_dia": [10.0] * 10 + [500.0] + [300.0]
+    })
+
+def test_desativado_nao_altera_serie():
+    df = OutlierTreatment.cortar_outliers(_serie_com_pico(), {"fator_multiplicador": 2.0})
+
+    assert df["qtd_dia"].max() == 500.0
+    assert df["outlier_cortado"].sum() == 0
+
+def test_corte_por_desvio_e_contagem_por_sku():
+    cfg = {"ativada": True, "fator_multiplicador": 2.0, "metodo": "desvio"}
+    df = OutlierTreatment.cortar_outliers(_serie_com_pico(), cfg)
+
+    p1 = df.filter(pl.col("cod_produto") == "P1")
+    assert p1["qtd_dia"].max() < 500.0
+    assert p1["qtd_dia"].min() == 10.0
+    # SKU com menos pontos que o mínimo não é tratado
+    assert df.filter(pl.col("cod_produto") == "P2")["qtd_dia"].item() == 300.0
+
+    contagem = dict(OutlierTreatment.contar_por_sku(df).iter_rows())
+    assert contagem == {"P1": 1, "P2": 0}
+
+def test_corte_por_mad_usa_mediana():
+    """Com série constante o MAD é zero: o pico é cortado exatamente na mediana."""
+    cfg = {"ativada": True, "fator_multiplicador": 3.0, "metodo": "mad"}
+    df = OutlierTreatment.cortar_outliers(_serie_com_pico(), cfg)
+
+    assert df.filter(pl.col("cod_produto") == "P1")["qtd_dia"].max() == pytest.approx(10.0)
+
+def test_metodo_invalido():
+    with pytest.raises(ValueError):
+        OutlierTreatment.cortar_outliers(_serie_com_pico(), {"ativada": True, "metodo": "iqr"})
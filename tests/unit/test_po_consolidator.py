@@ -0,0 +1,95 @@
+# tests/unit/test_po_consolidator.py
+import polars as pl
+import pytest
+from compras_sistema.rule_engine.stock.po_consolidator import POConsolidator
+
+def _linhas():
+    return pl.DataFrame({
+        "cod_produto": ["P1", "P2", "P3", "P4", "P5", "P6"],
+        "marca": ["M1", "M1", "M1", "M1", "M2", "M2"],
+        "sugestao_final": [10, 0, 0, 0, 2, 0],
+        "lote_economico": [5, 5, 5, 5, 1, 1],
+        "custo_unitario": [10.0, 10.0, 10.0, 10.0, 10.0, 10.0],
+        "saldo_estoque": [0, 11, 10, 50, 0, 0],
+        "saldo_oc": [0, 0, 0, 0, 0, 0],
+        "ponto_suprimento": [10, 10, 10, 10, 5, 5],
+        "media_venda_dia": [1.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+        "ativo": ["SIM"] * 6,
+        "motivo_bloqueio": ["", "", "", "", "", ""],
+    })
+
+def test_antecipa_itens_proximos_do_ps_ate_o_frete_gratis():
+    """M1 pede R$ 100; frete grátis em R$ 140 -> antecipa P3 (mais próximo) e P2, nunca P4 (longe do PS)."""
+    resultado = POConsolidator.consolidar(_linhas(), {"frete_gratis_valor": 140.0})
+    antecipado = dict(zip(resultado["df"]["cod_produto"], resultado["df"]["qtd_antecipada"]))
+
+    assert antecipado["P3"] == 5
+    assert antecipado["P2"] == 0                     # P3 já cruza o limite (R$ 150)
+    assert antecipado["P4"] == 0
+
+    m1 = resultado["pedidos"].filter(pl.col("marca") == "M1").row(0, named=True)
+    assert m1["valor_total"] == 150.0
+    assert m1["status_pedido"] == "FRETE GRÁTIS"
+    assert set(resultado["itens"].filter(pl.col("marca") == "M1")["cod_produto"]) == {"P1", "P3"}
+
+def test_nao_antecipa_quando_candidatos_nao_alcancam_o_frete():
+    resultado = POConsolidator.consolidar(_linhas(), {"frete_gratis_valor": 1000.0})
+    assert resultado["df"]["qtd_antecipada"].sum() == 0
+
+def test_pedido_minimo_por_fornecedor_sinaliza_ou_retem():
+    config = {"pedido_minimo_valor": 50.0, "fornecedores": {"M1": {"pedido_minimo_valor": 0.0}}}
+
+    sinalizado = POConsolidator.consolidar(_linhas(), config)
+    status = dict(zip(sinalizado["pedidos"]["marca"], sinalizado["pedidos"]["status_pedido"]))
+    assert status == {"M1": "OK", "M2": "ABAIXO DO MÍNIMO"}
+
+    retido = POConsolidator.consolidar(_linhas(), {**config, "acao_abaixo_minimo": "reter"})["df"]
+    p5 = retido.filter(pl.col("cod_produto") == "P5").row(0, named=True)
+    assert p5["sugestao_final"] == 0
+    assert p5["motivo_bloqueio"].startswith("PEDIDO:")
+
+def test_acao_invalida_gera_erro():
+    with pytest.raises(ValueError):
+        POConsolidator.consolidar(_linhas(), {"acao_abaixo_minimo": "ignorar"})
+
+def test_antecipacao_respeita_sobra_do_orcamento():
+    """Orçamento e pedidos ativos: o frete grátis não pode puxar o pedido acima do orçamento."""
+    from compras_sistema.rule_engine.stock.budget_optimizer import BudgetOptimizer
+    df = _linhas().with_columns(pl.lit(1000).alias("score"))
+    cfg_pedido = {"frete_gratis_valor": 140.0}
+
+    for orcamento, esperado in ((120.0, 0), (160.0, 5)):
+        cfg_orc = {"ativada": True, "agrupar_por": "marca", "valores": {"M1": orcamento}}
+        df_orc = BudgetOptimizer.otimizar(df, cfg_orc)["df"].with_columns(
+            pl.col("sugestao_orcamento").alias("sugestao_final"))
+        resultado = POConsolidator.consolidar(df_orc, cfg_pedido, cfg_orc)
+
+        m1 = resultado["pedidos"].filter(pl.col("marca") == "M1").row(0, named=True)
+        assert m1["valor_total"] <= orcamento
+        assert resultado["df"].filter(pl.col("cod_produto") == "P3")["qtd_antecipada"].item() == esperado
+
+def test_item_antecipado_passa_a_comprar():
+    df = _linhas().with_columns(pl.lit("OK").alias("status_diagnostico"))
+    resultado = POConsolidator.consolidar(df, {"frete_gratis_valor": 140.0})["df"]
+    status = dict(zip(resultado["cod_produto"], resultado["status_diagnostico"]))
+    assert status["P3"] == "COMPRAR"
+    assert status["P4"] == "OK"
+
+def test_item_retido_fica_bloqueado_e_marca_nula_preservada():
+    df = _linhas().with_columns([
+        pl.lit("COMPRAR").alias("status_diagnostico"),
+        pl.lit("NÃO").alias("calculado_mas_bloqueado"),
+        pl.Series("marca", ["M1", "M1", "M1", "M1", None, None]),
+    ])
+    config = {"pedido_minimo_valor": 50.0, "fornecedores": {"M1": {"pedido_minimo_valor": 0.0}},
+              "acao_abaixo_minimo": "reter"}
+    resultado = POConsolidator.consolidar(df, config)
+
+    p5 = resultado["df"].filter(pl.col("cod_produto") == "P5").row(0, named=True)
+    assert (p5["sugestao_final"], p5["status_diagnostico"], p5["calculado_mas_bloqueado"]) == (0, "BLOQUEADO", "SIM")
+    p1 = resultado["df"].filter(pl.col("cod_produto") == "P1").row(0, named=True)
+    assert (p1["status_diagnostico"], p1["calculado_mas_bloqueado"]) == ("COMPRAR", "NÃO")
+
+    # "N/D" só no agrupamento: o df exportado mantém a marca nula
+    assert resultado["df"]["marca"].null_count() == 2
+    assert set(resultado["pedidos"]["marca"]) == {"M1", "N/D"}
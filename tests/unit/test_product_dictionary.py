@@ -0,0 +1,33 @@
+# tests/unit/test_product_dictionary.py
+import polars as pl
+from compras_sistema.data_engine.product_dictionary import ProductDictionary
+
+def _tabelas():
+    df_xyz = pl.DataFrame({"cod_produto": ["P2", "P1"], "curva_xyz": ["X", "Z"]})
+    df_abc = pl.DataFrame({"cod_produto": ["P1", "P9"], "curva_abc": ["A", "C"]})  # P9 fora do universo
+    df_saldo = pl.DataFrame({"cod_produto": ["P3", "P1"], "saldo_estoque": [5, 7]})
+    return df_xyz, df_abc, df_saldo
+
+def test_joins_por_id_equivalem_aos_joins_por_texto():
+    df_xyz, df_abc, df_saldo = _tabelas()
+    esperado = (pl.concat([df_xyz.select("cod_produto"), df_saldo.select("cod_produto")]).unique()
+                .join(df_xyz, on="cod_produto", how="left")
+                .join(df_abc, on="cod_produto", how="left")
+                .join(df_saldo, on="cod_produto", how="left")
+                .sort("cod_produto"))
+
+    dicionario = ProductDictionary.de_frames(df_xyz, df_saldo)
+    chave = ProductDictionary.COLUNA_ID
+    codificado = dicionario.codificar(df_abc)
+    assert codificado.schema[chave] == pl.UInt32
+    assert codificado[chave].to_list() == [0, None]
+
+    obtido = (dicionario.universo
+              .join(dicionario.codificar(df_xyz), on=chave, how="left")
+              .join(codificado, on=chave, how="left")
+              .join(dicionario.codificar(df_saldo), on=chave, how="left"))
+    obtido = dicionario.decodificar(obtido)
+
+    assert len(dicionario) == 3
+    assert obtido.columns[0] == "cod_produto" and chave not in obtido.columns
+    assert obtido.sort("cod_produto").equals(esperado)
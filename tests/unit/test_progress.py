@@ -0,0 +1,62 @@
+# tests/unit/test_progress.py
+import logging
+from compras_sistema.core.progress import ProgressEmitter, ProgressServer
+from compras_sistema.core.system_guard import SystemGuard
+
+def test_eventos_chegam_ao_servidor_em_ordem():
+    servidor = ProgressServer()
+    emissor = ProgressEmitter(servidor.porta)
+    logger = logging.getLogger("teste_progresso")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(emissor.handler())
+
+    emissor.etapa("join", 35, 1200)
+    logger.warning("memória baixa")
+    emissor.stats({"total_skus": 42})
+    emissor.fim(0)
+    servidor.esperar_desconexao()
+
+    eventos = servidor.drenar()
+    servidor.fechar()
+    assert [e["tipo"] for e in eventos] == ["etapa", "log", "stats", "fim", "desconectado"]
+    assert eventos[0]["etapa"] == "join" and eventos[0]["linhas"] == 1200 and eventos[0]["decorrido_s"] >= 0
+    assert eventos[1] == {**eventos[1], "nivel": "WARNING", "mensagem": "memória baixa"}
+    assert eventos[2]["dados"] == {"total_skus": 42}
+    assert not emissor.ativo  # fim() fecha o canal
+
+def test_aguardar_ignora_outros_eventos():
+    servidor = ProgressServer()
+    emissor = ProgressEmitter(servidor.porta)
+    emissor.log("iniciando")
+    emissor.stats({"total_valor": 10.5})
+    emissor.fechar()
+
+    assert servidor.aguardar("stats", timeout=5)["dados"] == {"total_valor": 10.5}
+    assert servidor.aguardar("stats", timeout=5) is None  # Conexão encerrada
+    servidor.fechar()
+
+def test_sem_porta_e_no_op():
+    emissor = ProgressEmitter()
+    emissor.etapa("motor", 50)
+    emissor.fim(1)
+    assert not emissor.ativo
+
+def test_guard_envia_o_nivel_da_mensagem(tmp_path):
+    servidor = ProgressServer()
+    emissor = ProgressEmitter(servidor.porta)
+    guard = SystemGuard(tmp_path)
+    guard.logger.setLevel(logging.INFO)  # basicConfig não age sob o pytest (root já tem handlers)
+    handler = emissor.handler()
+    guard.logger.addHandler(handler)
+    try:
+        guard.log("✅ ok")
+        guard.log("⚠️ Snapshot não gravado", nivel="WARNING")
+        guard.log("❌ ERRO CRÍTICO", nivel="ERROR")
+    finally:
+        guard.logger.removeHandler(handler)
+    emissor.fechar()
+    servidor.esperar_desconexao()
+
+    eventos = [e for e in servidor.drenar() if e["tipo"] == "log"]
+    servidor.fechar()
+    assert [e["nivel"] for e in eventos] == ["INFO", "WARNING", "ERROR"]
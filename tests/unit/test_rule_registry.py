@@ -0,0 +1,103 @@
+# tests/unit/test_rule_registry.py
+from datetime import datetime, timedelta
+import polars as pl
+import pytest
+from compras_sistema.rule_engine.rule_registry import RuleRegistry
+from compras_sistema.rule_engine.stock.estoque_math import EstoqueMath
+from compras_sistema.rule_engine.stock.estoque_rules import LotRule, TrendRule
+
+CONFIG = {
+    "compras": {"meses_cobertura": 3.0},
+    "produto": {"dias_lancamento": 180},
+    "lote": {"limite_virada": 0.5},
+    "giro": {"limite_meses_cobertura": 6, "minimo_venda_dia": 0.05},
+}
+
+def _linhas():
+    return pl.DataFrame({
+        "cod_produto": ["P1", "P2", "P3"],
+        "data_cadastro": [datetime(2024, 1, 1) - timedelta(days=d) for d in (400, 400, 30)],
+        "saldo_estoque": [0, 20, 0],
+        "saldo_oc": [0, 0, 0],
+        "media_venda_dia": [2.0, 1.0, 0.0],
+        "std_venda_dia": [0.5, 0.3, 0.0],
+        "lead_time_dias": [10, 10, 10],
+        "curva_abc": ["A", "B", "C"],
+        "curva_xyz": ["X", "Y", "Z"],
+        "lote_economico": [12, 12, 6],
+        "custo_unitario": [10.0, 5.0, 1.0],
+        "dias_sem_venda": [5, 10, 0],
+        "ativo": ["SIM", "SIM", "SIM"],
+    })
+
+def _sequencial(df, config):
+    """Sequência antiga de chamadas estáticas (referência)."""
+    df = EstoqueMath.calcular_tendencias(df)
+    df = EstoqueMath.calcular_seguranca(df, config)
+    df = EstoqueMath.calcular_necessidades(df, config, datetime(2024, 1, 1).date())
+    df = EstoqueMath.aplicar_lote_economico(df, config)
+    df = EstoqueMath.calcular_score(df)
+    return EstoqueMath.gerar_diagnostico(df, config, datetime(2024, 1, 1).date())
+
+def test_ordem_por_dependencias_independe_do_registro():
+    registro = RuleRegistry.padrao()
+    ordem = [r.nome for r in registro.ordenar()]
+    assert ordem.index("sanitize") < ordem.index("sazonalidade") < ordem.index("necessidades")
+    assert ordem.index("lote") < ordem.index("diagnostico")
+    assert ordem.index("score") < ordem.index("diagnostico")
+
+    invertido = RuleRegistry().registrar(LotRule())
+    for regra in RuleRegistry.padrao().regras:
+        if regra.nome != "lote":
+            invertido.registrar(regra)
+    ordem_inv = [r.nome for r in invertido.ordenar()]
+    assert ordem_inv.index("necessidades") < ordem_inv.index("lote") < ordem_inv.index("diagnostico")
+
+def test_plano_unico_equivale_a_sequencia_estatica():
+    registro = RuleRegistry.padrao(data_referencia=datetime(2024, 1, 1).date())
+    esperado = _sequencial(_linhas(), CONFIG)
+    obtido = registro.executar(_linhas(), CONFIG)
+
+    for coluna in ("sugestao_final", "score", "status_diagnostico", "ponto_suprimento"):
+        assert obtido[coluna].to_list() == esperado[coluna].to_list()
+    assert isinstance(registro.executar(_linhas().lazy(), CONFIG), pl.LazyFrame)
+
+def test_seleciona_apenas_regras_necessarias():
+    registro = RuleRegistry.padrao()
+    assert [r.nome for r in registro.selecionar(["perfil_cliente"])] == ["tendencias"]
+    nomes = {r.nome for r in registro.selecionar(["estoque_seguranca"])}
+    assert nomes == {"sanitize", "sazonalidade", "seguranca"}
+
+def test_recalculo_parcial_de_lote():
+    registro = RuleRegistry.padrao(data_referencia=datetime(2024, 1, 1).date())
+    assert [r.nome for r in registro.afetadas(["lote"])] == ["lote", "score", "diagnostico"]
+
+    anterior = registro.executar(_linhas(), CONFIG)
+    config_nova = {**CONFIG, "lote": {"limite_virada": 0.99}}
+    parcial = registro.recalcular(anterior, config_nova, ["lote"])
+    completo = registro.executar(_linhas(), config_nova)
+
+    assert parcial["sugestao_final"].to_list() == completo["sugestao_final"].to_list()
+    assert parcial["score"].to_list() == completo["score"].to_list()
+
+def test_regra_sem_entrada_ou_duplicada_gera_erro():
+    with pytest.raises(ValueError):
+        RuleRegistry().registrar(TrendRule()).registrar(TrendRule())
+    with pytest.raises(ValueError):
+        RuleRegistry.padrao().executar(_linhas().drop("curva_xyz"), CONFIG, ["estoque_seguranca"])
+
+def test_execucao_particionada_identica_a_memoria(tmp_path):
+    """Modo baixa memória: mesmas linhas, mesma ordem, mesmo score (inclusive o normalizado pela margem global)."""
+    from compras_sistema.rule_engine.stock.score_engine import ScoreEngine
+
+    df = pl.concat([_linhas().with_columns(pl.col("cod_produto") + f"_{i}") for i in range(20)])
+    # Maior margem em um único SKU: partições sem ele normalizariam por outro máximo
+    df = df.with_columns(pl.Series("margem", [100.0] + [float(i % 7) for i in range(1, df.height)]))
+    engine = ScoreEngine({"componentes": {"contribuicao_margem": 1000.0}})
+    registro = RuleRegistry.padrao(score_engine=engine, data_referencia=datetime(2024, 1, 1).date())
+
+    em_memoria = registro.executar(df, CONFIG)
+    particionado = registro.executar(df, CONFIG, particoes=4, pasta_spill=tmp_path)
+
+    assert particionado.equals(em_memoria)
+    assert not list(tmp_path.glob("*.arrow"))  # Spill removido ao final
@@ -0,0 +1,28 @@
+# tests/unit/test_run_snapshot.py
+from datetime import date
+import polars as pl
+from compras_sistema.data_engine.run_snapshot import RunSnapshot
+
+CONFIG = {"compras.meses_cobertura": 3.0, "lote.limite_virada": 0.5}
+
+def _df(n):
+    return pl.DataFrame({"cod_produto": [f"P{i}" for i in range(n)], "sugestao_final": list(range(n))})
+
+def test_grava_manifesto_e_le_por_run_id(tmp_path):
+    snapshots = RunSnapshot(tmp_path)
+    primeiro = snapshots.gravar(_df(3), CONFIG, date(2024, 1, 1), run_id="20240101_080000", marca="TODAS")
+    snapshots.gravar(_df(5), {**CONFIG, "lote.limite_virada": 0.9}, date(2024, 1, 2), run_id="20240102_080000")
+
+    assert primeiro["config_hash"] == RunSnapshot.hash_config(dict(reversed(CONFIG.items())))
+    assert snapshots.manifesto()["run_id"] == "20240102_080000"
+    assert snapshots.carregar().height == 5
+    assert snapshots.carregar("20240101_080000").equals(_df(3))
+    assert snapshots.scan().filter(pl.col("cod_produto") == "P4").collect()["sugestao_final"].item() == 4
+
+def test_retencao_mantem_apenas_os_mais_recentes(tmp_path):
+    snapshots = RunSnapshot(tmp_path, manter=2)
+    for dia in (1, 2, 3):
+        snapshots.gravar(_df(dia), CONFIG, date(2024, 1, dia), run_id=f"2024010{dia}_080000")
+
+    assert [m["run_id"] for m in snapshots.listar()] == ["20240103_080000", "20240102_080000"]
+    assert len(list(tmp_path.glob("*.arrow"))) == 2
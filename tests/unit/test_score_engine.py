@@ -0,0 +1,58 @@
+# tests/unit/test_score_engine.py
+import polars as pl
+import pytest
+from compras_sistema.rule_engine.stock.score_engine import ScoreEngine
+
+@pytest.fixture
+def df_score():
+    return pl.DataFrame({
+        "cod_produto": ["P1", "P2", "P3"],
+        "saldo_estoque": [0, 5, 100],
+        "saldo_oc": [0, 0, 0],
+        "media_venda_dia": [1.0, 2.0, 1.0],
+        "lead_time_dias": [10, 10, 10],
+        "custo_unitario": [10.0, 10.0, 10.0],
+        "curva_abc": ["A", "B", "C"],
+        "tendencia_vendas": ["EM ALTA", "ESTÁVEL", "ESTÁVEL"],
+        "var_vendas": [0.5, 0.0, -0.5]
+    })
+
+def test_pesos_padrao_reproduzem_score_original(df_score):
+    df = ScoreEngine().aplicar(df_score)
+    # P1: 5000 + 2500 + 1000 + 500 + 10 | P2: 2500 + 500 + 20 | P3: 100 + 10
+    assert df["score"].to_list() == [9010, 3020, 110]
+
+def test_pesos_do_yaml_e_componentes_normalizados(df_score):
+    pesos = {
+        "regras": {"estoque_zerado": 0, "abaixo_lead_time": 0, "tendencia_alta": 0},
+        "curva_abc": {"A": 0, "B": 0, "C": 0},
+        "componentes": {"giro_financeiro": 0, "risco_ruptura": 1000, "tendencia": 100}
+    }
+    df = ScoreEngine(pesos).aplicar(df_score)
+    # P1: ruptura 1.0 x 1000 + tendência 0.75 x 100 | P2: 0.75 x 1000 + 0.5 x 100 | P3: 0 + 0.25 x 100
+    assert df["score"].to_list() == [1075, 800, 25]
+
+def test_componente_com_peso_sem_coluna_avisa(df_score):
+    from structlog.testing import capture_logs
+    pesos = {"componentes": {"giro_financeiro": 0, "contribuicao_margem": 100}}
+
+    with capture_logs() as logs:
+        df = ScoreEngine(pesos).aplicar(df_score)
+    assert any(l["event"] == "score_componente_sem_coluna" and l["colunas"] == ["margem"] for l in logs)
+    assert df["score"].to_list() == [9000, 3000, 100]  # Margem ausente pontua 0
+
+    with capture_logs() as logs:
+        df = ScoreEngine(pesos).aplicar(df_score.with_columns(pl.Series("margem", [50.0, 100.0, None])))
+    assert not logs
+    assert df["score"].to_list() == [9050, 3100, 100]
+
+def test_regra_desconhecida_falha_na_compilacao():
+    with pytest.raises(ValueError):
+        ScoreEngine({"regras": {"cliente_vip": 100}})
+
+def test_ranking_top_n_parcial(df_score):
+    engine = ScoreEngine()
+    df = engine.ranquear(engine.aplicar(df_score), top_n=2)
+
+    ranks = dict(zip(df["cod_produto"], df["rank_prioridade"]))
+    assert ranks == {"P1": 1, "P2": 2, "P3": None}
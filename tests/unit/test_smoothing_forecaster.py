@@ -0,0 +1,72 @@
+# tests/unit/test_smoothing_forecaster.py
+import numpy as np
+import polars as pl
+import pytest
+from datetime import date
+from compras_sistema.rule_engine.forecast.smoothing_forecaster import SmoothingForecaster
+
+def _serie_sazonal(ciclos=3):
+    """Base 100 com pico de +60 em dezembro e vale de -40 em fevereiro."""
+    sazonal = np.zeros(12)
+    sazonal[11] = 60.0
+    sazonal[1] = -40.0
+    return np.tile(100.0 + sazonal, ciclos)
+
+def test_ses_serie_constante():
+    matriz = np.full((3, 12), 90.0)
+    previsao, sigma, idx = SmoothingForecaster.prever_matriz(matriz, "ses")
+
+    assert previsao == pytest.approx([90.0, 90.0, 90.0])
+    assert sigma == pytest.approx([0.0, 0.0, 0.0])
+    assert set(idx) == {SmoothingForecaster.MODELOS.index("ses")}
+
+def test_auto_escolhe_holt_winters_para_serie_sazonal():
+    """Com 36 meses de padrão sazonal o AIC deve eleger Holt-Winters e prever o mês seguinte."""
+    matriz = np.vstack([_serie_sazonal(), np.full(36, 50.0)])
+    previsao, _, idx = SmoothingForecaster.prever_matriz(matriz, "auto")
+
+    assert SmoothingForecaster.MODELOS[idx[0]] == "holt_winters"
+    # Próximo mês após 36 meses (índice 36 % 12 = 0 -> mês "normal")
+    assert previsao[0] == pytest.approx(100.0, abs=5.0)
+
+def test_auto_pontua_modelos_na_mesma_janela():
+    """Erros do 1º ano (fora da janela de Holt-Winters) não podem pesar só contra SES/Holt."""
+    serie = np.concatenate([np.where(np.arange(12) % 2, 400.0, 0.0), np.full(24, 100.0)])
+    matriz = serie[None, :]
+
+    # Mesma janela: os últimos 36 - 12 = 24 erros de 1 passo em todos os modelos
+    assert SmoothingForecaster._rodar_ses(matriz, 0.9, inicio=12)[2] == 24
+    assert SmoothingForecaster._rodar_holt(matriz, 0.9, 0.05, inicio=12)[2] == 24
+    assert SmoothingForecaster._rodar_holt_winters(matriz, 0.9, 0.05, 0.1, inicio=12)[2] == 24
+
+    # Série estável no período comparável: o ruído do 1º ano não pode eleger Holt-Winters
+    _, _, idx = SmoothingForecaster.prever_matriz(matriz, "auto")
+    assert SmoothingForecaster.MODELOS[idx[0]] != "holt_winters"
+
+
+def test_historico_curto_para_holt_winters():
+    with pytest.raises(ValueError):
+        SmoothingForecaster.prever_matriz(np.ones((1, 12)), "holt_winters")
+
+def test_prever_polars_converte_para_dia_e_paraleliza():
+    """Mensal -> diário (/30) e o caminho em pool de processos deve dar o mesmo resultado."""
+    meses = [date(2024 + (m // 12), m % 12 + 1, 1) for m in range(12)]
+    df_mensal = pl.DataFrame({
+        "cod_produto": ["P1"] * 12 + ["P2"] * 12 + ["P3"] * 12,
+        "mes": meses * 3,
+        "qtd_mes": [300.0] * 12 + [60.0] * 12 + [90.0] * 12
+    })
+    cfg = {"modelo": "ses", "meses_historico": 12}
+    ref = date(2025, 1, 15)
+
+    df_seq = SmoothingForecaster.prever_polars(df_mensal, cfg, data_referencia=ref)
+    df_par = SmoothingForecaster.prever_polars(
+        df_mensal, {**cfg, "limite_skus_paralelo": 1, "processos": 2}, data_referencia=ref
+    )
+
+    p1 = df_seq.filter(pl.col("cod_produto") == "P1").row(0, named=True)
+    assert p1["media_venda_dia"] == pytest.approx(10.0)
+    assert p1["metodo_demanda"] == "SES"
+    assert df_par.sort("cod_produto")["media_venda_dia"].to_list() == pytest.approx(
+        df_seq.sort("cod_produto")["media_venda_dia"].to_list()
+    )
@@ -0,0 +1,70 @@
+# tests/unit/test_stage_cache.py
+import importlib.util
+from pathlib import Path
+import polars as pl
+from compras_sistema.data_engine.stage_cache import StageCache
+from compras_sistema.rule_engine.rule_registry import RuleRegistry
+
+CONFIG = {"compras": {"meses_cobertura": 3.0}, "lote": {"limite_virada": 0.5}, "abc": {"A": 80.0}}
+
+def test_achatar_e_selecionar_secoes():
+    achatado = StageCache.achatar(CONFIG)
+    assert achatado["compras.meses_cobertura"] == 3.0
+    assert StageCache.selecionar(achatado, ["lote"]) == {"lote.limite_virada": 0.5}
+
+def test_hit_miss_e_diferenca_entre_execucoes(tmp_path):
+    df = pl.DataFrame({"cod_produto": ["P1"], "sugestao_final": [12]})
+    valores = StageCache.achatar(CONFIG)
+
+    cache = StageCache(tmp_path)
+    assert cache.carregar("motor", valores) is None
+    cache.gravar("motor", valores, df)
+
+    # Novo processo (launcher roda o script a cada simulação): lê do disco
+    novo = StageCache(tmp_path)
+    assert novo.carregar("motor", valores).equals(df)
+    assert novo.diferenca("motor", valores) == []
+
+    alterado = StageCache.achatar({**CONFIG, "compras": {"meses_cobertura": 4.0}})
+    assert novo.carregar("motor", alterado) is None
+    assert novo.diferenca("motor", alterado) == ["compras.meses_cobertura"]
+    assert [r.nome for r in RuleRegistry.padrao().afetadas(novo.diferenca("motor", alterado))] == [
+        "necessidades", "lote", "score", "diagnostico"
+    ]
+
+def test_banco_alterado_invalida_o_estagio(tmp_path):
+    banco = tmp_path / "vendas.db"
+    banco.write_bytes(b"v1")
+    valores = StageCache.achatar(CONFIG)
+    StageCache(tmp_path / "cache", [banco]).gravar("base", valores, pl.DataFrame({"x": [1]}))
+
+    banco.write_bytes(b"versao 2")
+    cache = StageCache(tmp_path / "cache", [banco])
+    assert cache.carregar("base", valores) is None
+    assert cache.diferenca("base", valores) is None
+
+def _script_relatorio():
+    caminho = Path(__file__).parents[2] / "scripts" / "gerar_relatorio_final.py"
+    spec = importlib.util.spec_from_file_location("gerar_relatorio_final", caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def test_peso_da_margem_invalida_a_base(tmp_path):
+    script = _script_relatorio()
+    config = StageCache.achatar(CONFIG)
+    sem_margem = {"componentes": {"giro_financeiro": 100}}
+    com_margem = {"componentes": {"giro_financeiro": 100, "contribuicao_margem": 50}}
+
+    # Execução 1: score sem margem, a base é gravada sem a coluna 'margem'
+    StageCache(tmp_path).gravar("base", script.valores_base(config, sem_margem, "2026-10-01"),
+                                pl.DataFrame({"cod_produto": ["P1"]}))
+
+    # Execução 2 (simulação, bancos inalterados): o peso da margem foi ligado
+    cache = StageCache(tmp_path)
+    assert cache.carregar("base", script.valores_base(config, com_margem, "2026-10-01")) is None
+    assert "usa_margem" in cache.diferenca("base", script.valores_base(config, com_margem, "2026-10-01"))
+    # Só mudar o valor do peso (continua usando margem) não obriga a remontar a base
+    cache.gravar("base", script.valores_base(config, com_margem, "2026-10-01"), pl.DataFrame({"cod_produto": ["P1"]}))
+    mais_peso = {"componentes": {"giro_financeiro": 100, "contribuicao_margem": 80}}
+    assert cache.carregar("base", script.valores_base(config, mais_peso, "2026-10-01")) is not None
@@ -37,4 +37,50 @@ def test_validador_falha_lote_zero():
     })
     
     with pytest.raises(SchemaError):
-        InputCalcSchema.validate(df)
\ No newline at end of file
+        InputCalcSchema.validate(df)
+def _base_valida(n=50):
+    return pl.DataFrame({
+        "cod_produto": [f"P{i}" for i in range(n)],
+        "saldo_estoque": [10] * n,
+        "saldo_oc": [0] * n,
+        "media_venda_dia": [1.5] * n,
+        "std_venda_dia": [0.1] * n,
+        "lead_time_dias": [10.0] * n,
+        "lote_economico": [12] * n,
+        "curva_abc": ["A"] * n,
+        "curva_xyz": ["X"] * n,
+        "data_cadastro": [date(2023, 1, 1)] * n
+    })
+
+def test_niveis_de_validacao():
+    from compras_sistema.rule_engine.validators.input_schema import validar_entrada
+
+    for nivel in ("completa", "amostrada", "esquema", "schema-only"):
+        validar_entrada(_base_valida(), nivel, tamanho_amostra=5)
+
+    # Lote zero em uma linha fora da amostra: o min global da 'amostrada' pega
+    lote_zero = _base_valida().with_columns(
+        pl.when(pl.col("cod_produto") == "P49").then(0).otherwise(pl.col("lote_economico")).alias("lote_economico")
+    )
+    with pytest.raises(SchemaError):
+        validar_entrada(lote_zero, "amostrada", tamanho_amostra=5)
+    validar_entrada(lote_zero, "esquema")  # Só tipos e nulos
+
+    with pytest.raises(SchemaError):
+        validar_entrada(_base_valida().with_columns(pl.lit(None, dtype=pl.Utf8).alias("curva_abc")), "esquema")
+    with pytest.raises(SchemaError):
+        validar_entrada(_base_valida().drop("data_cadastro"), "esquema")
+    with pytest.raises(ValueError):
+        validar_entrada(_base_valida(), "rapida")
+
+def test_aliases_de_nivel_na_linha_de_comando():
+    import argparse
+    from compras_sistema.rule_engine.validators.input_schema import NIVEIS_VALIDACAO, normalizar_nivel
+
+    # Mesmo argumento do gerar_relatorio_final.py: o type normaliza antes do choices
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--validacao", type=normalizar_nivel, choices=NIVEIS_VALIDACAO)
+    for alias, nivel in (("full", "completa"), ("sampled", "amostrada"), ("schema-only", "esquema"), ("ESQUEMA", "esquema")):
+        assert parser.parse_args(["--validacao", alias]).validacao == nivel
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--validacao", "rapida"])
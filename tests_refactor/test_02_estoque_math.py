@@ -94,4 +94,48 @@ def test_calculo_seguranca_lendo_configuracao_personalizada():
     # Como injetamos 10.0, o resultado tem de ser 10.0.
     resultado = df_result["estoque_seguranca"].item()
     
-    assert resultado == 10.0, f"Falha: O sistema ignorou o config. Esperado 10.0, recebeu {resultado}"
\ No newline at end of file
+    assert resultado == 10.0, f"Falha: O sistema ignorou o config. Esperado 10.0, recebeu {resultado}"
+
+
+def test_calculo_seguranca_modo_combinado_com_variancia_lead_time():
+    """
+    Modo 'combinado': ES = z * Raiz(LT * σd² + d² * σLT²)
+    Linha 1 usa o σLT do config (2.0); linha 2 traz σLT próprio (0.0).
+    Esperado L1: 1.65 * Raiz(4 * 1 + 9 * 4) = 1.65 * Raiz(40) ≈ 10.435
+    Esperado L2: 1.65 * Raiz(4 * 1 + 0)     = 1.65 * 2       = 3.3
+    """
+    df_input = pl.DataFrame({
+        "cod_produto": ["LT_CONFIG", "LT_PROPRIO"],
+        "curva_xyz": ["X", "X"],
+        "media_venda_dia": [3.0, 3.0],
+        "std_venda_dia": [1.0, 1.0],
+        "lead_time_dias": [4, 4],
+        "desvio_lead_time_dias": [None, 0.0]
+    })
+
+    config_combinado = {
+        "estoque": {"modo_seguranca": "combinado", "fator_z": {"X": 1.65, "Y": 1.28, "Z": 0.84}},
+        "lead_time": {"padrao_dias": 4, "desvio_padrao": 2.0}
+    }
+
+    df_result = EstoqueMath.calcular_seguranca(df_input, config_combinado)
+
+    res = df_result["estoque_seguranca"].to_list()
+    assert res[0] == pytest.approx(1.65 * 40 ** 0.5, 0.001)
+    assert res[1] == pytest.approx(3.3, 0.001)
+
+def test_sazonalidade_projetada_usa_data_referencia():
+    """
+    CENÁRIO: Execução 'as_of' em 15/01 com lead time de 30 dias.
+    EXPECTATIVA: A janela de chegada (fev/mar) deve usar os índices relativos a janeiro,
+    independente do mês corrente do relógio.
+    """
+    from datetime import date
+    indices = {m: 1.0 for m in range(1, 13)}
+    indices[2] = 2.0
+    indices[3] = 2.0
+
+    df = pl.DataFrame({"lead_time_dias": [30]})
+    res = EstoqueMath.aplicar_sazonalidade_projetada(df, indices, data_referencia=date(2025, 1, 15))
+
+    assert res["fator_sazonal_projetado"][0] == pytest.approx(2.0)
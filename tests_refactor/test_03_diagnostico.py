@@ -106,4 +106,113 @@ def test_diagnostico_obedece_configuracao_personalizada():
     diag = df_result["validacao_giro"].item()
     
     # Se passar aqui, o seu sistema é oficialmente Config-Driven
-    assert "ALERTA: Excesso > 1.0m" in diag
\ No newline at end of file
+    assert "ALERTA: Excesso > 1.0m" in diag
+
+# --- TESTE 4: Risco de Dependência de Cliente ---
+def test_diagnostico_corta_sugestao_de_cliente_unico():
+    """
+    Item com um único cliente (HHI = 1) tem a sugestão cortada pelo fator de dependência;
+    item pulverizado segue intacto.
+    """
+    df_input = pl.DataFrame({
+        "cod_produto": ["PROD_DEDICADO", "PROD_PULVERIZADO"],
+        "saldo_estoque": [10, 10],
+        "saldo_oc": [0, 0],
+        "media_venda_dia": [1.0, 1.0],
+        "dias_vida": [500, 500],
+        "ativo": ["SIM", "SIM"],
+        "sugestao_final": [40, 40],
+        "score": [100, 100],
+        "lote_economico": [10, 10],
+        "custo_unitario": [10.0, 10.0],
+        "curva_abc": ["B", "B"],
+        "qtd_clientes_365d": [1, 25],
+        "share_top1": [1.0, 0.1]
+    })
+
+    config_mock = {
+        "produto": {"dias_lancamento": 180},
+        "giro": {"limite_meses_cobertura": 6, "minimo_venda_dia": 0.05},
+        "risco": {"fator_corte_dependencia": 0.25}
+    }
+
+    df_result = EstoqueMath.gerar_diagnostico(df_input, config_mock)
+
+    dedicado = df_result.filter(pl.col("cod_produto") == "PROD_DEDICADO").row(0, named=True)
+    assert dedicado["risco_dependencia"] == "TOTAL"
+    assert dedicado["sugestao_final"] == 10
+    assert "Dependência de cliente" in dedicado["motivo_bloqueio"]
+
+    pulverizado = df_result.filter(pl.col("cod_produto") == "PROD_PULVERIZADO").row(0, named=True)
+    assert pulverizado["risco_dependencia"] == "OK"
+    assert pulverizado["sugestao_final"] == 40
+
+# --- TESTE 5: Corte de Dependência (Lote e Curva) ---
+def test_corte_de_dependencia_respeita_lote_e_curva():
+    """
+    O corte arredonda para lotes inteiros (12 com lote 12 e fator 0.5 continua 12,
+    não 6) e só vale para curvas A/B: item C de cliente único fica em ALERTA.
+    """
+    df_input = pl.DataFrame({
+        "cod_produto": ["PROD_LOTE", "PROD_DOIS_LOTES", "PROD_C"],
+        "saldo_estoque": [10, 10, 10],
+        "saldo_oc": [0, 0, 0],
+        "media_venda_dia": [1.0, 1.0, 1.0],
+        "dias_vida": [500, 500, 500],
+        "ativo": ["SIM", "SIM", "SIM"],
+        "sugestao_final": [12, 48, 12],
+        "score": [100, 100, 100],
+        "lote_economico": [12, 12, 12],
+        "custo_unitario": [10.0, 10.0, 10.0],
+        "curva_abc": ["A", "B", "C"],
+        "qtd_clientes_365d": [1, 1, 1],
+        "share_top1": [1.0, 1.0, 1.0]
+    })
+
+    config_mock = {
+        "produto": {"dias_lancamento": 180},
+        "giro": {"limite_meses_cobertura": 6, "minimo_venda_dia": 0.05},
+        "risco": {"fator_corte_dependencia": 0.5}
+    }
+
+    df_result = EstoqueMath.gerar_diagnostico(df_input, config_mock)
+    linhas = {r["cod_produto"]: r for r in df_result.iter_rows(named=True)}
+
+    assert linhas["PROD_LOTE"]["risco_dependencia"] == "TOTAL"
+    assert linhas["PROD_LOTE"]["sugestao_final"] == 12
+    assert linhas["PROD_DOIS_LOTES"]["sugestao_final"] == 24
+    assert linhas["PROD_C"]["risco_dependencia"] == "ALERTA"
+    assert linhas["PROD_C"]["sugestao_final"] == 12
+
+# --- TESTE: Colunas categóricas (Enum) ---
+def test_diagnostico_emite_enum_e_descarta_flags():
+    """
+    validacao_giro/status_diagnostico saem como Enum (categorias fixas) e as
+    flags auxiliares (_inativo, _alerta_giro, _item_novo) não vazam.
+    """
+    df_input = pl.DataFrame({
+        "cod_produto": ["PROD_INATIVO", "PROD_EXCESSO", "PROD_NOVO"],
+        "saldo_estoque": [5, 1000, 0],
+        "saldo_oc": [0, 0, 0],
+        "media_venda_dia": [1.0, 1.0, 0.0],
+        "dias_vida": [500, 500, 30],
+        "ativo": ["NO", "SIM", "SIM"],
+        "sugestao_final": [10, 10, 0],
+        "score": [100, 100, 100],
+        "lote_economico": [6, 6, 6],
+        "custo_unitario": [10.0, 10.0, 10.0]
+    })
+
+    config_mock = {
+        "produto": {"dias_lancamento": 180},
+        "giro": {"limite_meses_cobertura": 6, "minimo_venda_dia": 0.05}
+    }
+
+    df_result = EstoqueMath.gerar_diagnostico(df_input, config_mock)
+
+    assert df_result.schema["status_diagnostico"] == EstoqueMath.STATUS_DIAGNOSTICO
+    assert isinstance(df_result.schema["validacao_giro"], pl.Enum)
+    assert not [c for c in df_result.columns if c.startswith("_")]
+    assert df_result["status_diagnostico"].to_list() == ["INATIVO", "BLOQUEADO", "IMPLANTAÇÃO"]
+    assert df_result["motivo_bloqueio"].to_list() == ["Produto inativo no cadastro", "ALERTA: Excesso > 6.0m", ""]
+    assert df_result["sugestao_final"].to_list() == [0, 0, 6]
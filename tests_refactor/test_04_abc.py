@@ -79,4 +79,67 @@ def test_classificacao_abc_configuracao_personalizada():
     
     # Como o acumulado do PROD_X é 0.60 (60%), e o corte A é 0.50 (50%),
     # ele deve cair para a próxima faixa (B).
-    assert cat_x == "B", f"Falha na configuração dinâmica. Esperado B, recebeu {cat_x}"
\ No newline at end of file
+    assert cat_x == "B", f"Falha na configuração dinâmica. Esperado B, recebeu {cat_x}"
+
+def test_histerese_abc_mantem_classe_anterior_na_fronteira():
+    """
+    Cenário (total = 1000, corte A = 80%):
+    - P1 acumula 70%  -> A
+    - P2 acumula 81%  -> sem histerese seria B; era A e está a 1 p.p. do corte
+    - P3 acumula 91%  -> era A, mas saiu muito da faixa: vira B
+    Com tolerância de 2 p.p. para A, apenas P2 mantém a classe anterior.
+    """
+    df_vendas = pl.DataFrame({
+        "cod_produto": ["P1", "P2", "P3", "P4"],
+        "total_vendido": [700.0, 110.0, 100.0, 90.0]
+    })
+    df_anterior = pl.DataFrame({
+        "cod_produto": ["P1", "P2", "P3"],
+        "curva_abc_anterior": ["A", "A", "A"]
+    })
+    config_abc = {"A": 80.0, "B": 15.0, "C": 5.0}
+
+    sem_histerese = ABCClassifier.calcular_abc_polars(df_vendas, config_abc)
+    com_histerese = ABCClassifier.calcular_abc_polars(
+        df_vendas, config_abc, df_anterior, {"A": 2.0, "B": 2.0, "C": 2.0}
+    )
+
+    def classe(df, cod):
+        return df.filter(pl.col("cod_produto") == cod)["curva_abc"].item()
+
+    assert classe(sem_histerese, "P2") == "B"
+    assert classe(com_histerese, "P2") == "A"
+    assert classe(com_histerese, "P3") == "B"
+    assert classe(com_histerese, "P4") == classe(sem_histerese, "P4")  # Sem histórico: classificação nova
+
+def test_abc_multicriterio_global_e_por_marca():
+    """
+    P1 fatura muito com poucos pedidos; P2 fatura pouco com muitos pedidos.
+    A combinada (faturamento x frequência) deve separar os perfis, e o Pareto
+    por marca reclassifica cada marca isoladamente.
+    """
+    try:
+        from compras_sistema.rule_engine.classification.abc_multicriterio_classifier import ABCMultiCriterioClassifier
+    except ImportError:
+        from src.compras_sistema.rule_engine.classification.abc_multicriterio_classifier import ABCMultiCriterioClassifier
+
+    df = pl.DataFrame({
+        "cod_produto": ["P1", "P2", "P3"],
+        "marca": ["M1", "M1", "M2"],
+        "total_vendido": [800.0, 150.0, 50.0],
+        "qtd_vendida": [10.0, 500.0, 5.0],
+        "qtd_linhas": [2.0, 78.0, 20.0],
+        "margem": [100.0, -5.0, 10.0]
+    })
+    config_abc = {"A": 80.0, "B": 15.0, "C": 5.0}
+
+    global_ = ABCMultiCriterioClassifier.calcular_multicriterio_polars(df, config_abc, {})
+    p1 = global_.filter(pl.col("cod_produto") == "P1").row(0, named=True)
+    p2 = global_.filter(pl.col("cod_produto") == "P2").row(0, named=True)
+    assert p1["curva_combinada"] == "AC"
+    assert p2["curva_combinada"] == "BA"
+    assert p2["curva_margem"] == "C"  # Margem negativa fica fora do Pareto
+
+    por_marca = ABCMultiCriterioClassifier.calcular_multicriterio_polars(df, config_abc, {"por_marca": True})
+    # P3 é o único item da marca M2: vira A dentro da própria marca
+    assert por_marca.filter(pl.col("cod_produto") == "P3")["curva_faturamento"].item() == "A"